@@ -6,57 +6,71 @@ from django.contrib import admin
 from .models import (
     Farm, WaterHistory, FertilizerHistory, HarvestHistory, Task, Issue,
     CropPlanEvent, PlanItem, FuelRecord, SoilRecord, EmissionSource,
-    SequestrationActivity, EnergyRecord, Livestock, UserLocalStorage # Added UserLocalStorage
+    SequestrationActivity, EnergyRecord, Livestock, UserLocalStorage, # Added UserLocalStorage
+    LocalStorageEntry, FarmMetricsRollup, Job, WeatherObservation
 )
 
-# Inlines for related models
-class WaterHistoryInline(admin.TabularInline):
+# Inlines for related models. Their rows take the farm's owner on save
+# (see FarmAdmin.save_formset), so the owner column is not shown.
+class FarmChildInline(admin.TabularInline):
+    exclude = ('owner',)
+
+class WaterHistoryInline(FarmChildInline):
     model = WaterHistory
     extra = 1
 
-class FertilizerHistoryInline(admin.TabularInline):
+class FertilizerHistoryInline(FarmChildInline):
     model = FertilizerHistory
     extra = 1
 
-class HarvestHistoryInline(admin.TabularInline):
+class HarvestHistoryInline(FarmChildInline):
     model = HarvestHistory
     extra = 1
 
-class FuelRecordInline(admin.TabularInline):
+class FuelRecordInline(FarmChildInline):
     model = FuelRecord
     extra = 1
 
-class SoilRecordInline(admin.TabularInline):
+class SoilRecordInline(FarmChildInline):
     model = SoilRecord
     extra = 1
 
-class EmissionSourceInline(admin.TabularInline):
+class EmissionSourceInline(FarmChildInline):
     model = EmissionSource
     extra = 1
 
-class SequestrationActivityInline(admin.TabularInline):
+class SequestrationActivityInline(FarmChildInline):
     model = SequestrationActivity
     extra = 1
 
-class EnergyRecordInline(admin.TabularInline):
+class EnergyRecordInline(FarmChildInline):
     model = EnergyRecord
     extra = 1
 
-class LivestockInline(admin.TabularInline):
+class LivestockInline(FarmChildInline):
     model = Livestock
     extra = 1
 
 @admin.register(Farm)
 class FarmAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'size', 'crop', 'soil_type', 'slope_ratio')
-    search_fields = ('name', 'crop')
+    list_display = ('id', 'name', 'owner', 'size', 'crop', 'soil_type', 'slope_ratio', 'latitude', 'longitude')
+    search_fields = ('name', 'crop', 'owner__username')
     list_filter = ('soil_type',)
+    list_select_related = ('owner',)
     inlines = [
         WaterHistoryInline, FertilizerHistoryInline, HarvestHistoryInline,
         FuelRecordInline, SoilRecordInline, EmissionSourceInline,
         SequestrationActivityInline, EnergyRecordInline, LivestockInline
     ]
 
+    def save_formset(self, request, form, formset, change):
+        for instance in formset.save(commit=False):
+            instance.owner_id = form.instance.owner_id
+            instance.save()
+        for instance in formset.deleted_objects:
+            instance.delete()
+        formset.save_m2m()
+
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'due_date', 'priority', 'completed')
@@ -124,10 +138,39 @@ class LivestockAdmin(admin.ModelAdmin):
     list_filter = ('type',)
     list_select_related = ('farm',)
 
+@admin.register(FarmMetricsRollup)
+class FarmMetricsRollupAdmin(admin.ModelAdmin):
+    list_display = ('farm', 'emissions_co2', 'sequestered_co2', 'fuel_cost', 'energy_amount', 'soil_record_count', 'updated_at')
+    search_fields = ('farm__name',)
+    list_select_related = ('farm',)
+    readonly_fields = ('updated_at',)
+
+@admin.register(WeatherObservation)
+class WeatherObservationAdmin(admin.ModelAdmin):
+    list_display = ('cell_latitude', 'cell_longitude', 'date', 'temperature_max', 'temperature_min', 'precipitation', 'source')
+    list_filter = ('source', 'date')
+    readonly_fields = ('fetched_at',)
+
 @admin.register(UserLocalStorage)
 class UserLocalStorageAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'last_updated')
+    list_display = ('id', 'user', 'revision', 'last_updated')
     search_fields = ('user__username', 'user__email')
     list_filter = ('last_updated',)
     list_select_related = ('user',)
-    readonly_fields = ('last_updated',)
\ No newline at end of file
+    readonly_fields = ('last_updated',)
+
+@admin.register(LocalStorageEntry)
+class LocalStorageEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'key', 'revision', 'deleted', 'updated_at')
+    search_fields = ('user__username', 'key')
+    list_filter = ('deleted',)
+    list_select_related = ('user',)
+    readonly_fields = ('content_hash', 'updated_at')
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'user', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('user__username',)
+    list_select_related = ('user',)
+    readonly_fields = ('created_at', 'started_at', 'heartbeat_at', 'finished_at')
@@ -0,0 +1,108 @@
+# api/authentication.py
+"""
+Token authentication with a cache in front of the ``authtoken_token`` table.
+
+DRF's TokenAuthentication joins Token and User on every request. Here the
+authenticated user is cached per token key for at most
+AUTH_TOKEN_CACHE_TIMEOUT seconds (and never past the token's expiry), so the
+constant autosave calls only hit the cache.
+
+Cached entries are dropped when a token is deleted (logout, expiry, user
+deletion) and when its user is saved, which covers deactivation; see
+api/signals.py. With the default local-memory cache each worker process
+holds its own copy, so another worker may keep accepting a revoked token for
+up to the cache timeout. Set REDIS_URL to share one cache between workers.
+
+Tokens expire AUTH_TOKEN_TTL after they were issued (``None`` disables
+expiry); ``manage.py purge_expired_tokens`` deletes the stale rows.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+DEFAULT_TOKEN_TTL = timedelta(days=30)
+DEFAULT_CACHE_TIMEOUT = 60
+CACHE_KEY_PREFIX = 'auth-token:'
+
+
+def token_ttl():
+    return getattr(settings, 'AUTH_TOKEN_TTL', DEFAULT_TOKEN_TTL)
+
+
+def token_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def cache_key(key):
+    return CACHE_KEY_PREFIX + key
+
+
+def expires_at(token):
+    ttl = token_ttl()
+    return token.created + ttl if ttl is not None else None
+
+
+def is_expired(token, now=None):
+    expiry = expires_at(token)
+    return expiry is not None and expiry <= (now or timezone.now())
+
+
+def expired_tokens():
+    ttl = token_ttl()
+    if ttl is None:
+        return Token.objects.none()
+    return Token.objects.filter(created__lte=timezone.now() - ttl)
+
+
+def issue_token(user):
+    """The user's token, replacing it with a fresh one if it has expired."""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_expired(token):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def invalidate_token(key):
+    token_cache().delete(cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    keys = Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    token_cache().delete_many([cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication served from the cache. ``request.auth`` is a Token
+    either way; on a cache hit it is rebuilt from the cached user and
+    creation time without a query.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = token_cache()
+        now = timezone.now()
+        cached = cache.get(cache_key(key))
+        if cached is not None:
+            user, created = cached
+            token = Token(key=key, user=user, created=created)
+            if not is_expired(token, now) and user.is_active:
+                return user, token
+            cache.delete(cache_key(key))
+
+        user, token = super().authenticate_credentials(key)
+        if is_expired(token, now):
+            token.delete()
+            raise AuthenticationFailed('Token has expired.')
+
+        expiry = expires_at(token)
+        timeout = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT)
+        if expiry is not None:
+            timeout = min(timeout, (expiry - now).total_seconds())
+        cache.set(cache_key(key), (user, token.created), timeout)
+        return user, token
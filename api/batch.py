@@ -0,0 +1,161 @@
+# api/batch.py
+"""
+Batched create/update/delete for the farm tracker tables.
+
+A batch is a list of operations::
+
+    {"op": "create", "data": {...}}
+    {"op": "update", "id": 12, "data": {...}}   # partial update
+    {"op": "delete", "id": 13}
+
+Operations only see the owner's rows: updates and deletes of another
+owner's records fail as missing, and farm references must be the owner's
+farms. Every operation is validated first (existing rows are loaded with
+one query, farm references are checked with one query). If any operation is invalid
+nothing is written and the per-item errors are returned. Otherwise the batch
+is applied in one transaction with ``bulk_create``, ``bulk_update`` and a
+single DELETE, and FarmMetricsRollup is adjusted once per affected farm
+instead of once per row.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Farm
+from .rollups import ROLLUP_SOURCES, adjust_rollup, instance_contribution
+
+MAX_BATCH_OPERATIONS = 10000
+BATCH_WRITE_SIZE = 1000
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class BatchValidationError(Exception):
+    """One or more operations are invalid; ``results`` has per-item errors."""
+
+    def __init__(self, results):
+        self.results = results
+        super().__init__(f"{sum(1 for result in results if result['status'] == 'error')} invalid operations")
+
+
+class BatchWriter:
+    def __init__(self, serializer_class, owner, batch_size=BATCH_WRITE_SIZE):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.owner = owner
+        self.batch_size = batch_size
+        # One serializer per kind of operation, reused for every item:
+        # building a ModelSerializer's fields costs far more than validating.
+        self.validators = {'create': serializer_class(), 'update': serializer_class(partial=True)}
+
+    def parse(self, operation):
+        """Check the operation's shape; returns an error message or None."""
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            return f"Expected an object with op one of {', '.join(OPERATIONS)}."
+        if operation['op'] != 'create' and (not isinstance(operation.get('id'), int) or isinstance(operation['id'], bool)):
+            return 'Expected an integer id.'
+        if operation['op'] != 'delete' and not isinstance(operation.get('data'), dict):
+            return 'Expected a data object.'
+        return None
+
+    def validate(self, operations):
+        """
+        Validate every operation. Returns ``(results, plan)`` where ``plan``
+        holds ``(index, op, instance, validated_data)`` for each valid operation.
+        """
+        results = [{'index': index, 'status': 'ok'} for index in range(len(operations))]
+        errors = {}
+        for index, operation in enumerate(operations):
+            message = self.parse(operation)
+            if message:
+                errors[index] = {'non_field_errors': [message]}
+
+        ids = [op['id'] for index, op in enumerate(operations) if index not in errors and op['op'] != 'create']
+        existing = self.model.objects.for_owner(self.owner).in_bulk(ids)
+        seen = set()
+        plan = []
+        for index, operation in enumerate(operations):
+            if index in errors:
+                continue
+            op = operation['op']
+            instance = None
+            if op != 'create':
+                instance = existing.get(operation['id'])
+                if instance is None:
+                    errors[index] = {'id': [f"{self.model.__name__} {operation['id']} does not exist."]}
+                    continue
+                if operation['id'] in seen:
+                    errors[index] = {'id': ['Each record can only appear once per batch.']}
+                    continue
+                seen.add(operation['id'])
+            if op == 'delete':
+                plan.append((index, op, instance, ()))
+                continue
+            try:
+                data = self.validators[op].run_validation(operation['data'])
+            except ValidationError as e:
+                errors[index] = e.detail
+                continue
+            plan.append((index, op, instance, data))
+
+        farm_ids = {data['farm_id'] for _, op, _, data in plan if op != 'delete' and 'farm_id' in data}
+        known = set(Farm.objects.for_owner(self.owner).filter(id__in=farm_ids).values_list('id', flat=True))
+        for index, op, _, data in plan:
+            if op != 'delete' and data.get('farm_id', None) not in (None, *known):
+                errors[index] = {'farm_id': [f"Farm {data['farm_id']} does not exist."]}
+
+        for index, error in errors.items():
+            results[index] = {'index': index, 'status': 'error', 'errors': error}
+        if errors:
+            raise BatchValidationError(results)
+        return results, plan
+
+    def run(self, operations):
+        results, plan = self.validate(operations)
+        tracked = self.model in ROLLUP_SOURCES
+        deltas = defaultdict(lambda: defaultdict(float))
+
+        def track(instance, sign):
+            farm_id, amounts = instance_contribution(instance)
+            for field, amount in amounts.items():
+                deltas[farm_id][field] += sign * amount
+
+        created, updated, deleted = [], [], []
+        update_fields = set()
+        for index, op, instance, data in plan:
+            if op == 'create':
+                instance = self.model(**data, owner=self.owner)
+                created.append((index, instance))
+            elif op == 'update':
+                if tracked:
+                    track(instance, -1)
+                for field, value in data.items():
+                    setattr(instance, field, value)
+                update_fields.update(data)
+                updated.append((index, instance))
+            else:
+                deleted.append((index, instance))
+
+        with transaction.atomic():
+            self.model.objects.bulk_create([instance for _, instance in created], batch_size=self.batch_size)
+            if updated and update_fields:
+                self.model.objects.bulk_update(
+                    [instance for _, instance in updated], sorted(update_fields), batch_size=self.batch_size
+                )
+            if deleted:
+                # _raw_delete skips the per-row post_delete signals; the
+                # rollups are adjusted below in one pass.
+                queryset = self.model.objects.filter(pk__in=[instance.pk for _, instance in deleted])
+                queryset._raw_delete(queryset.db)
+            if tracked:
+                for _, instance in created + updated:
+                    track(instance, 1)
+                for _, instance in deleted:
+                    track(instance, -1)
+                for farm_id, amounts in deltas.items():
+                    adjust_rollup(farm_id, amounts)
+
+        for status, items in (('created', created), ('updated', updated), ('deleted', deleted)):
+            for index, instance in items:
+                results[index] = {'index': index, 'status': status, 'id': instance.pk}
+        return results
@@ -0,0 +1,106 @@
+# api/compression.py
+"""
+Compression helpers for stored sync values and compressed request bodies.
+
+zlib is always available; zstd is used when the optional ``zstandard``
+package is installed. Every stored value records the codec it was written
+with, so rows written before compression (codec ``''``) or with a codec
+that is no longer preferred still load.
+"""
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Values whose JSON encoding is smaller than this are stored as plain JSON.
+COMPRESSION_THRESHOLD = 1024
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+CODEC_NONE = ''
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+
+class DecompressionError(Exception):
+    """The data could not be decompressed."""
+
+
+class DecompressedTooLarge(DecompressionError):
+    """The decompressed data exceeds the allowed size."""
+
+
+def preferred_codec():
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def compress(data, codec):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress(data, codec, max_size=None):
+    """Decompress ``data``, refusing output larger than ``max_size`` bytes."""
+    try:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise DecompressionError('zstd data found but zstandard is not installed')
+            reader = zstandard.ZstdDecompressor().stream_reader(data)
+            chunks = []
+            total = 0
+            while max_size is None or total <= max_size:
+                chunk = reader.read(64 * 1024)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                total += len(chunk)
+            output = b''.join(chunks)
+        elif codec in (CODEC_ZLIB, 'gzip', 'deflate'):
+            # wbits=47 auto-detects zlib and gzip headers.
+            decompressor = zlib.decompressobj(47)
+            output = decompressor.decompress(data, max_size + 1 if max_size is not None else 0)
+        else:
+            raise DecompressionError(f"Unsupported encoding {codec!r}")
+    except (zlib.error, ValueError) as e:
+        raise DecompressionError(str(e)) from e
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise DecompressionError(str(e)) from e
+        raise
+    if max_size is not None and len(output) > max_size:
+        raise DecompressedTooLarge(f"Decompressed data exceeds {max_size} bytes")
+    return output
+
+
+def encode_value(value):
+    """
+    Prepare a JSON value for storage.
+
+    Returns ``(value, blob, codec)``: small values keep ``value`` as-is with no
+    blob, large ones are stored only as a compressed blob of their JSON.
+    """
+    encoded = json.dumps(value, separators=(',', ':')).encode()
+    if len(encoded) < COMPRESSION_THRESHOLD:
+        return value, None, CODEC_NONE
+    codec = preferred_codec()
+    return None, compress(encoded, codec), codec
+
+
+def decode_value(value, blob, codec):
+    if codec == CODEC_NONE:
+        return value
+    return json.loads(decompress(bytes(blob), codec))
+
+
+def request_encodings():
+    """Content-Encoding values accepted on request bodies."""
+    encodings = ['gzip', 'deflate']
+    if zstandard is not None:
+        encodings.append(CODEC_ZSTD)
+    return encodings
@@ -0,0 +1,160 @@
+# api/exporter.py
+"""
+Streaming export of one owner's data in the document shape accepted by
+``ImportDataView``.
+
+Every table is read with a single ``values()`` query iterated in chunks, and
+the nested farm histories are merged onto their farm by walking querysets
+ordered by ``farm_id`` alongside the farm queryset. The number of queries is
+therefore fixed regardless of how many farms are exported, and the JSON is
+produced incrementally so the response starts before the last table is read.
+"""
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from .importer import FARM_RECORD_SECTIONS, PLAN_SECTIONS
+from .models import (
+    Farm, WaterHistory, FertilizerHistory, HarvestHistory, Task, Issue,
+    CropPlanEvent, PlanItem
+)
+from .renderers import dumps as encode
+
+EXPORT_VERSION = '1.0'
+QUERY_CHUNK_SIZE = 2000
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# (document key, model, {output key: model field})
+FARM_HISTORY_EXPORTS = [
+    ('waterHistory', WaterHistory, {'amount': 'amount', 'date': 'date', 'efficiency': 'efficiency'}),
+    ('fertilizerHistory', FertilizerHistory, {'type': 'type', 'amount': 'amount', 'date': 'date'}),
+    ('harvestHistory', HarvestHistory, {'yield': 'yield_amount', 'date': 'date'}),
+]
+
+SIMPLE_EXPORTS = [
+    ('tasks', Task, ['id', 'title', 'due_date', 'priority', 'completed']),
+    ('issues', Issue, ['id', 'title', 'status']),
+    ('cropPlanEvents', CropPlanEvent, ['id', 'title', 'date']),
+]
+
+
+def _farm_record_fields(model):
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname not in ('farm_id', 'owner_id')
+    ]
+
+
+def _rows(queryset):
+    return queryset.iterator(chunk_size=QUERY_CHUNK_SIZE)
+
+
+def _array(rows):
+    yield b'['
+    first = True
+    for row in rows:
+        if not first:
+            yield b','
+        first = False
+        yield encode(row)
+    yield b']'
+
+
+def _farm_histories(owner):
+    """One ``farm_id``-grouped iterator per nested history table."""
+    grouped = []
+    for key, model, fields in FARM_HISTORY_EXPORTS:
+        queryset = model.objects.for_owner(owner).order_by('farm_id', 'date', 'id').values('farm_id', *fields.values())
+        groups = groupby(_rows(queryset), key=itemgetter('farm_id'))
+        grouped.append((key, fields, groups, next(groups, None)))
+    return grouped
+
+
+def _farms(owner):
+    histories = _farm_histories(owner)
+    farms = Farm.objects.for_owner(owner).order_by('id').values(
+        'id', 'name', 'size', 'crop', 'soil_type', 'slope_ratio', 'latitude', 'longitude'
+    )
+    for farm in _rows(farms):
+        document = {
+            'id': farm['id'],
+            'name': farm['name'],
+            'size': farm['size'],
+            'crop': farm['crop'],
+            'soilType': farm['soil_type'],
+            'slopeRatio': farm['slope_ratio'],
+            'latitude': farm['latitude'],
+            'longitude': farm['longitude'],
+        }
+        for position, (key, fields, groups, current) in enumerate(histories):
+            while current is not None and current[0] < farm['id']:
+                current = next(groups, None)
+            entries = []
+            if current is not None and current[0] == farm['id']:
+                entries = [
+                    {out: row[field] for out, field in fields.items()}
+                    for row in current[1]
+                ]
+                current = next(groups, None)
+            histories[position] = (key, fields, groups, current)
+            document[key] = entries
+        yield document
+
+
+def _sections(owner):
+    yield 'farms', _farms(owner)
+    for key, model, fields in SIMPLE_EXPORTS:
+        yield key, _rows(model.objects.for_owner(owner).order_by('id').values(*fields))
+    for key, plan_type in PLAN_SECTIONS.items():
+        queryset = PlanItem.objects.for_owner(owner).filter(plan_type=plan_type)
+        queryset = queryset.order_by('id').values('id', 'description')
+        yield key, _rows(queryset)
+    for key, model in FARM_RECORD_SECTIONS.items():
+        queryset = model.objects.for_owner(owner).order_by('id').values('farm_id', *_farm_record_fields(model))
+        yield key, (
+            {'farmId': row.pop('farm_id'), **row} for row in _rows(queryset)
+        )
+
+
+def _counted(key, rows, counts, progress):
+    """Pass ``rows`` through, reporting rows exported per section as they go."""
+    counts[key] = 0
+    for row in rows:
+        counts[key] += 1
+        if counts[key] % QUERY_CHUNK_SIZE == 0:
+            progress(counts)
+        yield row
+    progress(counts)
+
+
+def iter_export_pieces(owner, progress=None):
+    """
+    Yield ``owner``'s export document as a sequence of UTF-8 JSON fragments.
+
+    ``progress``, if given, is called with ``{section: rows}`` as rows are
+    written.
+    """
+    counts = {}
+    yield b'{"version":' + encode(EXPORT_VERSION)
+    yield b',"exportDate":' + encode(datetime.now().isoformat())
+    for key, rows in _sections(owner):
+        if progress is not None:
+            rows = _counted(key, rows, counts, progress)
+        yield b',' + encode(key) + b':'
+        yield from _array(rows)
+    yield b'}'
+
+
+def iter_export(owner, chunk_size=RESPONSE_CHUNK_SIZE, progress=None):
+    """Group the export fragments into chunks of roughly ``chunk_size`` bytes."""
+    buffer = []
+    size = 0
+    for piece in iter_export_pieces(owner, progress):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
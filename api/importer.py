@@ -0,0 +1,718 @@
+# api/importer.py
+"""
+Import engine for the JSON archives produced by the frontend export.
+
+The whole payload is validated before anything touches the database, farm
+references are resolved from an in-memory map, and every table is written
+with batched ``bulk_create`` inside a single transaction so a failed import
+leaves the existing data untouched. ``StreamingImporter`` does the same for
+archives too large to hold in memory, parsing them incrementally.
+
+An import replaces one owner's data only. Rows keep the ids in the archive
+unless another owner already holds the id; those rows get a new id, and the
+farm references to a renumbered farm follow it.
+
+With ``merge=True`` nothing is cleared first. Incoming rows are matched
+against the owner's stored rows by id, or by MERGE_KEYS for rows without a
+stored id, such as the nested farm histories. Only new and changed rows
+are written, with one ``bulk_create(update_conflicts=True)`` upsert per
+batch. Stored rows missing from the archive are kept unless
+``delete_missing`` is set.
+"""
+import time
+from collections import defaultdict
+
+import ijson
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max, Q
+
+from .models import (
+    Farm, WaterHistory, FertilizerHistory, HarvestHistory, Task, Issue,
+    CropPlanEvent, PlanItem, FuelRecord, SoilRecord, EmissionSource,
+    SequestrationActivity, EnergyRecord, Livestock, FarmMetricsRollup
+)
+from .rollups import rebuild_rollups
+
+IMPORT_BATCH_SIZE = 1000
+# Uploads larger than this are imported with StreamingImporter.
+STREAMING_IMPORT_THRESHOLD = 20 * 1024 * 1024
+MAX_REPORTED_ERRORS = 100
+
+# Models in the order they are written. Deletes run in the reverse order so
+# children never have to be collected through a cascade.
+IMPORT_MODELS = [
+    Farm, WaterHistory, FertilizerHistory, HarvestHistory, Task, Issue,
+    CropPlanEvent, PlanItem, FuelRecord, SoilRecord, EmissionSource,
+    SequestrationActivity, EnergyRecord, Livestock,
+]
+
+# Nested arrays inside each farm object.
+FARM_HISTORY_SECTIONS = {
+    'waterHistory': WaterHistory,
+    'fertilizerHistory': FertilizerHistory,
+    'harvestHistory': HarvestHistory,
+}
+
+# Top-level arrays without a farm reference.
+SIMPLE_SECTIONS = {
+    'tasks': Task,
+    'issues': Issue,
+    'cropPlanEvents': CropPlanEvent,
+}
+
+# Top-level plan arrays, all stored in PlanItem.
+PLAN_SECTIONS = {
+    'plantingPlans': 'Planting',
+    'fertilizerPlans': 'Fertilizer',
+    'pestManagementPlans': 'PestManagement',
+    'irrigationPlans': 'Irrigation',
+    'weatherTaskPlans': 'WeatherTask',
+    'rotationPlans': 'Rotation',
+    'rainwaterPlans': 'Rainwater',
+}
+
+# Top-level arrays whose rows point at a farm through ``farmId``.
+FARM_RECORD_SECTIONS = {
+    'fuelRecords': FuelRecord,
+    'soilRecords': SoilRecord,
+    'emissionSources': EmissionSource,
+    'sequestrationActivities': SequestrationActivity,
+    'energyRecords': EnergyRecord,
+    'livestock': Livestock,
+}
+
+FARM_CHILD_MODELS = [*FARM_HISTORY_SECTIONS.values(), *FARM_RECORD_SECTIONS.values()]
+
+SECTION_KEYS = ['farms', *SIMPLE_SECTIONS, *PLAN_SECTIONS, *FARM_RECORD_SECTIONS]
+
+# Natural keys a merge matches rows by when their id is not one of the
+# owner's stored ids. Matching is one-to-one, in id order, so repeated keys
+# (two waterings on one day) pair up rather than collapse.
+MERGE_KEYS = {
+    WaterHistory: ('farm_id', 'date'),
+    FertilizerHistory: ('farm_id', 'date', 'type'),
+    HarvestHistory: ('farm_id', 'date'),
+    FuelRecord: ('farm_id', 'date', 'equipment_name'),
+    SoilRecord: ('farm_id', 'date', 'location'),
+    EmissionSource: ('farm_id', 'date', 'source_type'),
+    SequestrationActivity: ('farm_id', 'date', 'activity_type'),
+    EnergyRecord: ('farm_id', 'date', 'energy_type'),
+    Livestock: ('farm_id', 'type'),
+}
+
+CHANGE_COUNTS = ('inserted', 'updated', 'unchanged', 'deleted')
+
+
+class ImportValidationError(Exception):
+    """Raised when the payload fails validation; nothing has been written."""
+
+    def __init__(self, errors, count=None):
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+        count = len(errors) if count is None else count
+        super().__init__(f"Import payload failed validation ({count} errors)")
+
+
+def build_farm(row):
+    return Farm(
+        id=row.get('id'),
+        name=row.get('name'),
+        size=row.get('size'),
+        crop=row.get('crop'),
+        soil_type=row.get('soilType', ''),
+        slope_ratio=row.get('slopeRatio'),
+        latitude=row.get('latitude'),
+        longitude=row.get('longitude'),
+    )
+
+
+def build_farm_history(model, farm, row):
+    if model is HarvestHistory:
+        return HarvestHistory(farm=farm, yield_amount=row['yield'], date=row['date'])
+    return model(farm=farm, **row)
+
+
+def build_simple(model, row):
+    return model(**row)
+
+
+def build_plan(plan_type, row):
+    return PlanItem(plan_type=plan_type, **row)
+
+
+def build_farm_record(model, farm_id, row):
+    return model(farm_id=farm_id, **{k: v for k, v in row.items() if k != 'farmId'})
+
+
+def parse_farm_id(value):
+    """Normalise a ``farmId`` reference, returning None when it is unusable."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ImportStats:
+    """
+    Per-table row counts and write timings reported back to the client.
+    ``rows`` counts the archive's rows, whether inserted, updated or
+    unchanged.
+    """
+
+    def __init__(self):
+        self.tables = {
+            model._meta.db_table: {'rows': 0, **dict.fromkeys(CHANGE_COUNTS, 0), 'seconds': 0.0}
+            for model in IMPORT_MODELS
+        }
+        self.started = time.perf_counter()
+
+    def record(self, model, seconds, **counts):
+        entry = self.tables[model._meta.db_table]
+        for name, count in counts.items():
+            entry[name] += count
+        entry['rows'] = entry['inserted'] + entry['updated'] + entry['unchanged']
+        entry['seconds'] += seconds
+
+    def rows(self):
+        return {table: entry['rows'] for table, entry in self.tables.items()}
+
+    def as_dict(self):
+        return {
+            'tables': {
+                table: {**entry, 'seconds': round(entry['seconds'], 4)}
+                for table, entry in self.tables.items()
+            },
+            'total_rows': sum(entry['rows'] for entry in self.tables.values()),
+            **{name: sum(entry[name] for entry in self.tables.values()) for name in CHANGE_COUNTS},
+            'seconds': round(time.perf_counter() - self.started, 4),
+        }
+
+
+def merge_fields(model):
+    """The columns a merge compares and updates: all but the id and owner."""
+    return [field.attname for field in model._meta.concrete_fields if field.attname not in ('id', 'owner_id')]
+
+
+class StoredRows:
+    """
+    Matches incoming rows of ``model`` against one owner's stored rows.
+
+    Stored rows are fetched per batch, by id and by natural key, so a merge
+    holds one batch of stored rows at a time. Across batches only the ids
+    already claimed are kept.
+    """
+
+    def __init__(self, model, owner):
+        self.model = model
+        self.owner = owner
+        self.fields = merge_fields(model)
+        self.key_fields = MERGE_KEYS.get(model, ())
+        self.key_positions = [self.fields.index(name) for name in self.key_fields]
+        # Ids of stored rows already matched and of rows this import wrote;
+        # neither may be matched again.
+        self.claimed = set()
+        self.values = {}
+        self.by_key = {}
+
+    def row(self, instance):
+        return tuple(getattr(instance, name) for name in self.fields)
+
+    def key(self, values):
+        return tuple(values[position] for position in self.key_positions)
+
+    def load(self, batch):
+        """Fetch the unclaimed stored rows that ``batch`` can match."""
+        stored = self.model.objects.for_owner(self.owner).order_by('pk')
+        ids = [instance.pk for instance in batch if instance.pk is not None]
+        rows = list(stored.filter(pk__in=ids).values_list('pk', *self.fields)) if ids else []
+        found = {row[0] for row in rows}
+        if self.key_positions:
+            keys = {self.key(self.row(instance)) for instance in batch if instance.pk not in found}
+            if keys:
+                # One IN list per key column selects a superset of the wanted
+                # keys; rows with other combinations are dropped below.
+                lookups = Q()
+                for position, name in enumerate(self.key_fields):
+                    values = {key[position] for key in keys}
+                    lookup = Q(**{f'{name}__in': values - {None}})
+                    if None in values:
+                        lookup |= Q(**{f'{name}__isnull': True})
+                    lookups &= lookup
+                candidates = stored.filter(lookups).exclude(pk__in=found).values_list('pk', *self.fields)
+                rows += [row for row in candidates if self.key(row[1:]) in keys]
+        self.values = {}
+        self.by_key = defaultdict(list)
+        for pk, *values in sorted(rows):
+            if pk in self.claimed:
+                continue
+            self.values[pk] = tuple(values)
+            if self.key_positions:
+                self.by_key[self.key(values)].append(pk)
+
+    def match(self, instance):
+        """Claim the stored row ``instance`` updates and return its id, or None for a new row."""
+        if instance.pk in self.values:
+            candidates = [instance.pk]
+        elif self.key_positions:
+            candidates = self.by_key.get(self.key(self.row(instance)), ())
+        else:
+            candidates = ()
+        for pk in candidates:
+            if pk not in self.claimed:
+                self.claimed.add(pk)
+                return pk
+        return None
+
+    def claim(self, instances):
+        self.claimed.update(instance.pk for instance in instances)
+
+    def missing(self):
+        """Ids of the owner's stored rows that no batch claimed."""
+        ids = self.model.objects.for_owner(self.owner).values_list('pk', flat=True)
+        return [pk for pk in ids.iterator(chunk_size=IMPORT_BATCH_SIZE) if pk not in self.claimed]
+
+
+class DataImporter:
+    """
+    Replaces ``owner``'s rows in the import tables with an export document,
+    or merges the document into them (``merge``, see the module docstring).
+
+    Usage::
+
+        stats = DataImporter(request.user).run(data)
+        stats = DataImporter(request.user, merge=True, delete_missing=True).run(data)
+
+    ``progress``, if given, is called with the ImportStats after every batch
+    written; background jobs use it to report rows per table.
+    """
+
+    def __init__(self, owner, batch_size=IMPORT_BATCH_SIZE, progress=None, merge=False, delete_missing=False):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.progress = progress
+        self.merge = merge
+        self.delete_missing = delete_missing
+        self.stored = {}
+        self.primary_keys = {}
+        self.errors = []
+        self.error_count = 0
+        self.farms_by_id = {}
+        # Archive farm id -> Farm written under a new id.
+        self.renumbered_farms = {}
+        # model -> next id for renumbered rows
+        self.next_ids = {}
+        self.stats = ImportStats()
+
+    # -- validation -------------------------------------------------------
+
+    def error(self, section, index, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'section': section, 'index': index, 'error': message})
+
+    def clean(self, section, index, build, exclude=('farm', 'owner')):
+        """Build one instance and run field validation, recording any failure."""
+        try:
+            instance = build()
+        except (TypeError, KeyError, AttributeError) as e:
+            self.error(section, index, f"Malformed record: {e}")
+            return None
+        try:
+            instance.clean_fields(exclude=list(exclude))
+        except ValidationError as e:
+            self.error(section, index, e.message_dict)
+            return None
+        return instance
+
+    def section(self, data, key):
+        rows = data.get(key, [])
+        if rows is None:
+            return []
+        if not isinstance(rows, list):
+            self.error(key, None, 'Expected a list.')
+            return []
+        return rows
+
+    def register_farm(self, index, farm):
+        if farm.id is None:
+            return True
+        if farm.id in self.farms_by_id:
+            self.error('farms', index, f"Duplicate farm id {farm.id}.")
+            return False
+        self.farms_by_id[farm.id] = farm
+        return True
+
+    def resolve_farm(self, section, index, instance, farm_id):
+        farm = self.farms_by_id.get(farm_id)
+        if farm is None:
+            self.error(section, index, f"Unknown farmId {farm_id!r}.")
+            return False
+        instance.farm = farm
+        return True
+
+    def convert(self, key, index, row):
+        """
+        Turn one element of a top-level array into unsaved model instances.
+
+        Returns a list of ``(model, instance)`` pairs; problems are recorded
+        on ``self.errors`` instead of raised so the whole payload is checked.
+        """
+        if key not in SECTION_KEYS:
+            return []
+        if not isinstance(row, dict):
+            self.error(key, index, 'Expected an object.')
+            return []
+
+        if key == 'farms':
+            farm = self.clean(key, index, lambda: build_farm(row))
+            if farm is None or not self.register_farm(index, farm):
+                return []
+            converted = [(Farm, farm)]
+            for history_key, model in FARM_HISTORY_SECTIONS.items():
+                label = f"farms[{index}].{history_key}"
+                for child_index, child in enumerate(self.section(row, history_key)):
+                    if not isinstance(child, dict):
+                        self.error(label, child_index, 'Expected an object.')
+                        continue
+                    instance = self.clean(label, child_index, lambda: build_farm_history(model, farm, child))
+                    if instance is not None:
+                        converted.append((model, instance))
+            return converted
+
+        if key in SIMPLE_SECTIONS:
+            model = SIMPLE_SECTIONS[key]
+            instance = self.clean(key, index, lambda: build_simple(model, row))
+        elif key in PLAN_SECTIONS:
+            model = PlanItem
+            instance = self.clean(key, index, lambda: build_plan(PLAN_SECTIONS[key], row))
+        else:
+            model = FARM_RECORD_SECTIONS[key]
+            farm_id = parse_farm_id(row.get('farmId'))
+            if farm_id is None:
+                self.error(key, index, f"Invalid farmId {row.get('farmId')!r}.")
+                return []
+            instance = self.clean(key, index, lambda: build_farm_record(model, farm_id, row))
+            if instance is not None and not self.resolve_farm(key, index, instance, farm_id):
+                return []
+        return [] if instance is None else [(model, instance)]
+
+    def validate(self, data):
+        """
+        Turn the payload into unsaved model instances grouped by model.
+
+        Raises ImportValidationError listing every problem found.
+        """
+        if not isinstance(data, dict):
+            raise ImportValidationError([{'section': None, 'index': None, 'error': 'Expected a JSON object.'}])
+
+        objects = {model: [] for model in IMPORT_MODELS}
+        # Farms first so farmId references resolve against the full map.
+        for key in SECTION_KEYS:
+            for index, row in enumerate(self.section(data, key)):
+                for model, instance in self.convert(key, index, row):
+                    objects[model].append(instance)
+
+        if self.errors:
+            raise ImportValidationError(self.errors, self.error_count)
+        return objects
+
+    # -- writing ----------------------------------------------------------
+
+    def clear(self):
+        # Plain DELETEs: going through the ORM would load every tracker row
+        # to send its rollup post_delete signal. The rollups are rebuilt from
+        # the imported rows once they are written.
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {quote(FarmMetricsRollup._meta.db_table)} WHERE farm_id IN "
+                f"(SELECT id FROM {quote(Farm._meta.db_table)} WHERE owner_id = %s)",
+                [self.owner.pk],
+            )
+            for model in reversed(IMPORT_MODELS):
+                started = time.perf_counter()
+                cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE owner_id = %s", [self.owner.pk])
+                self.stats.record(model, time.perf_counter() - started, deleted=cursor.rowcount)
+
+    def stored_rows(self, model):
+        if model not in self.stored:
+            self.stored[model] = StoredRows(model, self.owner)
+        return self.stored[model]
+
+    def remove_missing(self):
+        """Delete the owner's stored rows that a merged archive no longer has, children first."""
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in reversed(IMPORT_MODELS):
+                started = time.perf_counter()
+                missing = self.stored_rows(model).missing()
+                for start in range(0, len(missing), self.batch_size):
+                    chunk = missing[start:start + self.batch_size]
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    if model is Farm:
+                        cursor.execute(
+                            f"DELETE FROM {quote(FarmMetricsRollup._meta.db_table)} WHERE farm_id IN ({placeholders})",
+                            chunk,
+                        )
+                    cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE id IN ({placeholders})", chunk)
+                self.stats.record(model, time.perf_counter() - started, deleted=len(missing))
+
+    def reserve_ids(self, model, instances):
+        """Keep new ids above every stored id and every archive id seen so far."""
+        if model not in self.next_ids:
+            self.next_ids[model] = (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+        seen = max((instance.pk for instance in instances if instance.pk is not None), default=0)
+        self.next_ids[model] = max(self.next_ids[model], seen + 1)
+
+    def prepare(self, model, batch):
+        """Set the owner and resolve farm ids."""
+        farm_field = model._meta.get_field('farm') if model in FARM_CHILD_MODELS else None
+        for instance in batch:
+            instance.owner_id = self.owner.pk
+            if farm_field is None:
+                continue
+            if farm_field.is_cached(instance):
+                # The farm was written after this row was built; take its final id.
+                instance.farm_id = instance.farm.pk
+            elif instance.farm_id in self.renumbered_farms:
+                instance.farm_id = self.renumbered_farms[instance.farm_id].pk
+
+    def renumber(self, model, batch):
+        """Give rows whose id is already taken a new one."""
+        ids = [instance.pk for instance in batch if instance.pk is not None]
+        taken = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else ()
+        for instance in batch:
+            if instance.pk in taken:
+                # An explicit id rather than the sequence's, which a later
+                # archive row could still claim.
+                if model is Farm:
+                    self.renumbered_farms[instance.pk] = instance
+                instance.pk = self.next_ids[model]
+                self.next_ids[model] += 1
+
+    def conflict_fields(self, model):
+        """
+        The upsert's ON CONFLICT target: the table's primary key columns.
+
+        That is ``id`` on a plain table and ``(id, owner_id)`` once
+        partition_farm_history has partitioned it by owner, where nothing
+        is unique on ``id`` alone.
+        """
+        if model not in self.primary_keys:
+            with connection.cursor() as cursor:
+                self.primary_keys[model] = connection.introspection.get_primary_key_columns(
+                    cursor, model._meta.db_table
+                )
+        return self.primary_keys[model]
+
+    def upsert(self, model, batch):
+        """Merge ``batch`` into the stored rows with one upsert; returns the change counts."""
+        stored = self.stored_rows(model)
+        stored.load(batch)
+        new, changed = [], []
+        for instance in batch:
+            pk = stored.match(instance)
+            if pk is None:
+                new.append(instance)
+                continue
+            instance.pk = pk
+            if stored.row(instance) != stored.values[pk]:
+                changed.append(instance)
+        # New rows reuse their archive id when it is free, so a later id
+        # match can only hit one of the owner's rows.
+        self.renumber(model, new)
+        if new or changed:
+            model.objects.bulk_create(
+                new + changed, batch_size=self.batch_size,
+                update_conflicts=True, unique_fields=self.conflict_fields(model), update_fields=stored.fields,
+            )
+        # Rows written by this import must not match later rows by key.
+        stored.claim(new)
+        return {'inserted': len(new), 'updated': len(changed), 'unchanged': len(batch) - len(new) - len(changed)}
+
+    def write(self, model, instances):
+        self.reserve_ids(model, instances)
+        for start in range(0, len(instances), self.batch_size):
+            batch = instances[start:start + self.batch_size]
+            started = time.perf_counter()
+            self.prepare(model, batch)
+            if self.merge:
+                counts = self.upsert(model, batch)
+            else:
+                self.renumber(model, batch)
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+                counts = {'inserted': len(batch)}
+            self.stats.record(model, time.perf_counter() - started, **counts)
+            if self.progress is not None:
+                self.progress(self.stats)
+
+    def reset_sequences(self):
+        # Rows are inserted with explicit primary keys, so move the sequences
+        # past them or the next regular insert would collide.
+        statements = connection.ops.sequence_reset_sql(no_style(), IMPORT_MODELS)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def run(self, data):
+        """Validate ``data`` and replace (or merge) the owner's stored data with it atomically."""
+        objects = self.validate(data)
+        with transaction.atomic():
+            if not self.merge:
+                self.clear()
+            # Rows without an id draw from the sequences; start them past
+            # every stored id, not just this owner's.
+            self.reset_sequences()
+            for model in IMPORT_MODELS:
+                self.write(model, objects[model])
+            if self.merge and self.delete_missing:
+                self.remove_missing()
+            self.reset_sequences()
+            rebuild_rollups(owner=self.owner)
+        return self.stats.as_dict()
+
+
+def iter_top_level_items(file):
+    """
+    Yield ``(section, item)`` for every element of every top-level array.
+
+    The document is read with ijson's event parser, so only the element being
+    built is held in memory; scalar top-level keys such as ``version`` are
+    skipped.
+    """
+    builder = None
+    depth = 0
+    section = None
+    for prefix, event, value in ijson.parse(file, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+                if depth == 0:
+                    yield section, builder.value
+                    builder = None
+            continue
+        key, _, rest = prefix.partition('.')
+        if rest != 'item':
+            continue
+        if event in ('start_map', 'start_array'):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+            section = key
+        elif event not in ('end_map', 'end_array'):
+            yield key, value
+
+
+class StreamingImporter(DataImporter):
+    """
+    Import variant for archives too large to load with ``json.load``.
+
+    Records are parsed one at a time and flushed to the database in batches
+    of ``batch_size`` per table, so peak memory is bounded by the batch size
+    and the largest single top-level element (a farm with its nested
+    histories) rather than by the size of the file. Only the ids of records
+    listed before their farm are kept until the end, to relink them if the
+    farm is renumbered. The run still happens in
+    one transaction: any validation error, including a ``farmId`` that never
+    appears in ``farms``, rolls everything back.
+
+    Usage::
+
+        stats = StreamingImporter(request.user).run(uploaded_file)
+    """
+
+    def __init__(self, owner, batch_size=IMPORT_BATCH_SIZE, progress=None, merge=False, delete_missing=False):
+        super().__init__(owner, batch_size=batch_size, progress=progress, merge=merge, delete_missing=delete_missing)
+        self.farm_ids = set()
+        # farmId -> first (section, index) referencing it, checked at the end
+        # because the archive may list tracker records before farms.
+        self.farm_references = {}
+        self.pending = {model: [] for model in IMPORT_MODELS}
+        # model -> archive farm id -> ids of the rows written before that farm
+        # was read, which still point at its archive id.
+        self.unresolved = defaultdict(lambda: defaultdict(list))
+
+    def register_farm(self, index, farm):
+        if farm.id is None:
+            return True
+        if farm.id in self.farm_ids:
+            self.error('farms', index, f"Duplicate farm id {farm.id}.")
+            return False
+        self.farm_ids.add(farm.id)
+        return True
+
+    def resolve_farm(self, section, index, instance, farm_id):
+        self.farm_references.setdefault(farm_id, (section, index))
+        return True
+
+    def flush(self, model):
+        if model in FARM_CHILD_MODELS:
+            # History rows hold the Farm instance itself and need its pk, and
+            # records need to know which farms were renumbered.
+            self.flush(Farm)
+        if self.pending[model]:
+            unresolved = [
+                (instance.farm_id, instance) for instance in self.pending[model]
+                if model in FARM_RECORD_SECTIONS.values() and instance.farm_id not in self.farm_ids
+            ]
+            self.write(model, self.pending[model])
+            for farm_id, instance in unresolved:
+                self.unresolved[model][farm_id].append(instance.pk)
+            self.pending[model] = []
+
+    def relink_renumbered_farms(self):
+        """
+        Point rows written before their farm was renumbered at the farm's new id.
+
+        Rows are picked by id, not by ``farm_id``: a farm renumbered earlier
+        may have taken the archive id of a farm read later.
+        """
+        for model, farms in self.unresolved.items():
+            for farm_id, ids in farms.items():
+                farm = self.renumbered_farms.get(farm_id)
+                if farm is None:
+                    continue
+                for start in range(0, len(ids), self.batch_size):
+                    model.objects.filter(pk__in=ids[start:start + self.batch_size]).update(farm_id=farm.pk)
+
+    def run(self, file):
+        """Stream ``file`` into the database, replacing (or merging into) the owner's stored data."""
+        counters = {}
+        with transaction.atomic():
+            if not self.merge:
+                self.clear()
+            self.reset_sequences()
+            for key, row in iter_top_level_items(file):
+                index = counters.get(key, 0)
+                counters[key] = index + 1
+                for model, instance in self.convert(key, index, row):
+                    if self.error_count:
+                        # Keep validating, but stop writing rows that will be
+                        # rolled back anyway.
+                        continue
+                    self.pending[model].append(instance)
+                    if len(self.pending[model]) >= self.batch_size:
+                        self.flush(model)
+
+            for farm_id, (section, index) in self.farm_references.items():
+                if farm_id not in self.farm_ids:
+                    self.error(section, index, f"Unknown farmId {farm_id!r}.")
+            if self.error_count:
+                raise ImportValidationError(self.errors, self.error_count)
+
+            for model in IMPORT_MODELS:
+                self.flush(model)
+            # Records may precede their farm in the archive.
+            self.relink_renumbered_farms()
+            if self.merge and self.delete_missing:
+                self.remove_missing()
+            self.reset_sequences()
+            rebuild_rollups(owner=self.owner)
+        return self.stats.as_dict()
@@ -0,0 +1,27 @@
+# api/job_pool.py
+"""
+Entry points for the pool processes of the job worker (api/jobs.py).
+
+Pool processes are spawned, and they import this module before Django is
+set up. It must therefore not import models at module level.
+"""
+import django
+
+_progress_queue = None
+
+
+def init(progress_queue):
+    global _progress_queue
+    django.setup()
+    _progress_queue = progress_queue
+
+
+def run(job_id):
+    from django.db import connections
+
+    from .jobs import run_job
+
+    try:
+        return run_job(job_id, lambda progress: _progress_queue.put((job_id, progress)))
+    finally:
+        connections.close_all()
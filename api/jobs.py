@@ -0,0 +1,254 @@
+# api/jobs.py
+"""
+Background imports and exports.
+
+Jobs are rows in the ``jobs`` table; there is no separate broker. The
+``run_job_worker`` management command claims queued jobs with a conditional
+UPDATE, so several workers can share the table safely. It runs each job in a
+process pool and writes progress, the result and any error back to the row.
+
+An import still runs in a single transaction (api/importer.py). Progress
+is sent from the pool process to the worker, which writes it on its own
+connection, so pollers can see it before the import commits. The worker
+refreshes ``heartbeat_at`` on its running jobs. A job whose heartbeat goes
+stale (the worker died) is queued again, up to MAX_ATTEMPTS times.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from uuid import uuid4
+
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+
+from . import job_pool
+from .exporter import iter_export
+from .importer import (
+    DataImporter, StreamingImporter, ImportValidationError, STREAMING_IMPORT_THRESHOLD
+)
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 1.0
+STALE_JOB_TIMEOUT = timedelta(minutes=5)
+STALE_CHECK_INTERVAL = 60
+MAX_ATTEMPTS = 3
+
+
+def submit_import(user, upload, mode=None, merge=False, delete_missing=False):
+    options = {'mode': mode} if mode else {}
+    if merge:
+        options.update(merge=True, delete_missing=delete_missing)
+    job = Job(user=user, kind=Job.IMPORT, options=options)
+    job.input_file.save(f'{uuid4().hex}.json', upload, save=False)
+    job.save()
+    return job
+
+
+def submit_export(user):
+    return Job.objects.create(user=user, kind=Job.EXPORT)
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return its id, or None."""
+    while True:
+        job_id = Job.objects.filter(status=Job.QUEUED).order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        # Only one worker's UPDATE can still match status=queued.
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=now, heartbeat_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return job_id
+
+
+def heartbeat(job_ids):
+    if job_ids:
+        Job.objects.filter(id__in=job_ids, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def report_progress(job_id, progress):
+    Job.objects.filter(id=job_id, status=Job.RUNNING).update(progress=progress)
+
+
+def release(job_ids, error):
+    """Give running jobs back to the queue, failing those out of attempts."""
+    running = Job.objects.filter(id__in=job_ids, status=Job.RUNNING)
+    failed = list(running.filter(attempts__gte=MAX_ATTEMPTS).values_list('id', flat=True))
+    for job_id in failed:
+        finish(job_id, Job.FAILED, {'error': error})
+    return running.update(status=Job.QUEUED, progress={}, heartbeat_at=None)
+
+
+def requeue_stale(timeout=STALE_JOB_TIMEOUT):
+    cutoff = timezone.now() - timeout
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff).values_list('id', flat=True)
+    return release(list(stale), 'The worker stopped while running this job.')
+
+
+def finish(job_id, status, payload):
+    job = Job.objects.get(pk=job_id)
+    job.status = status
+    job.finished_at = timezone.now()
+    if status == Job.SUCCEEDED:
+        job.result = payload
+        # Progress messages still in flight are dropped once the job is no
+        # longer running, so record the final counts from the result.
+        if job.kind == Job.IMPORT:
+            job.progress = {table: entry['rows'] for table, entry in payload['tables'].items()}
+        else:
+            job.progress = payload['rows']
+    else:
+        job.error = payload
+    if job.input_file:
+        job.input_file.delete(save=False)
+    job.save(update_fields=['status', 'finished_at', 'progress', 'result', 'error', 'input_file'])
+    return job
+
+
+def run_import(job, report):
+    def progress(stats):
+        report(stats.rows())
+
+    options = {'merge': job.options.get('merge', False), 'delete_missing': job.options.get('delete_missing', False)}
+    with job.input_file.open('rb') as file:
+        if job.options.get('mode') == 'stream' or job.input_file.size > STREAMING_IMPORT_THRESHOLD:
+            return StreamingImporter(job.user, progress=progress, **options).run(file)
+        return DataImporter(job.user, progress=progress, **options).run(json.load(file))
+
+
+def run_export(job, report):
+    rows = {}
+
+    def progress(counts):
+        rows.update(counts)
+        report(dict(counts))
+
+    with tempfile.TemporaryFile() as buffer:
+        for chunk in iter_export(job.user, progress=progress):
+            buffer.write(chunk)
+        size = buffer.tell()
+        buffer.seek(0)
+        job.result_file.save(f"farm-export-{job.pk}-{timezone.now():%Y-%m-%d}.json", File(buffer), save=False)
+    Job.objects.filter(pk=job.pk).update(result_file=job.result_file.name)
+    return {'rows': rows, 'total_rows': sum(rows.values()), 'bytes': size}
+
+
+def run_job(job_id, report=None):
+    """
+    Run one claimed job to completion and return ``(status, payload)``,
+    where ``payload`` is the result on success and the error otherwise.
+    Exceptions are turned into the error payload here so nothing has to be
+    pickled back from a pool process.
+    """
+    job = Job.objects.get(pk=job_id)
+    report = report or (lambda progress: None)
+    try:
+        if job.kind == Job.IMPORT:
+            return Job.SUCCEEDED, run_import(job, report)
+        return Job.SUCCEEDED, run_export(job, report)
+    except ImportValidationError as e:
+        return Job.FAILED, {'error': str(e), 'details': e.errors}
+    except Exception as e:
+        logger.exception('Job %s failed', job_id)
+        return Job.FAILED, {'error': str(e)}
+
+
+class JobWorker:
+    """
+    Runs queued jobs in a pool of ``processes`` processes until stopped.
+
+    Usage::
+
+        JobWorker(processes=2).run()
+    """
+
+    def __init__(self, processes=None, poll_interval=POLL_INTERVAL):
+        self.processes = processes or os.cpu_count() or 1
+        self.poll_interval = poll_interval
+        self.stopping = False
+        self.running = {}  # future -> job id
+
+    def stop(self, *args):
+        """Stop claiming jobs; the ones already running are finished first."""
+        self.stopping = True
+
+    def start_pool(self, context, progress_queue):
+        return ProcessPoolExecutor(
+            self.processes, mp_context=context,
+            initializer=job_pool.init, initargs=(progress_queue,),
+        )
+
+    def drain(self, progress_queue):
+        """Wait up to one poll interval for progress, keeping the latest per job."""
+        latest = {}
+        try:
+            job_id, progress = progress_queue.get(timeout=self.poll_interval)
+            latest[job_id] = progress
+            while True:
+                job_id, progress = progress_queue.get_nowait()
+                latest[job_id] = progress
+        except queue.Empty:
+            pass
+        for job_id, progress in latest.items():
+            report_progress(job_id, progress)
+
+    def collect(self):
+        """Record finished jobs. Returns False if the pool broke."""
+        for future in [future for future in self.running if future.done()]:
+            job_id = self.running.pop(future)
+            try:
+                status, payload = future.result()
+            except BrokenProcessPool:
+                self.running[future] = job_id
+                return False
+            finish(job_id, status, payload)
+            logger.info('Job %s %s', job_id, status)
+        return True
+
+    def run(self, once=False):
+        """
+        Process jobs until stop() is called (SIGTERM in run_job_worker), or,
+        with ``once``, until the queue is empty.
+        """
+        # Pool processes start a fresh interpreter rather than forking this
+        # one, so they never inherit its database connections.
+        context = multiprocessing.get_context('spawn')
+        progress_queue = context.Queue()
+        pool = self.start_pool(context, progress_queue)
+        last_stale_check = 0
+        try:
+            while self.running or not self.stopping:
+                if time.monotonic() - last_stale_check > STALE_CHECK_INTERVAL:
+                    requeue_stale()
+                    last_stale_check = time.monotonic()
+                while not self.stopping and len(self.running) < self.processes:
+                    job_id = claim_next()
+                    if job_id is None:
+                        break
+                    self.running[pool.submit(job_pool.run, job_id)] = job_id
+                if once and not self.running:
+                    break
+                self.drain(progress_queue)
+                if not self.collect():
+                    # A pool process died (e.g. killed for memory); every job
+                    # in the pool is lost with it.
+                    logger.error('Job pool broke; requeueing %s', sorted(self.running.values()))
+                    release(list(self.running.values()), 'A worker process died while running this job.')
+                    self.running.clear()
+                    pool.shutdown(wait=False)
+                    pool = self.start_pool(context, progress_queue)
+                heartbeat(list(self.running.values()))
+        finally:
+            pool.shutdown(wait=True)
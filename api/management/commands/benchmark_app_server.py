@@ -0,0 +1,113 @@
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'Server exited with status {process.returncode} before answering {url}')
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise CommandError(f'Server did not answer {url} within {timeout} s')
+
+
+def load(url, total, concurrency, headers):
+    """Fire ``total`` GETs from ``concurrency`` threads; returns (seconds, latencies, errors)."""
+    latencies, errors = [], []
+    remaining = iter(range(total))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+                    response.read()
+                latencies.append(time.perf_counter() - started)
+            except (urllib.error.URLError, ConnectionError) as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec of runserver against gunicorn (backend/gunicorn_conf.py) on one endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/ready/', help='Endpoint to request (default hits the database and cache).')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--token', help='Send "Authorization: Token <token>" for authenticated endpoints.')
+        parser.add_argument('--workers', type=int, help='Override GUNICORN_WORKERS.')
+        parser.add_argument('--worker-class', help='Override GUNICORN_WORKER_CLASS, e.g. uvicorn.workers.UvicornWorker.')
+
+    def handle(self, *args, **options):
+        headers = {'Authorization': f"Token {options['token']}"} if options['token'] else {}
+        config = os.path.join(settings.BASE_DIR, 'backend', 'gunicorn_conf.py')
+        asgi = options['worker_class'] and 'uvicorn' in options['worker_class']
+        servers = {
+            'runserver': lambda port: [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}'],
+            'gunicorn': lambda port: [
+                sys.executable, '-m', 'gunicorn', '-c', config, '--bind', f'127.0.0.1:{port}',
+                'backend.asgi:application' if asgi else 'backend.wsgi:application',
+            ],
+        }
+        env = dict(os.environ, GUNICORN_ACCESS_LOG='', GUNICORN_LOG_LEVEL='warning')
+        if options['workers']:
+            env['GUNICORN_WORKERS'] = str(options['workers'])
+        if options['worker_class']:
+            env['GUNICORN_WORKER_CLASS'] = options['worker_class']
+
+        results = {}
+        for name, command in servers.items():
+            port = free_port()
+            url = f"http://127.0.0.1:{port}{options['path']}"
+            process = subprocess.Popen(
+                command(port), cwd=settings.BASE_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_until_up(f'http://127.0.0.1:{port}/api/health/', process)
+                load(url, options['concurrency'], options['concurrency'], headers)  # warm up every worker
+                seconds, latencies, errors = load(url, options['requests'], options['concurrency'], headers)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+            results[name] = len(latencies) / seconds
+            self.stdout.write(
+                f"{name:>10}: {results[name]:8.1f} req/s, "
+                f"p50 {np.percentile(latencies, 50) * 1000:.1f} ms, "
+                f"p95 {np.percentile(latencies, 95) * 1000:.1f} ms, "
+                f"{len(errors)} errors"
+            )
+        self.stdout.write(f"speedup: {results['gunicorn'] / results['runserver']:.1f}x ({os.cpu_count()} CPUs)")
@@ -0,0 +1,78 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from api.models import Farm
+from api.serializers import FuelRecordSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def fuel_records(farm_id, count):
+    start = date(2024, 1, 1)
+    return [
+        {
+            'farm_id': farm_id, 'date': (start + timedelta(days=n % 365)).isoformat(),
+            'equipment_name': 'Tractor', 'fuel_type': 'diesel', 'gallons': 10 + n % 7,
+            'hours_operated': 2.5, 'cost': 38.0, 'notes': '',
+        }
+        for n in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare the fuel record batch endpoint against saving records one by one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=10000)
+
+    def measure(self, label, func, count):
+        # Everything runs in a transaction that is rolled back afterwards, so
+        # the benchmark leaves the database as it found it.
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                func()
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f"{label:<28}{elapsed:>9.2f}s{count / elapsed:>12.0f} records/s")
+        return elapsed
+
+    def handle(self, *args, **options):
+        count = options['records']
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(username='benchmark-batch-writes')
+            farm = Farm.objects.create(name='Benchmark farm', size='100', crop='corn', owner=user)
+        records = fuel_records(farm.id, count)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def one_by_one():
+            # The per-object path: validate and INSERT each record separately
+            # (HTTP overhead per request is not included).
+            for record in records:
+                serializer = FuelRecordSerializer(data=record)
+                serializer.is_valid(raise_exception=True)
+                serializer.save(owner=user)
+
+        def batched():
+            operations = [{'op': 'create', 'data': record} for record in records]
+            response = client.post('/api/fuel-records/batch/', {'operations': operations}, format='json')
+            assert response.status_code == 200, response.content[:500]
+
+        try:
+            self.stdout.write(f"{count} fuel records")
+            single = self.measure('one by one', one_by_one, count)
+            batch = self.measure('batch endpoint', batched, count)
+            self.stdout.write(f"speedup: {single / batch:.1f}x")
+        finally:
+            farm.delete()
+            user.delete()
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request database connection overhead with and without persistent connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--database', default='default')
+
+    def run(self, connection, requests, max_age, health_checks):
+        """
+        Time ``requests`` request cycles of one small query each. The request
+        signals drive Django's close_old_connections exactly as a real request
+        does, so CONN_MAX_AGE decides whether the next cycle reconnects.
+        """
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+        opened = 0
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            if connection.connection is None:
+                opened += 1
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            request_finished.send(sender=self.__class__)
+            timings.append(time.perf_counter() - started)
+        connection.close()
+        return np.array(timings) * 1000, opened
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        original = dict(connection.settings_dict)
+        self.stdout.write(f"{connection.vendor} at {original.get('HOST') or original['NAME']}, {options['requests']} requests")
+        modes = (
+            ('new connection per request (CONN_MAX_AGE=0)', 0, False),
+            ('persistent (CONN_MAX_AGE=60)', 60, False),
+            ('persistent + health checks', 60, True),
+        )
+        try:
+            results = {}
+            for label, max_age, health_checks in modes:
+                timings, opened = self.run(connection, options['requests'], max_age, health_checks)
+                results[label] = timings
+                self.stdout.write(
+                    f"{label:>45}: mean {timings.mean():.3f} ms, p95 {np.percentile(timings, 95):.3f} ms, "
+                    f"{opened} connections opened"
+                )
+        finally:
+            connection.settings_dict.update(original)
+        baseline, persistent = (results[label].mean() for label, _, _ in modes[:2])
+        self.stdout.write(f"connection setup overhead per request: {baseline - persistent:.3f} ms")
@@ -0,0 +1,83 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.importer import DataImporter
+
+
+class Rollback(Exception):
+    pass
+
+
+def build_document(farms, days, seed=0):
+    """An import archive with daily watering and weekly fuel records per farm."""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    dates = [(start + timedelta(days=n)).isoformat() for n in range(days)]
+    document = {'farms': [], 'fuelRecords': []}
+    for farm_id in range(1, farms + 1):
+        document['farms'].append({
+            'id': farm_id, 'name': f"Farm {farm_id}", 'size': str(rng.randint(10, 500)), 'crop': 'Corn',
+            'waterHistory': [
+                {'amount': rng.randint(100, 900), 'date': day, 'efficiency': rng.randint(50, 100)} for day in dates
+            ],
+        })
+        for day in dates[::7]:
+            document['fuelRecords'].append({
+                'id': len(document['fuelRecords']) + 1, 'farmId': farm_id, 'date': day,
+                'equipment_name': 'Tractor', 'fuel_type': 'diesel', 'gallons': round(rng.uniform(5, 40), 1),
+                'hours_operated': round(rng.uniform(1, 9), 1), 'cost': round(rng.uniform(20, 160), 2),
+            })
+    return document
+
+
+class Command(BaseCommand):
+    help = 'Compare re-importing a mostly unchanged archive by replacing everything and by merging.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--farms', type=int, default=100)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--changed', type=float, default=1.0, help='Percent of fuel records edited.')
+
+    def measure(self, label, importer, document):
+        # Each run is rolled back so every variant starts from the same data.
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                stats = importer.run(document)
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            pass
+        # Validation costs the same in every mode; the table timings cover
+        # only the writes.
+        writes = sum(table['seconds'] for table in stats['tables'].values())
+        counts = ', '.join(f"{stats[name]} {name}" for name in ('inserted', 'updated', 'unchanged', 'deleted'))
+        self.stdout.write(f"{label:<28}{elapsed:>8.2f}s{writes:>8.2f}s  {counts}")
+        return elapsed, writes
+
+    def handle(self, *args, **options):
+        document = build_document(options['farms'], options['days'])
+        rng = random.Random(1)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='benchmark-import-merge')
+                DataImporter(user).run(document)
+                fuel = document['fuelRecords']
+                for record in rng.sample(fuel, int(len(fuel) * options['changed'] / 100)):
+                    record['gallons'] += 1
+                rows = sum(len(farm['waterHistory']) + 1 for farm in document['farms']) + len(fuel)
+                self.stdout.write(f"{rows} rows, {options['changed']}% of {len(fuel)} fuel records changed")
+                self.stdout.write(f"{'':<28}{'total':>9}{'writes':>9}")
+
+                replace = self.measure('replace (delete + insert)', DataImporter(user), document)
+                merge = self.measure('merge', DataImporter(user, merge=True), document)
+                self.measure('merge, delete missing', DataImporter(user, merge=True, delete_missing=True), document)
+                self.stdout.write(f"speedup: {replace[0] / merge[0]:.1f}x total, {replace[1] / merge[1]:.1f}x writes")
+                raise Rollback
+        except Rollback:
+            pass
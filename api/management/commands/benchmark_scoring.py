@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.scoring import FarmArrays, compute_metrics
+
+
+def build_arrays(farms, days, seed=0):
+    """Synthetic FarmArrays shaped like FarmArrays.load() output."""
+    rng = np.random.default_rng(seed)
+    farm_ids = np.arange(1, farms + 1)
+
+    def rows(per_farm):
+        return np.repeat(np.arange(farms), per_farm)
+
+    water = rows(days)
+    fertilizer = rows(days // 14)
+    harvest = rows(max(days // 120, 1))
+    soil = rows(max(days // 30, 1))
+    weekly = rows(days // 7)
+    return FarmArrays(
+        farm_ids,
+        rng.uniform(10, 500, farms),
+        water={'idx': water, 'date': np.zeros(len(water))},
+        fertilizer={
+            'idx': fertilizer,
+            'amount': rng.uniform(10, 90, len(fertilizer)),
+            'organic': rng.random(len(fertilizer)) < 0.4,
+        },
+        harvest={'idx': harvest, 'yield': rng.uniform(100, 5000, len(harvest)), 'date': np.zeros(len(harvest))},
+        soil={
+            'idx': soil, 'ph': rng.uniform(5.5, 7.5, len(soil)), 'organic_matter': rng.uniform(1, 6, len(soil)),
+        },
+        emissions={'idx': weekly, 'co2': rng.uniform(0, 50, len(weekly))},
+        sequestration={'idx': soil, 'co2': rng.uniform(0, 80, len(soil))},
+        energy={'idx': weekly, 'amount': rng.uniform(50, 400, len(weekly)), 'renewable': rng.random(len(weekly)) < 0.3},
+        fuel={'idx': weekly, 'gallons': rng.uniform(5, 40, len(weekly)), 'hours': rng.uniform(1, 9, len(weekly))},
+    )
+
+
+class Command(BaseCommand):
+    help = 'Measure bulk sustainability scoring over synthetic farm histories.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--farms', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--database', action='store_true', help='Also time a run against the database tables.')
+
+    def handle(self, *args, **options):
+        arrays = build_arrays(options['farms'], options['days'])
+        history_rows = sum(len(table['idx']) for table in arrays.tables.values())
+        self.stdout.write(f"{len(arrays)} farms, {history_rows} history rows")
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            result = compute_metrics(arrays)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(f"score + response: best {min(timings) * 1000:.1f} ms, mean {np.mean(timings) * 1000:.1f} ms")
+        self.stdout.write(f"overall: {result['overall']}")
+
+        if options['database']:
+            started = time.perf_counter()
+            loaded = FarmArrays.load()
+            load_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            compute_metrics(loaded)
+            self.stdout.write(
+                f"database ({len(loaded)} farms): load {load_seconds * 1000:.1f} ms, "
+                f"score {(time.perf_counter() - started) * 1000:.1f} ms"
+            )
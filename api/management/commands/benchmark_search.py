@@ -0,0 +1,80 @@
+import random
+import time
+from datetime import date, timedelta
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from api.models import Farm, FuelRecord, Task
+from api.search import SEARCHABLE, search
+
+WORDS = (
+    'tractor pump irrigation fence creek barn harvest seed spray nozzle filter belt tire hydraulic '
+    'leak repair service inspect replace clean order check drain field north south east west'
+).split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text search against scanning every text column with icontains.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help='Tasks and fuel records, each.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--query', default='hydraulic leak')
+
+    def sentence(self, rng, length):
+        return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+    def time(self, label, run, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            hits = run()
+        elapsed = (time.perf_counter() - started) / repeat
+        self.stdout.write(f"{label:<32}{elapsed * 1000:>10.1f} ms  {hits} hits")
+        return elapsed
+
+    def scan(self, user, terms):
+        # What a search without an index does: every term in any text column.
+        hits = 0
+        for searchable in SEARCHABLE.values():
+            queryset = searchable.model.objects.for_owner(user)
+            for term in terms:
+                queryset = queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': term}) for field in searchable.fields)))
+            hits += queryset.count()
+        return hits
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        rows, repeat, query = options['rows'], options['repeat'], options['query']
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='benchmark-search')
+                farm = Farm.objects.create(owner=user, name='Benchmark', size='100', crop='corn')
+                start = date(2020, 1, 1)
+                Task.objects.bulk_create([
+                    Task(owner=user, title=self.sentence(rng, 4), due_date=start + timedelta(days=n % 1500), priority='low')
+                    for n in range(rows)
+                ], batch_size=2000)
+                FuelRecord.objects.bulk_create([
+                    FuelRecord(
+                        owner=user, farm=farm, date=start + timedelta(days=n % 1500), equipment_name=rng.choice(WORDS),
+                        fuel_type='diesel', gallons=10, hours_operated=1, cost=40, notes=self.sentence(rng, 12),
+                    )
+                    for n in range(rows)
+                ], batch_size=2000)
+                self.stdout.write(f"{rows} tasks and {rows} fuel records, query {query!r}")
+
+                scan = self.time('icontains scan (count)', lambda: self.scan(user, query.split()), repeat)
+                ranked = self.time('full-text, first page of 20', lambda: len(search(user, query)), repeat)
+                self.stdout.write(f"speedup: {scan / ranked:.1f}x")
+                raise Rollback
+        except Rollback:
+            pass
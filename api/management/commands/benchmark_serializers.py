@@ -0,0 +1,77 @@
+import json
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Farm, FuelRecord
+from api.renderers import ORJSONRenderer
+from api.serializers import FarmSummarySerializer, FuelRecordSerializer, ValuesSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Compare ModelSerializer + JSONRenderer with values() rows + ORJSONRenderer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+
+    def seed(self, rows):
+        farms = Farm.objects.bulk_create(
+            [Farm(name=f"Farm {n}", size=str(10 + n % 500), crop='Corn', soil_type='Loam') for n in range(rows)],
+            batch_size=5000,
+        )
+        start = date(2024, 1, 1)
+        FuelRecord.objects.bulk_create(
+            [
+                FuelRecord(
+                    farm_id=farms[n % len(farms)].id, date=start + timedelta(days=n % 365),
+                    equipment_name='Tractor', fuel_type='diesel', gallons=10 + n % 7,
+                    hours_operated=2.5, cost=38.0,
+                )
+                for n in range(rows)
+            ],
+            batch_size=5000,
+        )
+
+    def compare(self, label, serializer_class, queryset):
+        fast = ValuesSerializer(serializer_class)
+        drf_data, drf_serialize = timed(lambda: serializer_class(queryset.all(), many=True).data)
+        drf_body, drf_render = timed(lambda: JSONRenderer().render(drf_data))
+        fast_data, fast_serialize = timed(lambda: fast.to_representation(fast.values(queryset.all())))
+        fast_body, fast_render = timed(lambda: ORJSONRenderer().render(fast_data))
+        if json.loads(drf_body) != json.loads(fast_body):
+            raise AssertionError(f"{label}: fast output differs from {serializer_class.__name__}")
+
+        drf_total = drf_serialize + drf_render
+        fast_total = fast_serialize + fast_render
+        self.stdout.write(f"{label:<44}{drf_serialize:>11.0f}{drf_render:>10.0f}{drf_total:>10.0f}")
+        self.stdout.write(f"{'  values() + ORJSONRenderer':<44}{fast_serialize:>11.0f}{fast_render:>10.0f}"
+                          f"{fast_total:>10.0f}   {drf_total / fast_total:.1f}x")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        try:
+            # Seeded rows are rolled back when the benchmark finishes.
+            with transaction.atomic():
+                self.seed(rows)
+                self.stdout.write(f"{rows} rows per table; times in ms (query time included in serialize)")
+                self.stdout.write(f"{'':<44}{'serialize':>11}{'render':>10}{'total':>10}")
+                self.compare('FuelRecordSerializer + JSONRenderer', FuelRecordSerializer,
+                             FuelRecord.objects.order_by('id'))
+                self.compare('FarmSummarySerializer + JSONRenderer', FarmSummarySerializer,
+                             Farm.objects.order_by('id'))
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,75 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from api.models import Farm, FuelRecord
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare fetching a raw fuel history with the bucketed and downsampled series endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=10)
+        parser.add_argument('--per-day', type=int, default=2, help='Fuel records per day.')
+        parser.add_argument('--points', type=int, default=500)
+
+    def fetch(self, client, url):
+        """Time ``url``, following ``next`` links; returns (seconds, bytes, requests)."""
+        started = time.perf_counter()
+        size = requests = 0
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, response.content[:500]
+            size += len(response.content)
+            requests += 1
+            url = response.json().get('next')
+        return time.perf_counter() - started, size, requests
+
+    def handle(self, *args, **options):
+        days = int(options['years'] * 365.25)
+        rng = np.random.default_rng(0)
+        # Everything runs in a transaction that is rolled back afterwards, so
+        # the benchmark leaves the database as it found it.
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='benchmark-series')
+                farm = Farm.objects.create(name='Benchmark farm', size='100', crop='corn', owner=user)
+                start = date(2015, 1, 1)
+                gallons = 20 + 10 * np.sin(np.arange(days * options['per_day']) / 60) + rng.normal(0, 3, days * options['per_day'])
+                FuelRecord.objects.bulk_create(
+                    [
+                        FuelRecord(
+                            farm=farm, owner=user, date=start + timedelta(days=n // options['per_day']),
+                            equipment_name=('Tractor', 'Combine', 'Truck')[n % 3], fuel_type='diesel',
+                            gallons=float(value), hours_operated=2.5, cost=float(value) * 3.8,
+                        )
+                        for n, value in enumerate(gallons)
+                    ],
+                    batch_size=5000,
+                )
+                client = APIClient()
+                client.force_authenticate(user)
+                self.stdout.write(f"{len(gallons)} fuel records over {options['years']} years")
+
+                endpoints = (
+                    ('raw list, every page', f'/api/fuel-records/?farm={farm.id}&page_size=1000'),
+                    ('monthly buckets', f'/api/series/fuel/?farm={farm.id}&bucket=month'),
+                    ('monthly buckets by equipment', f'/api/series/fuel/?farm={farm.id}&bucket=month&group=equipment_name'),
+                    ('weekly buckets', f'/api/series/fuel/?farm={farm.id}&bucket=week&fields=gallons'),
+                    (f"LTTB {options['points']} points", f"/api/series/fuel/?farm={farm.id}&mode=raw&field=gallons&points={options['points']}"),
+                )
+                for label, url in endpoints:
+                    seconds, size, requests = self.fetch(client, url)
+                    self.stdout.write(f"{label:<32}{seconds * 1000:>9.1f} ms{size / 1024:>10.1f} KiB{requests:>5} requests")
+                raise Rollback
+        except Rollback:
+            pass
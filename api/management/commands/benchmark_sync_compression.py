@@ -0,0 +1,118 @@
+import gzip
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.compression import (
+    CODEC_ZLIB, CODEC_ZSTD, compress, decompress, encode_value, zstandard
+)
+
+
+def build_snapshot(farms, days, seed=0):
+    """A localStorage snapshot shaped like the one the frontend syncs."""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    dates = [(start + timedelta(days=n)).isoformat() for n in range(days)]
+    farm_list = []
+    fuel, soil, energy = [], [], []
+    for farm_id in range(1, farms + 1):
+        farm_list.append({
+            'id': farm_id,
+            'name': f"Farm {farm_id}",
+            'size': str(rng.randint(10, 500)),
+            'crop': rng.choice(['Corn', 'Wheat', 'Soybeans', 'Rice']),
+            'soilType': rng.choice(['Loam', 'Clay', 'Sandy']),
+            'waterHistory': [
+                {'amount': rng.randint(100, 900), 'date': day, 'efficiency': rng.randint(50, 100)}
+                for day in dates
+            ],
+            'fertilizerHistory': [
+                {'type': rng.choice(['Nitrogen', 'Compost']), 'amount': rng.randint(10, 90), 'date': day}
+                for day in dates[::14]
+            ],
+            'harvestHistory': [{'yield': rng.randint(100, 5000), 'date': day} for day in dates[::120]],
+        })
+        for day in dates[::7]:
+            fuel.append({
+                'id': len(fuel) + 1, 'farmId': farm_id, 'date': day, 'equipmentName': 'Tractor',
+                'fuelType': 'diesel', 'gallons': round(rng.uniform(5, 40), 1),
+                'hoursOperated': round(rng.uniform(1, 9), 1), 'cost': round(rng.uniform(20, 160), 2), 'notes': '',
+            })
+            energy.append({
+                'id': len(energy) + 1, 'farmId': farm_id, 'date': day, 'energyType': 'electricity',
+                'amount': round(rng.uniform(50, 400), 1), 'unit': 'kWh', 'renewable': rng.random() < 0.3,
+                'cost': round(rng.uniform(10, 90), 2), 'purpose': 'Irrigation pumps', 'notes': '',
+            })
+        for day in dates[::30]:
+            soil.append({
+                'id': len(soil) + 1, 'farmId': farm_id, 'date': day, 'location': 'North field',
+                'ph': round(rng.uniform(5.5, 7.5), 2), 'organicMatter': round(rng.uniform(1, 6), 2),
+                'nitrogen': rng.randint(10, 60), 'phosphorus': rng.randint(10, 60),
+                'potassium': rng.randint(50, 250), 'moisture': rng.randint(10, 40), 'notes': '',
+            })
+    tasks = [
+        {'id': n, 'title': f"Check irrigation line {n}", 'dueDate': rng.choice(dates),
+         'priority': rng.choice(['low', 'medium', 'high']), 'completed': rng.random() < 0.5}
+        for n in range(1, 200)
+    ]
+    return {
+        'farms': json.dumps(farm_list),
+        'fuelRecords': json.dumps(fuel),
+        'soilRecords': json.dumps(soil),
+        'energyRecords': json.dumps(energy),
+        'tasks': json.dumps(tasks),
+        'walkthroughCompleted': 'true',
+        'widgetLayout': json.dumps([{'id': 'weather', 'x': 0, 'y': 0, 'w': 4, 'h': 2}]),
+    }
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = 'Measure storage and transfer savings of sync snapshot compression.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--farms', type=int, default=20)
+        parser.add_argument('--days', type=int, default=3 * 365)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        snapshot = build_snapshot(options['farms'], options['days'])
+        raw = json.dumps(snapshot).encode()
+        repeat = options['repeat']
+        self.stdout.write(f"Snapshot: {len(snapshot)} keys, {len(raw) / 1024:.1f} KiB as a JSON document")
+
+        rows = []
+        codecs = [CODEC_ZLIB] + ([CODEC_ZSTD] if zstandard is not None else [])
+        for codec in codecs:
+            blobs, write_ms = timed(
+                lambda: {key: compress(json.dumps(value).encode(), codec) for key, value in snapshot.items()},
+                repeat,
+            )
+            _, read_ms = timed(lambda: {key: decompress(blob, codec) for key, blob in blobs.items()}, repeat)
+            stored = sum(len(blob) for blob in blobs.values())
+            rows.append((f"at rest ({codec})", stored, write_ms, read_ms))
+
+        stored = 0
+        for value in snapshot.values():
+            plain, blob, _ = encode_value(value)
+            stored += len(blob) if blob is not None else len(json.dumps(plain).encode())
+        rows.append(('at rest (stored format)', stored, None, None))
+
+        body, gzip_ms = timed(lambda: gzip.compress(raw, compresslevel=6), repeat)
+        rows.append(('load response (gzip)', len(body), gzip_ms, None))
+
+        self.stdout.write(f"{'':<26}{'bytes':>12}{'ratio':>9}{'write ms':>11}{'read ms':>10}")
+        self.stdout.write(f"{'uncompressed':<26}{len(raw):>12}{1:>9.2f}")
+        for label, size, write_ms, read_ms in rows:
+            write = f"{write_ms:>11.1f}" if write_ms is not None else f"{'':>11}"
+            read = f"{read_ms:>10.1f}" if read_ms is not None else ''
+            self.stdout.write(f"{label:<26}{size:>12}{len(raw) / size:>9.2f}{write}{read}")
@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import typeahead
+from api.models import Farm, FuelRecord
+
+MAKES = 'Deere Kubota Case Fendt Claas Massey Valtra Holland Bobcat Ford'.split()
+KINDS = 'tractor combine sprayer loader truck mower baler seeder harrow pump'.split()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Measure typeahead latency on fuel record equipment names, without and with the prefix cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Fuel records of the measured user.')
+        parser.add_argument('--others', type=int, default=3, help='Other users with as many records each.')
+
+    def seed(self, user, rows, rng):
+        farm = Farm.objects.create(owner=user, name=f'{user.username} farm', size='100', crop='corn')
+        start = date(2020, 1, 1)
+        FuelRecord.objects.bulk_create([
+            FuelRecord(
+                owner=user, farm=farm, date=start + timedelta(days=n % 1500),
+                equipment_name=f'{rng.choice(MAKES)} {rng.choice(KINDS)} {rng.randint(1, 20)}',
+                fuel_type='diesel', gallons=10, hours_operated=1, cost=40,
+            )
+            for n in range(rows)
+        ], batch_size=5000)
+
+    def measure(self, label, user, prefixes, clear):
+        timings = []
+        for prefix in prefixes:
+            if clear:
+                typeahead.cache.clear()
+            started = time.perf_counter()
+            typeahead.suggest(user, 'equipment_name', prefix)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(f"{label:<24}p50 {statistics.median(timings):>9.3f} ms   p95 {p95:>9.3f} ms")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='benchmark-typeahead')
+                self.seed(user, options['rows'], rng)
+                for n in range(options['others']):
+                    self.seed(User.objects.create_user(username=f'benchmark-typeahead-{n}'), options['rows'], rng)
+                total = options['rows'] * (options['others'] + 1)
+                self.stdout.write(f"{total} fuel records, {options['rows']} for the measured user")
+
+                words = [word.lower() for word in MAKES + KINDS]
+                prefixes = [word[:length] for word in words for length in (1, 2, 3, 5)] * 3
+                self.measure('cold (cache cleared)', user, prefixes, clear=True)
+                for prefix in prefixes:
+                    typeahead.suggest(user, 'equipment_name', prefix)
+                self.measure('warm (hot prefixes)', user, prefixes, clear=False)
+                raise Rollback
+        except Rollback:
+            pass
+        typeahead.cache.clear()
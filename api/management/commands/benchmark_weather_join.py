@@ -0,0 +1,142 @@
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.scoring import FarmArrays, compute_metrics, load_weather, weather_factors
+from api.weather_join import RAIN_CODES, WeatherIndex, day_numbers, farm_cells
+
+
+def build(farms, years, cells, harvests_per_year, seed=0):
+    """Synthetic farms with daily watering and daily weather on shared grid cells."""
+    rng = np.random.default_rng(seed)
+    days = int(years * 365.25)
+    first = np.datetime64('2020-01-01')
+    dates = first + np.arange(days)
+
+    # Farms spread over `cells` grid cells around the US corn belt.
+    cell_latitude = rng.uniform(38, 44, cells)
+    cell_longitude = rng.uniform(-96, -84, cells)
+    farm_cell = rng.integers(0, cells, farms)
+    farm_ids = np.arange(1, farms + 1)
+    arrays = FarmArrays(
+        farm_ids,
+        rng.uniform(10, 500, farms),
+        farm_cells(cell_latitude[farm_cell], cell_longitude[farm_cell]),
+        water={'idx': np.repeat(np.arange(farms), days), 'date': np.tile(dates, farms)},
+        harvest={
+            'idx': np.repeat(np.arange(farms), harvests_per_year * years),
+            'yield': rng.uniform(100, 5000, farms * harvests_per_year * years),
+            'date': first + np.sort(rng.integers(0, days, (farms, harvests_per_year * years)), axis=1).ravel(),
+        },
+        fertilizer={'idx': np.empty(0, dtype=np.int64), 'amount': np.empty(0), 'organic': np.empty(0, dtype=bool)},
+        soil={'idx': np.empty(0, dtype=np.int64), 'ph': np.empty(0), 'organic_matter': np.empty(0)},
+        emissions={'idx': np.empty(0, dtype=np.int64), 'co2': np.empty(0)},
+        sequestration={'idx': np.empty(0, dtype=np.int64), 'co2': np.empty(0)},
+        energy={'idx': np.empty(0, dtype=np.int64), 'amount': np.empty(0), 'renewable': np.empty(0, dtype=bool)},
+        fuel={'idx': np.empty(0, dtype=np.int64), 'gallons': np.empty(0), 'hours': np.empty(0)},
+    )
+
+    series_cells = np.unique(arrays.cells)
+    day_values = day_numbers(dates)
+    weather = {
+        'cells': np.repeat(series_cells, days),
+        'days': np.tile(day_values, len(series_cells)),
+        'weather_code': rng.choice([1, 3, 45, 61, 63, 71], len(series_cells) * days),
+        'temperature_max': rng.uniform(-5, 35, len(series_cells) * days),
+    }
+    return arrays, weather
+
+
+def naive_factors(arrays, weather, farms):
+    """
+    The browser's approach, per farm: scan the farm's weather series for
+    every activity date, parsing each series date as it goes.
+    """
+    series = {}
+    for cell, day, code, temperature in zip(*weather.values()):
+        series.setdefault(cell, []).append(
+            {'date': date.fromordinal(int(day)).isoformat(), 'code': code, 'temp': temperature}
+        )
+
+    def find(rows, day):
+        return next((row for row in rows if date.fromisoformat(row['date']) == day), None)
+
+    def rainy(row):
+        return row is not None and RAIN_CODES[0] <= row['code'] <= RAIN_CODES[1]
+
+    water, harvest = arrays.tables['water'], arrays.tables['harvest']
+    results = []
+    for farm in range(farms):
+        rows = series.get(arrays.cells[farm], [])
+        watered = water['date'][water['idx'] == farm]
+        factor = 1.0
+        if len(watered):
+            last = watered[-1].astype(object)
+            factor *= 0.5 if rainy(find(rows, last)) else 1.0
+            factor *= 0.7 if rainy(find(rows, last - timedelta(days=1))) else 1.0
+        rainy_harvests = sum(
+            rainy(find(rows, harvested.astype(object))) for harvested in harvest['date'][harvest['idx'] == farm]
+        )
+        results.append((factor, rainy_harvests))
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Measure the vectorized weather join behind the water and harvest scores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--farms', type=int, default=1000)
+        parser.add_argument('--years', type=int, default=5)
+        parser.add_argument('--cells', type=int, default=300, help='Distinct weather grid cells the farms share.')
+        parser.add_argument('--harvests-per-year', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--naive-farms', type=int, default=20, help='Farms timed with the per-farm scan.')
+        parser.add_argument('--database', action='store_true', help='Also time load + join + scoring on the database.')
+
+    def handle(self, *args, **options):
+        arrays, weather = build(
+            options['farms'], options['years'], options['cells'], options['harvests_per_year']
+        )
+        self.stdout.write(
+            f"{len(arrays)} farms, {len(arrays.tables['water']['idx'])} water rows, "
+            f"{len(arrays.tables['harvest']['idx'])} harvests, {len(weather['cells'])} weather rows"
+        )
+
+        index_timings, join_timings = [], []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            index = WeatherIndex.from_columns(**weather)
+            index_timings.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            water_factor, rainy_harvests = weather_factors(arrays, index)
+            join_timings.append(time.perf_counter() - started)
+        self.stdout.write(f"build index: best {min(index_timings) * 1000:.1f} ms")
+        self.stdout.write(f"join, all farms: best {min(join_timings) * 1000:.1f} ms")
+
+        sample = min(options['naive_farms'], len(arrays))
+        started = time.perf_counter()
+        naive = naive_factors(arrays, weather, sample)
+        naive_seconds = time.perf_counter() - started
+        # The per-farm scan ignores temperature, so compare rain effects only.
+        assert [count for _, count in naive] == list(rainy_harvests[:sample])
+        per_farm = naive_seconds / sample
+        self.stdout.write(
+            f"per-farm scan: {per_farm * 1000:.1f} ms/farm, about {per_farm * len(arrays):.1f} s for all farms "
+            f"({per_farm * len(arrays) / (min(index_timings) + min(join_timings)):.0f}x slower)"
+        )
+
+        if options['database']:
+            started = time.perf_counter()
+            loaded = FarmArrays.load()
+            load_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            stored = load_weather(loaded)
+            weather_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            compute_metrics(loaded, stored)
+            self.stdout.write(
+                f"database ({len(loaded)} farms, {len(stored)} weather rows): load {load_seconds * 1000:.1f} ms, "
+                f"weather {weather_seconds * 1000:.1f} ms, score {(time.perf_counter() - started) * 1000:.1f} ms"
+            )
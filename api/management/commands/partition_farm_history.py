@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.partitioning import DEFAULT_PARTITIONS, PARTITIONED_MODELS, partition_statements
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the farm history tables as PostgreSQL hash partitions on owner_id '
+        '(see api/partitioning.py). Tables that are already partitioned are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=DEFAULT_PARTITIONS)
+        parser.add_argument('--sql', action='store_true', help='Print the statements instead of running them.')
+
+    def is_partitioned(self, cursor, table):
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass', [table])
+        return cursor.fetchone()[0] == 'p'
+
+    def definitions(self, cursor, table):
+        cursor.execute(
+            'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+            'WHERE indrelid = %s::regclass AND NOT indisprimary ORDER BY indexrelid',
+            [table],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f' ORDER BY conname",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(
+            'SELECT pg_get_triggerdef(oid) FROM pg_trigger '
+            'WHERE tgrelid = %s::regclass AND NOT tgisinternal ORDER BY tgname',
+            [table],
+        )
+        return indexes, foreign_keys, [row[0] for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'Partitioning needs PostgreSQL, not {connection.vendor}.')
+        if options['partitions'] < 2:
+            raise CommandError('--partitions must be at least 2.')
+
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+            with transaction.atomic(), connection.cursor() as cursor:
+                if self.is_partitioned(cursor, table):
+                    self.stdout.write(f'{table}: already partitioned')
+                    continue
+                if model.objects.filter(owner__isnull=True).exists():
+                    raise CommandError(f'{table} has rows without an owner; run migrations first.')
+                statements = partition_statements(table, options['partitions'], *self.definitions(cursor, table))
+                if options['sql']:
+                    self.stdout.write(';\n'.join(statements) + ';\n')
+                    continue
+                for statement in statements:
+                    cursor.execute(statement)
+            self.stdout.write(self.style.SUCCESS(f"{table}: {options['partitions']} partitions"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.authentication import expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete auth tokens older than AUTH_TOKEN_TTL.'
+
+    def handle(self, *args, **options):
+        deleted, _ = expired_tokens().delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tokens"))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute FarmMetricsRollup rows from the tracker tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('farm_ids', nargs='*', type=int, help='Only rebuild these farms (default: all).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_rollups(options['farm_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} farm rollups in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,25 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import JobWorker, POLL_INTERVAL
+
+
+class Command(BaseCommand):
+    help = 'Run queued background import/export jobs from a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, help='Jobs run at once (default: CPU count).')
+        parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty.')
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+        worker = JobWorker(processes=options['processes'], poll_interval=options['poll_interval'])
+        # Finish the jobs in flight before exiting on docker stop / Ctrl-C.
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Job worker started with {worker.processes} processes")
+        worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS('Job worker stopped'))
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import Farm
+from api.weather import FORECAST_DAYS, PROVISIONAL_DAYS, ensure_cells, grid_cell
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch daily weather for every farm's grid cell. By default refreshes the "
+        "provisional days and the forecast; run daily, or with --start to backfill history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First date (YYYY-MM-DD).')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options['start'] or today - timedelta(days=PROVISIONAL_DAYS)
+        end = options['end'] or today + timedelta(days=FORECAST_DAYS - 1)
+        if end < start:
+            raise CommandError('--end is before --start')
+
+        located = Farm.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        cells = {grid_cell(lat, lon) for lat, lon in located.values_list('latitude', 'longitude')}
+        fetched = ensure_cells(cells, start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(cells)} grid cells for {located.count()} farms, {start} to {end}: fetched {fetched} days"
+        ))
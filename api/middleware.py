@@ -0,0 +1,132 @@
+# api/middleware.py
+import cProfile
+import logging
+import random
+import re
+from contextlib import ExitStack
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .compression import DecompressedTooLarge, DecompressionError, decompress, request_encodings
+from .profiling import RequestProfile, SlowRequestThreshold, profiling, server_timing
+
+logger = logging.getLogger('api.profiling')
+
+# Upper bound on the size of a decompressed request body, to refuse
+# compression bombs. The compressed body itself is still subject to
+# DATA_UPLOAD_MAX_MEMORY_SIZE.
+DEFAULT_MAX_DECOMPRESSED_BODY_SIZE = 64 * 1024 * 1024
+
+
+class DecompressRequestMiddleware:
+    """
+    Accept request bodies sent with ``Content-Encoding: gzip``, ``deflate``
+    or (when zstandard is installed) ``zstd``.
+
+    The body is decompressed before any view or parser reads it, so DRF sees
+    a plain request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_size = getattr(settings, 'MAX_DECOMPRESSED_BODY_SIZE', DEFAULT_MAX_DECOMPRESSED_BODY_SIZE)
+
+    def __call__(self, request):
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding and encoding != 'identity':
+            if encoding not in request_encodings():
+                return HttpResponse(f"Unsupported Content-Encoding: {encoding}", status=415)
+            try:
+                body = decompress(request.body, encoding, max_size=self.max_size)
+            except DecompressedTooLarge as e:
+                return HttpResponse(str(e), status=413)
+            except DecompressionError as e:
+                return HttpResponse(f"Could not decompress request body: {e}", status=400)
+            request._body = body
+            request._stream = BytesIO(body)
+            request.META['CONTENT_LENGTH'] = str(len(body))
+            del request.META['HTTP_CONTENT_ENCODING']
+        return self.get_response(request)
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in request instrumentation, enabled with REQUEST_PROFILING.
+
+    Every request gets a ``Server-Timing`` header (total time, database time
+    and query count, serializer and JSON render time) and one
+    ``api.profiling`` log line with the same numbers and the response size.
+    Requests among the slowest REQUEST_PROFILING_SLOW_PERCENT are logged at
+    WARNING, the rest at INFO.
+
+    A REQUEST_PROFILING_SAMPLE_RATE fraction of requests also runs under
+    cProfile. The dump is kept in REQUEST_PROFILING_DIR only when the request
+    turns out to be slow, so the directory collects the slow tail without
+    profiling every request.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0.0)
+        self.slow = SlowRequestThreshold(getattr(settings, 'REQUEST_PROFILING_SLOW_PERCENT', 1))
+        self.dump_dir = Path(getattr(settings, 'REQUEST_PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+        self.allowed_origins = set(getattr(settings, 'CORS_ALLOWED_ORIGINS', []))
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        profiler = cProfile.Profile() if self.sample_rate and random.random() < self.sample_rate else None
+        with profiling(profile), ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile.record_query))
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:  # another profiler is active in this process
+                    profiler = None
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        total = profile.elapsed()
+        slow = self.slow.add(total)
+
+        response['Server-Timing'] = server_timing(profile, total)
+        origin = request.headers.get('Origin')
+        if origin in self.allowed_origins:
+            # Lets the frontend read the timings cross-origin.
+            response['Timing-Allow-Origin'] = origin
+        size = None if response.streaming else len(response.content)
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            'request method=%s path=%s status=%s duration_ms=%.1f db_queries=%d db_ms=%.1f serialize_ms=%.1f '
+            'render_ms=%.1f bytes=%s',
+            request.method, request.path, response.status_code, total * 1000, profile.queries,
+            profile.timings['db'] * 1000, profile.timings['serialize'] * 1000, profile.timings['render'] * 1000, size,
+            extra={'profile': {
+                'method': request.method, 'path': request.path, 'status': response.status_code,
+                'duration_ms': total * 1000, 'db_queries': profile.queries,
+                **{f'{name}_ms': seconds * 1000 for name, seconds in profile.timings.items()},
+                'bytes': size, 'slow': slow,
+            }},
+        )
+        if profiler is not None and slow:
+            self.dump(profiler, request, total)
+        return response
+
+    def dump(self, profiler, request, total):
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        path = self.dump_dir / f"{timezone.now():%Y%m%dT%H%M%S%f}-{request.method}-{slug[:80]}-{total * 1000:.0f}ms.prof"
+        try:
+            self.dump_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError as e:
+            logger.warning('Could not write profile %s: %s', path, e)
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_userlocalstorage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userlocalstorage",
+            name="key_revisions",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="userlocalstorage",
+            name="removed_keys",
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="userlocalstorage",
+            name="revision",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:03
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def content_hash(value):
+    # Same digest as api.sync.content_hash, frozen here for the migration.
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def blob_to_entries(apps, schema_editor):
+    UserLocalStorage = apps.get_model('api', 'UserLocalStorage')
+    LocalStorageEntry = apps.get_model('api', 'LocalStorageEntry')
+    for storage in UserLocalStorage.objects.iterator():
+        entries = [
+            LocalStorageEntry(
+                user_id=storage.user_id, key=key, value=value,
+                content_hash=content_hash(value),
+                revision=storage.key_revisions.get(key, storage.revision),
+            )
+            for key, value in (storage.data or {}).items()
+        ]
+        entries += [
+            LocalStorageEntry(user_id=storage.user_id, key=key, value=None, deleted=True, revision=revision)
+            for key, revision in (storage.removed_keys or {}).items()
+            if key not in storage.data
+        ]
+        LocalStorageEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+def entries_to_blob(apps, schema_editor):
+    UserLocalStorage = apps.get_model('api', 'UserLocalStorage')
+    LocalStorageEntry = apps.get_model('api', 'LocalStorageEntry')
+    for storage in UserLocalStorage.objects.iterator():
+        entries = LocalStorageEntry.objects.filter(user_id=storage.user_id)
+        storage.data = {}
+        storage.key_revisions = {}
+        storage.removed_keys = {}
+        for key, value, revision, deleted in entries.values_list('key', 'value', 'revision', 'deleted'):
+            if deleted:
+                storage.removed_keys[key] = revision
+            else:
+                storage.data[key] = value
+                storage.key_revisions[key] = revision
+        storage.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_localstorage_revisions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocalStorageEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('value', models.JSONField(null=True)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('revision', models.PositiveIntegerField(default=0)),
+                ('deleted', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='local_storage_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Local Storage Entries',
+                'db_table': 'user_local_storage_entries',
+                'indexes': [models.Index(fields=['user', 'revision'], name='ls_entry_user_revision_idx')],
+                'unique_together': {('user', 'key')},
+            },
+        ),
+        migrations.RunPython(blob_to_entries, entries_to_blob),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_localstorageentry'),
+    ]
+
+    operations = [
+        # Give the blob a default first so unapplying can re-add the column.
+        migrations.AlterField(
+            model_name='userlocalstorage',
+            name='data',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RemoveField(
+            model_name='userlocalstorage',
+            name='data',
+        ),
+        migrations.RemoveField(
+            model_name='userlocalstorage',
+            name='key_revisions',
+        ),
+        migrations.RemoveField(
+            model_name='userlocalstorage',
+            name='removed_keys',
+        ),
+    ]
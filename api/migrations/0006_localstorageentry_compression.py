@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_remove_userlocalstorage_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localstorageentry',
+            name='compressed_value',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='localstorageentry',
+            name='compression',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-17 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_localstorageentry_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FarmMetricsRollup',
+            fields=[
+                ('farm', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metrics_rollup', serialize=False, to='api.farm')),
+                ('emissions_co2', models.FloatField(default=0)),
+                ('sequestered_co2', models.FloatField(default=0)),
+                ('fuel_gallons', models.FloatField(default=0)),
+                ('fuel_hours', models.FloatField(default=0)),
+                ('fuel_cost', models.FloatField(default=0)),
+                ('energy_amount', models.FloatField(default=0)),
+                ('renewable_energy_amount', models.FloatField(default=0)),
+                ('energy_cost', models.FloatField(default=0)),
+                ('soil_record_count', models.IntegerField(default=0)),
+                ('soil_ph_total', models.FloatField(default=0)),
+                ('soil_organic_matter_total', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'farm_metrics_rollups',
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.0.14 on 2026-10-17 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_farmmetricsrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emissionsource',
+            index=models.Index(fields=['farm', 'date', 'co2_equivalent'], name='emission_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='energyrecord',
+            index=models.Index(fields=['farm', 'date', 'renewable', 'amount', 'cost'], name='energy_rec_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fertilizerhistory',
+            index=models.Index(fields=['farm', 'date'], name='fert_hist_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelrecord',
+            index=models.Index(fields=['farm', 'date', 'gallons', 'hours_operated', 'cost'], name='fuel_rec_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='harvesthistory',
+            index=models.Index(fields=['farm', 'date', 'yield_amount'], name='harvest_hist_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sequestrationactivity',
+            index=models.Index(fields=['farm', 'date', 'co2_sequestered'], name='sequestration_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='soilrecord',
+            index=models.Index(fields=['farm', 'date', 'ph', 'organic_matter'], name='soil_rec_farm_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterhistory',
+            index=models.Index(fields=['farm', 'date'], name='water_hist_farm_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='emissionsource',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='emission_sources', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='energyrecord',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='energy_records', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='fertilizerhistory',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='fertilizer_history', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='fuelrecord',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='fuel_records', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='harvesthistory',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='harvest_history', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='sequestrationactivity',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sequestration_activities', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='soilrecord',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='soil_records', to='api.farm'),
+        ),
+        migrations.AlterField(
+            model_name='waterhistory',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='water_history', to='api.farm'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell_latitude', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('cell_longitude', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('date', models.DateField()),
+                ('temperature_max', models.FloatField(null=True)),
+                ('temperature_min', models.FloatField(null=True)),
+                ('precipitation', models.FloatField(null=True)),
+                ('weather_code', models.PositiveSmallIntegerField(null=True)),
+                ('source', models.CharField(max_length=50)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'weather_observations',
+            },
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='weatherobservation',
+            constraint=models.UniqueConstraint(fields=('cell_latitude', 'cell_longitude', 'date'), name='weather_cell_date_uniq'),
+        ),
+    ]
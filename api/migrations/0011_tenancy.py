@@ -0,0 +1,200 @@
+# Generated by Django 5.0.14 on 2026-10-17 22:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+OWNED_MODELS = [
+    'Farm', 'WaterHistory', 'FertilizerHistory', 'HarvestHistory', 'Task', 'Issue', 'CropPlanEvent',
+    'PlanItem', 'FuelRecord', 'SoilRecord', 'EmissionSource', 'SequestrationActivity', 'EnergyRecord',
+    'Livestock',
+]
+
+
+def assign_existing_rows(apps, schema_editor):
+    # Until now the data was shared by every account; hand it to the first
+    # superuser (or the first user) so it stays visible to someone. Without
+    # any user the rows keep a NULL owner and are reachable only in admin.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    owner = User.objects.order_by('-is_superuser', 'id').first()
+    if owner is None:
+        return
+    for name in OWNED_MODELS:
+        apps.get_model('api', name).objects.filter(owner__isnull=True).update(owner=owner)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_weather_observations'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='emissionsource',
+            name='emission_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='energyrecord',
+            name='energy_rec_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fertilizerhistory',
+            name='fert_hist_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='fuelrecord',
+            name='fuel_rec_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='harvesthistory',
+            name='harvest_hist_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sequestrationactivity',
+            name='sequestration_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='soilrecord',
+            name='soil_rec_farm_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='waterhistory',
+            name='water_hist_farm_date_idx',
+        ),
+        migrations.AddField(
+            model_name='cropplanevent',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='emissionsource',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='energyrecord',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='farm',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='fertilizerhistory',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='fuelrecord',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='harvesthistory',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='livestock',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='planitem',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='sequestrationactivity',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='soilrecord',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='waterhistory',
+            name='owner',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='livestock',
+            name='farm',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='livestock', to='api.farm'),
+        ),
+        migrations.AddIndex(
+            model_name='cropplanevent',
+            index=models.Index(fields=['owner', 'date'], name='crop_event_owner_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emissionsource',
+            index=models.Index(fields=['owner', 'farm', 'date', 'co2_equivalent'], name='emission_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='energyrecord',
+            index=models.Index(fields=['owner', 'farm', 'date', 'renewable', 'amount', 'cost'], name='energy_rec_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farm',
+            index=models.Index(fields=['owner', 'id'], name='farm_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fertilizerhistory',
+            index=models.Index(fields=['owner', 'farm', 'date'], name='fert_hist_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fuelrecord',
+            index=models.Index(fields=['owner', 'farm', 'date', 'gallons', 'hours_operated', 'cost'], name='fuel_rec_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='harvesthistory',
+            index=models.Index(fields=['owner', 'farm', 'date', 'yield_amount'], name='harvest_hist_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['owner', 'id'], name='issue_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='livestock',
+            index=models.Index(fields=['owner', 'farm'], name='livestock_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='planitem',
+            index=models.Index(fields=['owner', 'plan_type', 'id'], name='plan_item_owner_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sequestrationactivity',
+            index=models.Index(fields=['owner', 'farm', 'date', 'co2_sequestered'], name='sequestration_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='soilrecord',
+            index=models.Index(fields=['owner', 'farm', 'date', 'ph', 'organic_matter'], name='soil_rec_owner_farm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'due_date', 'id'], name='task_owner_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterhistory',
+            index=models.Index(fields=['owner', 'farm', 'date'], name='water_hist_owner_farm_idx'),
+        ),
+        # After the schema changes: on PostgreSQL, altering a table with
+        # pending deferred FK checks from the UPDATE would fail.
+        migrations.RunPython(assign_existing_rows, migrations.RunPython.noop),
+    ]
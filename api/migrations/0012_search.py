@@ -0,0 +1,108 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:05
+
+from django.db import migrations
+
+# Searched tables and their text columns as of this migration; the first
+# column is weighted highest. Mirrors api.search.SEARCHABLE. The SQL below is
+# frozen here so later changes to api/search.py cannot change this migration.
+SEARCH_COLUMNS = {
+    'tasks': ('title',),
+    'issues': ('title',),
+    'plan_items': ('description',),
+    'crop_plan_events': ('title',),
+    'fuel_records': ('equipment_name', 'notes'),
+    'soil_records': ('location', 'notes'),
+    'emission_sources': ('source_type', 'description', 'notes'),
+    'sequestration_activities': ('activity_type', 'description', 'notes'),
+    'energy_records': ('purpose', 'energy_type', 'notes'),
+}
+
+
+def vector(fields, prefix=''):
+    return ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({prefix}{field}, '')), '{'A' if position == 0 else 'B'}')"
+        for position, field in enumerate(fields)
+    )
+
+
+def postgres_statements(table, fields):
+    """Add, backfill and index ``table.search_vector`` and the trigger that maintains it."""
+    return [
+        f'ALTER TABLE {table} ADD COLUMN search_vector tsvector',
+        f'CREATE FUNCTION {table}_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$ '
+        f'BEGIN NEW.search_vector := {vector(fields, "NEW.")}; RETURN NEW; END $$',
+        f'CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {", ".join(fields)} ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()',
+        f'UPDATE {table} SET search_vector = {vector(fields)}',
+        f'CREATE INDEX {table}_search_idx ON {table} USING GIN (search_vector)',
+    ]
+
+
+def postgres_drop_statements(table):
+    return [
+        f'DROP TRIGGER IF EXISTS {table}_search_vector ON {table}',
+        f'DROP FUNCTION IF EXISTS {table}_search_vector()',
+        f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector',
+    ]
+
+
+def sqlite_statements(table, fields):
+    """Create and fill ``<table>_fts`` and the triggers that keep it in step with ``table``."""
+    fts = f'{table}_fts'
+    columns = ', '.join(fields)
+    new = ', '.join(f'new.{field}' for field in fields)
+    old = ', '.join(f'old.{field}' for field in fields)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table}', content_rowid='id', "
+        f"tokenize='porter unicode61')",
+        f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN '
+        f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END',
+        f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+        f'CREATE TRIGGER {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def sqlite_drop_statements(table):
+    fts = f'{table}_fts'
+    return [
+        *(f'DROP TRIGGER IF EXISTS {fts}_{event}' for event in ('insert', 'delete', 'update')),
+        f'DROP TABLE IF EXISTS {fts}',
+    ]
+
+
+def run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement, params=None)
+
+
+def add_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fields in SEARCH_COLUMNS.items():
+        if vendor == 'postgresql':
+            run(schema_editor, postgres_statements(table, fields))
+        elif vendor == 'sqlite':
+            run(schema_editor, sqlite_statements(table, fields))
+
+
+def remove_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in SEARCH_COLUMNS:
+        if vendor == 'postgresql':
+            run(schema_editor, postgres_drop_statements(table))
+        elif vendor == 'sqlite':
+            run(schema_editor, sqlite_drop_statements(table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_tenancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search, remove_search),
+    ]
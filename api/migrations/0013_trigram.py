@@ -0,0 +1,44 @@
+# Generated by Django 5.0.14 on 2026-10-17 23:40
+
+from django.db import migrations
+
+# Columns searched with icontains by the typeahead endpoint and the admin.
+# The index expression matches what Django emits for icontains on
+# PostgreSQL, UPPER(col::text) LIKE UPPER(%s), so the planner can use it.
+TRIGRAM_COLUMNS = [
+    ('farms', 'name'),
+    ('farms', 'crop'),
+    ('fuel_records', 'equipment_name'),
+    ('fuel_records', 'fuel_type'),
+    ('energy_records', 'energy_type'),
+    ('energy_records', 'purpose'),
+]
+
+
+def add_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm', params=None)
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX {table}_{column}_trgm_idx ON {table} USING GIN ((UPPER({column}::text)) gin_trgm_ops)',
+            params=None,
+        )
+
+
+def remove_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in TRIGRAM_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm_idx', params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_trigram_indexes, remove_trigram_indexes),
+    ]
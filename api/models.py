@@ -2,96 +2,158 @@
 # your_app/models.py
 from django.db import models
 from django.contrib.auth.models import User # Standard User model
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+class OwnedQuerySet(models.QuerySet):
+    """
+    Rows of the farm data tables belong to one user (their tenant). API code
+    reads them through ``Model.objects.for_owner(user)``; the unscoped
+    queryset is left for admin, migrations and cross-tenant jobs.
+    """
+
+    def for_owner(self, owner):
+        return self.filter(owner=owner)
+
+
+def owner_field():
+    # Denormalised onto every table, farm children included, so tenant-wide
+    # reads and deletes filter on an indexed leading column without joining
+    # farms. Nullable only so existing rows can be migrated.
+    return models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', null=True, db_index=False)
+
 
 class Farm(models.Model):
     id = models.AutoField(primary_key=True)
+    owner = owner_field()
     name = models.CharField(max_length=100)
     size = models.CharField(max_length=50)
     crop = models.CharField(max_length=100)
     soil_type = models.CharField(max_length=50, blank=True)
     slope_ratio = models.FloatField(blank=True, null=True)
+    # Location, used to look up weather for the farm's grid cell (api/weather.py).
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+
+    objects = OwnedQuerySet.as_manager()
 
     class Meta:
         db_table = 'farms'
+        indexes = [models.Index(fields=['owner', 'id'], name='farm_owner_idx')]
 
     def __str__(self):
         return self.name
 
 class WaterHistory(models.Model):
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='water_history')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='water_history', db_index=False)
     amount = models.IntegerField()
     date = models.DateField()
     efficiency = models.IntegerField()
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'water_history'
+        # Every time-series table gets an (owner, farm, date) index in place
+        # of the plain FK index, so one tenant's rows are one index range and
+        # a farm's rows a sub-range of it. Where rollups or scoring read a few
+        # value columns, they are appended so those reads can be answered
+        # from the index.
+        indexes = [models.Index(fields=['owner', 'farm', 'date'], name='water_hist_owner_farm_idx')]
 
 class FertilizerHistory(models.Model):
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='fertilizer_history')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='fertilizer_history', db_index=False)
     type = models.CharField(max_length=50)
     amount = models.IntegerField()
     date = models.DateField()
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'fertilizer_history'
+        indexes = [models.Index(fields=['owner', 'farm', 'date'], name='fert_hist_owner_farm_idx')]
 
 class HarvestHistory(models.Model):
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='harvest_history')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='harvest_history', db_index=False)
     yield_amount = models.IntegerField()
     date = models.DateField()
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'harvest_history'
+        indexes = [models.Index(fields=['owner', 'farm', 'date', 'yield_amount'], name='harvest_hist_owner_farm_idx')]
 
 class Task(models.Model):
     id = models.AutoField(primary_key=True)
+    owner = owner_field()
     title = models.CharField(max_length=200)
     due_date = models.DateField()
     priority = models.CharField(max_length=20)
     completed = models.BooleanField(default=False)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'tasks'
+        indexes = [models.Index(fields=['owner', 'due_date', 'id'], name='task_owner_due_idx')]
 
     def __str__(self):
         return self.title
 
 class Issue(models.Model):
     id = models.AutoField(primary_key=True)
+    owner = owner_field()
     title = models.CharField(max_length=200)
     status = models.CharField(max_length=50)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'issues'
+        indexes = [models.Index(fields=['owner', 'id'], name='issue_owner_idx')]
 
     def __str__(self):
         return self.title
 
 class CropPlanEvent(models.Model):
     id = models.AutoField(primary_key=True)
+    owner = owner_field()
     title = models.CharField(max_length=200, blank=True)
     date = models.DateField()
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'crop_plan_events'
+        indexes = [models.Index(fields=['owner', 'date'], name='crop_event_owner_date_idx')]
 
     def __str__(self):
         return self.title
 
 class PlanItem(models.Model):
     id = models.AutoField(primary_key=True)
+    owner = owner_field()
     plan_type = models.CharField(max_length=50)
     description = models.TextField(blank=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'plan_items'
+        indexes = [models.Index(fields=['owner', 'plan_type', 'id'], name='plan_item_owner_type_idx')]
 
     def __str__(self):
         return f"{self.plan_type}: {self.description[:50]}"
 
 class FuelRecord(models.Model):
     id = models.AutoField(primary_key=True)
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='fuel_records')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='fuel_records', db_index=False)
     date = models.DateField()
     equipment_name = models.CharField(max_length=100)
     fuel_type = models.CharField(max_length=50)
@@ -100,12 +162,16 @@ class FuelRecord(models.Model):
     cost = models.FloatField()
     notes = models.TextField(blank=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'fuel_records'
+        indexes = [models.Index(fields=['owner', 'farm', 'date', 'gallons', 'hours_operated', 'cost'], name='fuel_rec_owner_farm_idx')]
 
 class SoilRecord(models.Model):
     id = models.AutoField(primary_key=True)
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='soil_records')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='soil_records', db_index=False)
     date = models.DateField()
     location = models.CharField(max_length=100)
     ph = models.FloatField()
@@ -116,27 +182,35 @@ class SoilRecord(models.Model):
     moisture = models.FloatField()
     notes = models.TextField(blank=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'soil_records'
+        indexes = [models.Index(fields=['owner', 'farm', 'date', 'ph', 'organic_matter'], name='soil_rec_owner_farm_idx')]
 
 class EmissionSource(models.Model):
     id = models.AutoField(primary_key=True)
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='emission_sources')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='emission_sources', db_index=False)
     date = models.DateField()
     source_type = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     co2_equivalent = models.FloatField()
     notes = models.TextField(blank=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'emission_sources'
+        indexes = [models.Index(fields=['owner', 'farm', 'date', 'co2_equivalent'], name='emission_owner_farm_idx')]
 
     def __str__(self):
         return f"{self.source_type} - {self.co2_equivalent} CO2e"
 
 class SequestrationActivity(models.Model):
     id = models.AutoField(primary_key=True)
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='sequestration_activities')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='sequestration_activities', db_index=False)
     date = models.DateField()
     activity_type = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -144,15 +218,19 @@ class SequestrationActivity(models.Model):
     area = models.FloatField()
     notes = models.TextField(blank=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'sequestration_activities'
+        indexes = [models.Index(fields=['owner', 'farm', 'date', 'co2_sequestered'], name='sequestration_owner_farm_idx')]
 
     def __str__(self):
         return f"{self.activity_type} - {self.co2_sequestered} CO2 sequestered"
 
 class EnergyRecord(models.Model):
     id = models.AutoField(primary_key=True)
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='energy_records')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='energy_records', db_index=False)
     date = models.DateField()
     energy_type = models.CharField(max_length=50)
     amount = models.FloatField()
@@ -162,32 +240,168 @@ class EnergyRecord(models.Model):
     purpose = models.CharField(max_length=100)
     notes = models.TextField(blank=True)
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'energy_records'
+        indexes = [models.Index(fields=['owner', 'farm', 'date', 'renewable', 'amount', 'cost'], name='energy_rec_owner_farm_idx')]
 
     def __str__(self):
         return f"{self.energy_type} - {self.amount} {self.unit}"
 
 class Livestock(models.Model):
     id = models.AutoField(primary_key=True)
-    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='livestock')
+    owner = owner_field()
+    farm = models.ForeignKey(Farm, on_delete=models.CASCADE, related_name='livestock', db_index=False)
     type = models.CharField(max_length=50)
     count = models.IntegerField()
 
+    objects = OwnedQuerySet.as_manager()
+
     class Meta:
         db_table = 'livestock'
+        indexes = [models.Index(fields=['owner', 'farm'], name='livestock_owner_farm_idx')]
 
     def __str__(self):
         return f"{self.type} ({self.count})"
 
+class FarmMetricsRollup(models.Model):
+    # Running per-farm totals over the tracker tables, kept current by the
+    # signal handlers in api/signals.py. Rebuild with
+    # `manage.py rebuild_farm_rollups`.
+    farm = models.OneToOneField(Farm, on_delete=models.CASCADE, primary_key=True, related_name='metrics_rollup')
+    emissions_co2 = models.FloatField(default=0)
+    sequestered_co2 = models.FloatField(default=0)
+    fuel_gallons = models.FloatField(default=0)
+    fuel_hours = models.FloatField(default=0)
+    fuel_cost = models.FloatField(default=0)
+    energy_amount = models.FloatField(default=0)
+    renewable_energy_amount = models.FloatField(default=0)
+    energy_cost = models.FloatField(default=0)
+    soil_record_count = models.IntegerField(default=0)
+    soil_ph_total = models.FloatField(default=0)
+    soil_organic_matter_total = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'farm_metrics_rollups'
+
+    def __str__(self):
+        return f"Metrics for farm {self.farm_id}"
+
+    @property
+    def net_carbon_footprint(self):
+        return self.emissions_co2 - self.sequestered_co2
+
+    @property
+    def renewable_share(self):
+        return self.renewable_energy_amount / self.energy_amount if self.energy_amount else 0.0
+
+    @property
+    def average_soil_ph(self):
+        return self.soil_ph_total / self.soil_record_count if self.soil_record_count else None
+
+    @property
+    def average_organic_matter(self):
+        return self.soil_organic_matter_total / self.soil_record_count if self.soil_record_count else None
+
 class UserLocalStorage(models.Model):
+    # Per-user sync header; the keys themselves live in LocalStorageEntry.
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='local_storage_data') # Changed related_name to avoid potential clash
-    data = models.JSONField()
     last_updated = models.DateTimeField(auto_now=True)
+    # Bumped on every save or patch that changes at least one key.
+    revision = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"LocalStorage for {self.user.username}"
 
     class Meta:
         db_table = 'user_local_storage'
-        verbose_name_plural = "User Local Storage Data"
\ No newline at end of file
+        verbose_name_plural = "User Local Storage Data"
+
+class LocalStorageEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='local_storage_entries')
+    key = models.CharField(max_length=255)
+    value = models.JSONField(null=True)
+    # Large values are stored compressed in compressed_value instead of value;
+    # compression names the codec ('' for plain JSON in value).
+    compressed_value = models.BinaryField(null=True)
+    compression = models.CharField(max_length=8, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True)
+    # Revision that last set or removed this key; removed keys are kept as
+    # tombstones so clients that are behind can be told to delete them.
+    revision = models.PositiveIntegerField(default=0)
+    deleted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.key}"
+
+    class Meta:
+        db_table = 'user_local_storage_entries'
+        unique_together = ('user', 'key')
+        indexes = [models.Index(fields=['user', 'revision'], name='ls_entry_user_revision_idx')]
+        verbose_name_plural = "Local Storage Entries"
+
+
+class WeatherObservation(models.Model):
+    # Daily weather for one grid cell (cell_latitude/cell_longitude are the
+    # cell's snapped coordinates), shared by every farm inside it.
+    cell_latitude = models.DecimalField(max_digits=6, decimal_places=2)
+    cell_longitude = models.DecimalField(max_digits=6, decimal_places=2)
+    date = models.DateField()
+    temperature_max = models.FloatField(null=True)  # °C
+    temperature_min = models.FloatField(null=True)  # °C
+    precipitation = models.FloatField(null=True)  # mm
+    weather_code = models.PositiveSmallIntegerField(null=True)  # WMO code
+    source = models.CharField(max_length=50)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'weather_observations'
+        constraints = [
+            models.UniqueConstraint(fields=['cell_latitude', 'cell_longitude', 'date'], name='weather_cell_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.cell_latitude},{self.cell_longitude} {self.date}"
+
+def job_file_storage():
+    return FileSystemStorage(location=settings.JOB_FILES_ROOT)
+
+class Job(models.Model):
+    # Background import/export run by `manage.py run_job_worker`; see api/jobs.py.
+    IMPORT = 'import'
+    EXPORT = 'export'
+    KIND_CHOICES = [(IMPORT, 'Import'), (EXPORT, 'Export')]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    options = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to='input/', storage=job_file_storage, blank=True)
+    result_file = models.FileField(upload_to='results/', storage=job_file_storage, blank=True)
+    # Rows processed so far per table, e.g. {"farms": 1000, "water_history": 52000}.
+    progress = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.JSONField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs; a stale heartbeat means
+    # the worker died and the job can be picked up again.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} ({self.status})"
+
+    class Meta:
+        db_table = 'jobs'
+        indexes = [models.Index(fields=['status', 'id'], name='job_status_idx')]
@@ -0,0 +1,113 @@
+# api/pagination.py
+"""
+Keyset pagination over a composite ordering such as ``(date, id)``.
+
+DRF's CursorPagination positions on the first ordering field only and falls
+back to an offset among rows that share its value, so on a farm with many
+records per day later pages get slower. Here the cursor carries the full key
+of the boundary row and each page is a single indexed range query:
+
+    WHERE date >= :d AND (date > :d OR id > :id) ORDER BY date, id LIMIT n
+
+The redundant ``date >= :d`` term lets the database turn the condition into
+an index range scan. Page N costs the same as page 1.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _after(fields, values, reverse):
+    """Rows strictly after ``values`` in ``fields`` order (before, if ``reverse``)."""
+    op = 'lt' if reverse else 'gt'
+    first, rest = fields[0], fields[1:]
+    if not rest:
+        return Q(**{f'{first}__{op}': values[0]})
+    later = Q(**{f'{first}__{op}': values[0]}) | (Q(**{first: values[0]}) & _after(rest, values[1:], reverse))
+    return Q(**{f'{first}__{op}e': values[0]}) & later
+
+
+class KeysetPagination(BasePagination):
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    # Used when the view does not set ``ordering``; the last field must be unique.
+    ordering = ('id',)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def encode_cursor(self, row, reverse):
+        key = [self._key_value(row, field) for field in self.ordering]
+        payload = json.dumps({'k': key, 'r': reverse}, separators=(',', ':')).encode()
+        token = base64.urlsafe_b64encode(payload).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def _key_value(self, row, field):
+        # Rows are model instances or, on the values() fast path, dicts.
+        value = row[field] if isinstance(row, dict) else getattr(row, field)
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            key, reverse = payload['k'], bool(payload['r'])
+            if len(key) != len(self.ordering):
+                raise ValueError
+            values = [model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, key)]
+        except (binascii.Error, DjangoValidationError, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = tuple(getattr(view, 'ordering', None) or self.ordering)
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        page_size = self.get_page_size(request)
+        key, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = [f'-{field}' if reverse else field for field in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(_after(self.ordering, key, reverse))
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        # Forward pages always have a way back once a cursor was followed;
+        # reverse pages always have a way forward.
+        has_next = has_more if not reverse else key is not None
+        has_previous = has_more if reverse else key is not None
+        self.next_link = self.encode_cursor(rows[-1], False) if has_next and rows else None
+        self.previous_link = self.encode_cursor(rows[0], True) if has_previous and rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.next_link, 'previous': self.previous_link, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,80 @@
+# api/partitioning.py
+"""
+PostgreSQL hash partitioning of the farm history tables by owner.
+
+Every history row carries ``owner_id`` (see ``owner_field`` in
+api/models.py), so these tables can be split into ``PARTITION BY HASH
+(owner_id)`` partitions. Per-tenant reads, imports and deletes then touch
+only one partition and its indexes. Hash rather than list partitioning is
+used because tenants are created at signup and a list scheme would need a
+new partition for each one.
+
+``partition_statements`` builds the SQL for one table from its current
+index and foreign key definitions. The partition_farm_history command
+reads those from the catalog and runs the statements. The table keeps its
+name, columns, indexes and foreign keys. What changes:
+
+* the primary key becomes ``(id, owner_id)``, since unique constraints
+  on a partitioned table must include the partition key;
+* ``owner_id`` becomes NOT NULL;
+* ``id`` is fed by a plain sequence instead of an identity column, since
+  partitioned tables cannot have identity columns before PostgreSQL 17.
+
+Triggers, such as the search vector triggers from api/search.py, are
+recreated on the new table. Row-level BEFORE triggers on partitioned
+tables need PostgreSQL 13 or later.
+"""
+from .models import (
+    WaterHistory, FertilizerHistory, HarvestHistory, FuelRecord, SoilRecord,
+    EmissionSource, SequestrationActivity, EnergyRecord
+)
+
+PARTITIONED_MODELS = [
+    WaterHistory, FertilizerHistory, HarvestHistory, FuelRecord, SoilRecord,
+    EmissionSource, SequestrationActivity, EnergyRecord,
+]
+DEFAULT_PARTITIONS = 16
+PARTITION_KEY = 'owner_id'
+
+
+def partition_statements(table, partitions, indexes, foreign_keys, triggers=()):
+    """
+    SQL that rebuilds ``table`` as ``partitions`` hash partitions on
+    ``owner_id``, in order.
+
+    ``indexes`` are the table's ``CREATE INDEX`` statements, without the
+    primary key. ``foreign_keys`` are ``(name, definition)`` pairs as
+    returned by ``pg_get_constraintdef``. ``triggers`` are ``CREATE
+    TRIGGER`` statements as returned by ``pg_get_triggerdef``.
+    """
+    if partitions < 2:
+        raise ValueError('Partitioning needs at least 2 partitions.')
+    old = f'{table}_unpartitioned'
+    sequence = f'{table}_id_seq'
+    statements = [
+        f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE',
+        f'ALTER TABLE "{table}" RENAME TO "{old}"',
+        f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY HASH ("{PARTITION_KEY}")',
+        f'ALTER TABLE "{table}" ALTER COLUMN "{PARTITION_KEY}" SET NOT NULL',
+    ]
+    statements += [
+        f'CREATE TABLE "{table}_p{remainder}" PARTITION OF "{table}" '
+        f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        for remainder in range(partitions)
+    ]
+    # Rows are copied before any index exists. The old table is dropped
+    # before the new indexes are created, because index names are unique
+    # per schema.
+    statements += [
+        f'INSERT INTO "{table}" SELECT * FROM "{old}"',
+        f'DROP TABLE "{old}"',
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY ("id", "{PARTITION_KEY}")',
+        f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}"."id"',
+        f'SELECT setval(\'"{sequence}"\', COALESCE((SELECT MAX("id") FROM "{table}"), 0) + 1, false)',
+        f'ALTER TABLE "{table}" ALTER COLUMN "id" SET DEFAULT nextval(\'"{sequence}"\')',
+    ]
+    statements += list(indexes)
+    statements += [f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}' for name, definition in foreign_keys]
+    statements += list(triggers)
+    return statements
@@ -0,0 +1,47 @@
+# api/renderers.py
+"""
+orjson-backed JSON renderer.
+
+Produces the same bytes as DRF's JSONRenderer (compact, UTF-8, dates in ISO
+format, UTC datetimes ending in ``Z`` with their microseconds) several
+times faster. DRF releases before 3.15 cut datetime microseconds down to
+milliseconds; this renderer keeps them. Types orjson does not know
+natively, such as Decimal or lazy translation strings, fall back to DRF's
+encoder.
+"""
+import orjson
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .profiling import timed
+
+_fallback = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+
+
+def dumps(data, indent=False):
+    options = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+    return orjson.dumps(data, default=_fallback.default, option=options)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with timed('render'):
+            return dumps(data, indent=self.wants_indent(accepted_media_type, renderer_context or {}))
+
+    def wants_indent(self, accepted_media_type, renderer_context):
+        # Like JSONRenderer, honour "Accept: application/json; indent=4";
+        # orjson only indents by two spaces, whatever width was asked for.
+        if accepted_media_type:
+            _, params = parse_header_parameters(accepted_media_type)
+            if params.get('indent'):
+                return True
+        return bool(renderer_context.get('indent'))
@@ -0,0 +1,167 @@
+# api/rollups.py
+"""
+Per-farm metric rollups.
+
+FarmMetricsRollup keeps running totals over the tracker tables so readers
+fetch one row per farm instead of scanning history. Every source row
+contributes a fixed set of amounts to its farm's rollup (ROLLUP_SOURCES);
+when a row is inserted, updated or deleted the difference between its old
+and new contribution is applied with a single F()-expression UPDATE (the
+handlers live in api/signals.py).
+
+Bulk writes that bypass model signals, such as the importer, call
+``rebuild_rollups`` afterwards instead.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    Farm, FarmMetricsRollup, FuelRecord, SoilRecord, EmissionSource,
+    SequestrationActivity, EnergyRecord
+)
+
+ROLLUP_BATCH_SIZE = 1000
+
+# model: {rollup field: source}. A source is a field name to sum, a
+# (field, flag) pair summing the field over rows where flag is true, or None
+# to count rows.
+ROLLUP_SOURCES = {
+    EmissionSource: {'emissions_co2': 'co2_equivalent'},
+    SequestrationActivity: {'sequestered_co2': 'co2_sequestered'},
+    FuelRecord: {'fuel_gallons': 'gallons', 'fuel_hours': 'hours_operated', 'fuel_cost': 'cost'},
+    EnergyRecord: {
+        'energy_amount': 'amount',
+        'renewable_energy_amount': ('amount', 'renewable'),
+        'energy_cost': 'cost',
+    },
+    SoilRecord: {'soil_record_count': None, 'soil_ph_total': 'ph', 'soil_organic_matter_total': 'organic_matter'},
+}
+
+
+def source_fields(model):
+    fields = set()
+    for source in ROLLUP_SOURCES[model].values():
+        if isinstance(source, tuple):
+            fields.update(source)
+        elif source is not None:
+            fields.add(source)
+    return sorted(fields)
+
+
+def contribution(model, values):
+    """The amounts one row adds to its farm's rollup; ``values`` maps field names to values."""
+    amounts = {}
+    for target, source in ROLLUP_SOURCES[model].items():
+        if source is None:
+            amounts[target] = 1
+        elif isinstance(source, tuple):
+            field, flag = source
+            amounts[target] = (values[field] or 0) if values[flag] else 0
+        else:
+            amounts[target] = values[source] or 0
+    return amounts
+
+
+def instance_contribution(instance):
+    model = type(instance)
+    return instance.farm_id, contribution(model, {field: getattr(instance, field) for field in source_fields(model)})
+
+
+def stored_contribution(model, pk):
+    """The contribution of the row as currently stored, or None if it does not exist."""
+    row = model.objects.filter(pk=pk).values('farm_id', *source_fields(model)).first()
+    if row is None:
+        return None
+    return row['farm_id'], contribution(model, row)
+
+
+def _aggregates(model):
+    aggregates = {}
+    for target, source in ROLLUP_SOURCES[model].items():
+        if source is None:
+            aggregates[target] = Count('pk')
+        elif isinstance(source, tuple):
+            field, flag = source
+            aggregates[target] = Sum(field, filter=Q(**{flag: True}))
+        else:
+            aggregates[target] = Sum(source)
+    return aggregates
+
+
+def compute_totals(farm_ids=None, owner=None):
+    """``{farm_id: {rollup field: total}}`` aggregated from the source tables, one query per table."""
+    totals = {}
+    for model in ROLLUP_SOURCES:
+        queryset = model.objects.all()
+        if farm_ids is not None:
+            queryset = queryset.filter(farm_id__in=farm_ids)
+        if owner is not None:
+            queryset = queryset.for_owner(owner)
+        for row in queryset.order_by().values('farm_id').annotate(**_aggregates(model)):
+            farm_totals = totals.setdefault(row.pop('farm_id'), {})
+            farm_totals.update({field: value or 0 for field, value in row.items()})
+    return totals
+
+
+def rebuild_rollups(farm_ids=None, owner=None):
+    """
+    Recompute rollups from scratch for ``farm_ids`` and/or ``owner``'s
+    farms, or for every farm.
+
+    Every farm gets a row, so farms without tracker data read as zeros.
+    Returns the number of rollup rows written.
+    """
+    with transaction.atomic():
+        farms = Farm.objects.order_by('id')
+        rollups = FarmMetricsRollup.objects.all()
+        if farm_ids is not None:
+            farms = farms.filter(id__in=farm_ids)
+            rollups = rollups.filter(farm_id__in=farm_ids)
+        if owner is not None:
+            farms = farms.for_owner(owner)
+            rollups = rollups.filter(farm__owner=owner)
+        totals = compute_totals(farm_ids, owner)
+        rollups.delete()
+        created = FarmMetricsRollup.objects.bulk_create(
+            [
+                FarmMetricsRollup(farm_id=farm_id, **totals.get(farm_id, {}))
+                for farm_id in farms.values_list('id', flat=True).iterator()
+            ],
+            batch_size=ROLLUP_BATCH_SIZE,
+        )
+    return len(created)
+
+
+def adjust_rollup(farm_id, amounts, sign=1, create=True):
+    """
+    Add ``sign * amounts`` to a farm's rollup in one UPDATE.
+
+    A missing rollup row is rebuilt from the source tables (which already
+    include the row being written) when ``create`` is true; deletions pass
+    ``create=False`` because the farm itself may be going away.
+    """
+    changes = {field: F(field) + sign * amount for field, amount in amounts.items() if amount}
+    if not changes:
+        return
+    updated = FarmMetricsRollup.objects.filter(farm_id=farm_id).update(**changes, updated_at=timezone.now())
+    if updated or not create:
+        return
+    try:
+        rebuild_rollups([farm_id])
+    except IntegrityError:
+        # Another writer created the row concurrently; recompute on top of it.
+        rebuild_rollups([farm_id])
+
+
+def apply_change(previous, current):
+    """Move a row's contribution from ``previous`` to ``current`` ((farm_id, amounts) pairs or None)."""
+    if previous is not None and current is not None and previous[0] == current[0]:
+        farm_id = current[0]
+        difference = {field: current[1][field] - previous[1][field] for field in current[1]}
+        adjust_rollup(farm_id, difference)
+        return
+    if previous is not None:
+        adjust_rollup(*previous, sign=-1, create=False)
+    if current is not None:
+        adjust_rollup(*current)
@@ -0,0 +1,420 @@
+# api/scoring.py
+"""
+Server-side sustainability scoring.
+
+Ports the per-farm scores from ``src/artifacts/utils.ts`` and computes them
+for every farm at once: each history table is pulled as flat NumPy arrays
+with one ``values_list`` query, rows are mapped to a farm index, and the
+per-farm aggregates are reduced with ``np.bincount`` instead of looping over
+farms.
+
+Differences from the browser version, because the data lives elsewhere on
+the server:
+
+* soil pH and organic matter come from each farm's latest SoilRecord;
+* crop rotation is not stored server-side, so ``rotationScore`` is 0 and the
+  rotation bonuses are not applied;
+* weather comes from the stored per-grid-cell observations (api/weather.py)
+  joined on each farm's location (api/weather_join.py); farms without a
+  location, and days without a stored observation, get no adjustment.
+  Temperatures are in °C, so the 30/10 thresholds are read as Celsius.
+
+The tracker metrics that the browser hard-codes are computed from the
+per-farm tracker totals in FarmMetricsRollup (see ``score_trackers``).
+"""
+import math
+
+import numpy as np
+from django.db.models import BooleanField, ExpressionWrapper, Q
+
+from .models import (
+    Farm, WaterHistory, FertilizerHistory, HarvestHistory, SoilRecord,
+    FarmMetricsRollup
+)
+from .weather_join import NO_CELL, WeatherIndex, date_span, day_numbers, farm_cells
+
+FARM_METRICS = ['waterEfficiency', 'organicScore', 'harvestEfficiency', 'soilQualityScore', 'rotationScore']
+
+METRIC_WEIGHTS = {
+    'waterEfficiency': 0.25,
+    'organicScore': 0.20,
+    'harvestEfficiency': 0.20,
+    'soilQualityScore': 0.20,
+    'rotationScore': 0.15,
+}
+
+ORGANIC_FERTILIZER_KEYWORDS = ('organic', 'manure', 'compost')
+IDEAL_SOIL_PH = 6.5
+# Weather adjustments from calculateWaterEfficiency / calculateHarvestEfficiency.
+RAIN_ON_WATERING_FACTOR = 0.5
+RAIN_DAY_BEFORE_WATERING_FACTOR = 0.7
+HOT_DAY_CELSIUS = 30
+HOT_DAY_FACTOR = 0.9
+COLD_DAY_CELSIUS = 10
+COLD_DAY_FACTOR = 0.95
+RAINY_HARVEST_PENALTY = 5
+# Fuel use at or below this rate scores 100 for fuel efficiency.
+REFERENCE_GALLONS_PER_HOUR = 3.0
+# Reported with one decimal place; every other metric is a whole number.
+DECIMAL_METRICS = {'renewablePercentage', 'carbonIntensityPerAcre'}
+
+
+def _round(metric, value):
+    """Round halves up like ``Math.round``; Python's ``round`` rounds them to even."""
+    if metric in DECIMAL_METRICS:
+        return math.floor(float(value) * 10 + 0.5) / 10
+    return math.floor(float(value) + 0.5)
+
+
+def _float_array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _columns(queryset, *fields):
+    """Run one ``values_list`` query and return its columns as arrays."""
+    rows = list(queryset.values_list(*fields))
+    if not rows:
+        return [np.empty(0) for _ in fields]
+    return [np.asarray(column) for column in zip(*rows)]
+
+
+def _parse_acres(size):
+    try:
+        return float(size)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FarmArrays:
+    """
+    Column arrays for every farm and its history rows.
+
+    ``farm_ids`` is sorted. ``tables`` maps a table name to its columns; each
+    table's ``idx`` column holds, per row, the position of the row's farm in
+    ``farm_ids``. ``cells`` holds each farm's weather grid cell (NO_CELL
+    when it has no location).
+    """
+
+    def __init__(self, farm_ids, acres=None, cells=None, **tables):
+        self.farm_ids = np.asarray(farm_ids, dtype=np.int64)
+        self.acres = _float_array(acres if acres is not None else np.full(len(self.farm_ids), np.nan))
+        self.cells = np.asarray(cells if cells is not None else np.full(len(self.farm_ids), NO_CELL), dtype=np.int64)
+        self.tables = tables
+
+    def __len__(self):
+        return len(self.farm_ids)
+
+    def index(self, farm_ids):
+        return np.searchsorted(self.farm_ids, np.asarray(farm_ids, dtype=np.int64))
+
+    @classmethod
+    def load(cls, owner=None):
+        """Pull every table needed for scoring with one query each; ``owner``'s farms only if given."""
+        def rows(model):
+            return model.objects.all() if owner is None else model.objects.for_owner(owner)
+
+        farm_ids, sizes, latitudes, longitudes = _columns(
+            rows(Farm).order_by('id'), 'id', 'size', 'latitude', 'longitude'
+        )
+        arrays = cls(farm_ids, [_parse_acres(size) for size in sizes], farm_cells(latitudes, longitudes))
+        organic = Q()
+        for keyword in ORGANIC_FERTILIZER_KEYWORDS:
+            organic |= Q(type__icontains=keyword)
+
+        water_farm, water_date = _columns(rows(WaterHistory).order_by('farm_id', 'date', 'id'), 'farm_id', 'date')
+        arrays.tables['water'] = {'idx': arrays.index(water_farm), 'date': water_date}
+
+        fert_farm, fert_amount, fert_organic = _columns(
+            rows(FertilizerHistory).annotate(organic=ExpressionWrapper(organic, output_field=BooleanField())),
+            'farm_id', 'amount', 'organic',
+        )
+        arrays.tables['fertilizer'] = {
+            'idx': arrays.index(fert_farm),
+            'amount': _float_array(fert_amount),
+            'organic': fert_organic.astype(bool),
+        }
+
+        harvest_farm, harvest_yield, harvest_date = _columns(
+            rows(HarvestHistory), 'farm_id', 'yield_amount', 'date'
+        )
+        arrays.tables['harvest'] = {
+            'idx': arrays.index(harvest_farm), 'yield': _float_array(harvest_yield), 'date': harvest_date,
+        }
+
+        soil_farm, soil_ph, soil_om = _columns(
+            rows(SoilRecord).order_by('farm_id', 'date', 'id'), 'farm_id', 'ph', 'organic_matter'
+        )
+        arrays.tables['soil'] = {
+            'idx': arrays.index(soil_farm), 'ph': _float_array(soil_ph), 'organic_matter': _float_array(soil_om),
+        }
+
+        # Tracker totals come from the maintained rollups (one row per farm)
+        # rather than the raw tracker tables; each rollup is presented as a
+        # single pre-summed row so the scoring below is unchanged.
+        (rollup_farm, emitted, sequestered, energy, renewable, gallons, hours) = _columns(
+            FarmMetricsRollup.objects.all() if owner is None else FarmMetricsRollup.objects.filter(farm__owner=owner),
+            'farm_id', 'emissions_co2', 'sequestered_co2',
+            'energy_amount', 'renewable_energy_amount', 'fuel_gallons', 'fuel_hours',
+        )
+        rollup_idx = arrays.index(rollup_farm)
+        renewable = _float_array(renewable)
+        arrays.tables['emissions'] = {'idx': rollup_idx, 'co2': _float_array(emitted)}
+        arrays.tables['sequestration'] = {'idx': rollup_idx, 'co2': _float_array(sequestered)}
+        arrays.tables['energy'] = {
+            'idx': np.concatenate([rollup_idx, rollup_idx]),
+            'amount': np.concatenate([renewable, _float_array(energy) - renewable]),
+            'renewable': np.repeat([True, False], len(rollup_idx)),
+        }
+        arrays.tables['fuel'] = {'idx': rollup_idx, 'gallons': _float_array(gallons), 'hours': _float_array(hours)}
+        return arrays
+
+
+def _sum(idx, weights, size):
+    return np.bincount(idx, weights=weights, minlength=size)
+
+
+def _count(idx, size):
+    return np.bincount(idx, minlength=size)
+
+
+def _last_per_group(idx):
+    """Positions of the last row of each run in an ``idx`` sorted by group."""
+    if len(idx) == 0:
+        return np.empty(0, dtype=np.int64)
+    return np.r_[np.nonzero(np.diff(idx))[0], len(idx) - 1]
+
+
+def _latest_water(arrays):
+    """``(farm positions, day numbers)`` of each farm's latest watering."""
+    water = arrays.tables['water']
+    last = _last_per_group(water['idx'])
+    return water['idx'][last], day_numbers(water['date'][last])
+
+
+def load_weather(arrays):
+    """
+    The weather the scores need, with one query: every located farm's cell,
+    over the span of its latest watering (and the day before) and harvests.
+    """
+    _, water_days = _latest_water(arrays)
+    harvest_days = day_numbers(arrays.tables['harvest']['date'])
+    start, end = date_span(water_days, harvest_days)
+    return WeatherIndex.load(arrays.cells, start, end)
+
+
+def weather_factors(arrays, weather):
+    """
+    Per-farm water efficiency multiplier and number of rainy harvests.
+
+    Both come from one lookup per batch over all farms. The water score
+    uses each farm's latest watering; a rainy day halves it, rain the day
+    before takes 30% off, and a hot or cold day takes a little more. Each
+    harvest on a rainy day costs the harvest score 5 points.
+    """
+    size = len(arrays)
+    water_factor = np.ones(size)
+    farms, days = _latest_water(arrays)
+    cells = arrays.cells[farms]
+    temperature = weather.temperature(cells, days)
+    water_factor[farms] *= np.where(weather.rainy(cells, days), RAIN_ON_WATERING_FACTOR, 1.0)
+    water_factor[farms] *= np.where(weather.rainy(cells, days - 1), RAIN_DAY_BEFORE_WATERING_FACTOR, 1.0)
+    water_factor[farms] *= np.where(
+        temperature > HOT_DAY_CELSIUS, HOT_DAY_FACTOR, np.where(temperature < COLD_DAY_CELSIUS, COLD_DAY_FACTOR, 1.0)
+    )
+
+    harvest = arrays.tables['harvest']
+    rainy = weather.rainy(arrays.cells[harvest['idx']], day_numbers(harvest['date']))
+    return water_factor, _count(harvest['idx'][rainy], size)
+
+
+def score_water(arrays, water_factor=None):
+    water = arrays.tables['water']
+    has_water = _count(water['idx'], len(arrays)) > 0
+    score = 100.0 if water_factor is None else 100.0 * water_factor
+    return np.where(has_water, score, 0.0)
+
+
+def score_organic(arrays):
+    size = len(arrays)
+    fert = arrays.tables['fertilizer']
+    total = _sum(fert['idx'], fert['amount'], size)
+    organic_amount = _sum(fert['idx'], np.where(fert['organic'], fert['amount'], 0.0), size)
+    organic_count = _count(fert['idx'][fert['organic']], size)
+
+    score = np.full(size, 70.0)
+    has_fertilizer = total > 0
+    safe_total = np.where(has_fertilizer, total, 1.0)
+    score += np.where(has_fertilizer, organic_amount / safe_total * 20, 0.0)
+    chemical = total - organic_amount
+    score -= np.where(has_fertilizer & (chemical > 0), np.minimum(30.0, chemical / 1000 * 10), 0.0)
+    score += np.where(organic_count >= 3, 10.0, 0.0)
+    return np.clip(score, 0, 100)
+
+
+def score_harvest(arrays, rainy_harvests=None):
+    size = len(arrays)
+    harvest = arrays.tables['harvest']
+    count = _count(harvest['idx'], size)
+    total = _sum(harvest['idx'], harvest['yield'], size)
+    squares = _sum(harvest['idx'], harvest['yield'] ** 2, size)
+
+    has_harvest = count > 0
+    safe_count = np.where(has_harvest, count, 1)
+    mean = total / safe_count
+    variance = np.maximum(squares / safe_count - mean ** 2, 0.0)
+    positive_mean = mean > 0
+    variation = np.where(positive_mean, np.sqrt(variance) / np.where(positive_mean, mean, 1.0), 0.0)
+
+    score = 100.0 - variation * 20
+    if rainy_harvests is not None:
+        score -= rainy_harvests * RAINY_HARVEST_PENALTY
+    return np.where(has_harvest, np.clip(score, 0, 100), 0.0)
+
+
+def score_soil(arrays):
+    score = np.full(len(arrays), 70.0)
+    soil = arrays.tables['soil']
+    last = _last_per_group(soil['idx'])
+    farms = soil['idx'][last]
+    score[farms] += soil['organic_matter'][last] * 5
+    score[farms] -= np.abs(soil['ph'][last] - IDEAL_SOIL_PH) * 5
+    return np.clip(score, 0, 100)
+
+
+def score_farms(arrays, weather=None):
+    """
+    Per-farm base scores as ``{metric: array}``, aligned with ``farm_ids``.
+    ``weather`` is a WeatherIndex; without one the weather adjustments are
+    skipped.
+    """
+    water_factor = rainy_harvests = None
+    if weather is not None:
+        water_factor, rainy_harvests = weather_factors(arrays, weather)
+    return {
+        'waterEfficiency': score_water(arrays, water_factor),
+        'organicScore': score_organic(arrays),
+        'harvestEfficiency': score_harvest(arrays, rainy_harvests),
+        'soilQualityScore': score_soil(arrays),
+        'rotationScore': np.zeros(len(arrays)),
+    }
+
+
+def score_trackers(arrays):
+    """
+    Per-farm tracker metrics plus the raw totals used for the overall values.
+
+    * carbonFootprint: share of emitted CO2e offset by sequestration, 0-100;
+    * renewablePercentage: renewable share of recorded energy use;
+    * energyEfficiency: 50 with no renewables, rising to 100 when all renewable;
+    * fuelEfficiency: 100 at or below REFERENCE_GALLONS_PER_HOUR, falling
+      in proportion above it;
+    * carbonIntensityPerAcre: net CO2e per acre of farm size.
+    """
+    size = len(arrays)
+    t = arrays.tables
+    totals = {
+        'emitted': _sum(t['emissions']['idx'], t['emissions']['co2'], size),
+        'sequestered': _sum(t['sequestration']['idx'], t['sequestration']['co2'], size),
+        'energy': _sum(t['energy']['idx'], t['energy']['amount'], size),
+        'renewable': _sum(t['energy']['idx'], np.where(t['energy']['renewable'], t['energy']['amount'], 0.0), size),
+        'gallons': _sum(t['fuel']['idx'], t['fuel']['gallons'], size),
+        'hours': _sum(t['fuel']['idx'], t['fuel']['hours'], size),
+    }
+    return _tracker_metrics(totals, arrays.acres), totals
+
+
+def _ratio(numerator, denominator, default=0.0):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    safe = np.where(denominator > 0, denominator, 1.0)
+    return np.where(denominator > 0, numerator / safe, default)
+
+
+def _tracker_metrics(totals, acres):
+    offset = _ratio(totals['sequestered'], totals['emitted'], default=1.0)
+    carbon = np.where(totals['emitted'] + totals['sequestered'] > 0, np.clip(offset * 100, 0, 100), 0.0)
+    renewable = _ratio(totals['renewable'], totals['energy']) * 100
+    energy = np.where(totals['energy'] > 0, 50 + renewable / 2, 0.0)
+    gallons_per_hour = _ratio(totals['gallons'], totals['hours'])
+    fuel = np.where(
+        gallons_per_hour > 0,
+        np.clip(_ratio(REFERENCE_GALLONS_PER_HOUR, gallons_per_hour) * 100, 0, 100),
+        0.0,
+    )
+    valid_acres = np.nan_to_num(acres, nan=0.0)
+    intensity = _ratio(totals['emitted'] - totals['sequestered'], valid_acres)
+    return {
+        'carbonFootprint': carbon,
+        'energyEfficiency': energy,
+        'fuelEfficiency': fuel,
+        'renewablePercentage': renewable,
+        'carbonIntensityPerAcre': intensity,
+    }
+
+
+def summarize(scores):
+    """
+    Combine per-farm base scores like ``calculateSustainabilityMetrics``:
+    each metric is averaged over farms where it is positive, and the overall
+    score is the weighted mean of the metrics that had any data.
+    """
+    averages = {}
+    overall = 0.0
+    total_weight = 0.0
+    for metric in FARM_METRICS:
+        values = scores[metric]
+        positive = values[values > 0]
+        if len(positive):
+            averages[metric] = float(positive.mean())
+            overall += averages[metric] * METRIC_WEIGHTS[metric]
+            total_weight += METRIC_WEIGHTS[metric]
+        else:
+            averages[metric] = 0.0
+    if 0 < total_weight < 1:
+        overall /= total_weight
+    return {
+        'overallScore': _round('overallScore', overall),
+        **{metric: _round(metric, value) for metric, value in averages.items()},
+    }
+
+
+def overall_score(scores):
+    """Per-farm overall score, normalised over the metrics the farm has."""
+    weights = np.array([METRIC_WEIGHTS[metric] for metric in FARM_METRICS])
+    matrix = np.column_stack([scores[metric] for metric in FARM_METRICS])
+    present = matrix > 0
+    total_weight = present @ weights
+    weighted = np.where(present, matrix, 0.0) @ weights
+    normalised = np.where((total_weight > 0) & (total_weight < 1), _ratio(weighted, total_weight), weighted)
+    return np.where(total_weight > 0, normalised, 0.0)
+
+
+def compute_metrics(arrays=None, weather=None, owner=None):
+    """
+    The ``/api/metrics/`` document: overall metrics plus one entry per farm.
+    When the arrays are loaded here (for ``owner``'s farms, or every farm),
+    the stored weather is loaded with them.
+    """
+    if arrays is None:
+        arrays = FarmArrays.load(owner)
+        weather = load_weather(arrays)
+    scores = score_farms(arrays, weather)
+    trackers, totals = score_trackers(arrays)
+
+    summary = summarize(scores)
+    overall_totals = {key: np.array([values.sum()]) for key, values in totals.items()}
+    overall_trackers = _tracker_metrics(overall_totals, np.array([np.nansum(arrays.acres)]))
+    for metric, values in overall_trackers.items():
+        summary[metric] = _round(metric, values[0])
+
+    per_farm = overall_score(scores)
+    farms = [
+        {
+            'farmId': int(farm_id),
+            'overallScore': _round('overallScore', per_farm[i]),
+            **{metric: _round(metric, scores[metric][i]) for metric in FARM_METRICS},
+            **{metric: _round(metric, values[i]) for metric, values in trackers.items()},
+        }
+        for i, farm_id in enumerate(arrays.farm_ids)
+    ]
+    return {'overall': summary, 'farms': farms}
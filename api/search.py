@@ -0,0 +1,150 @@
+# api/search.py
+"""
+Full-text search over the free-text columns of the task, plan and tracker
+tables, ranked across all of them in one query.
+
+On PostgreSQL every searched table has a ``search_vector`` tsvector column
+with a GIN index. A BEFORE INSERT OR UPDATE trigger fills it, weighting the
+first field A and the rest B. On SQLite each table instead has an
+external-content FTS5 table (``<table>_fts``, porter-stemmed) kept in step
+by AFTER triggers. Migration 0012_search creates either set; the ORM
+knows about neither.
+
+Django rebuilds a SQLite table (copy, drop, rename) for most field
+alterations, which drops its triggers. A migration that does that to one
+of these tables must recreate them, as ``sqlite_statements`` in
+0012_search does.
+
+``search`` ranks the owner's matching rows of every table with one
+UNION ALL query (``ts_rank`` / ``bm25``). It then loads the fields of the
+page's rows with one query per table.
+"""
+import re
+
+from django.db import connection
+
+from .models import (
+    Task, Issue, PlanItem, CropPlanEvent, FuelRecord, SoilRecord, EmissionSource,
+    SequestrationActivity, EnergyRecord
+)
+
+SEARCH_CONFIG = 'english'
+MAX_TERMS = 8
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TEXT_LENGTH = 200
+# SQLite bm25() weights for the first field and the rest, mirroring the
+# ts_rank defaults for weights A and B.
+TITLE_WEIGHT = 1.0
+BODY_WEIGHT = 0.4
+
+
+class Searchable:
+    """A searched table: its text ``fields`` (the first is the title) and its date column, if any."""
+
+    def __init__(self, model, fields, date_field=None):
+        self.model = model
+        self.fields = fields
+        self.date_field = date_field
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+
+SEARCHABLE = {
+    'task': Searchable(Task, ('title',), 'due_date'),
+    'issue': Searchable(Issue, ('title',)),
+    'plan': Searchable(PlanItem, ('description',)),
+    'crop_event': Searchable(CropPlanEvent, ('title',), 'date'),
+    'fuel': Searchable(FuelRecord, ('equipment_name', 'notes'), 'date'),
+    'soil': Searchable(SoilRecord, ('location', 'notes'), 'date'),
+    'emission': Searchable(EmissionSource, ('source_type', 'description', 'notes'), 'date'),
+    'sequestration': Searchable(SequestrationActivity, ('activity_type', 'description', 'notes'), 'date'),
+    'energy': Searchable(EnergyRecord, ('purpose', 'energy_type', 'notes'), 'date'),
+}
+
+
+def search_terms(query):
+    """The words of ``query``, lowercased; punctuation and search syntax are dropped."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _postgres_hits(searchable, kind):
+    # Every term must match; the last one is a prefix so partial words work
+    # while typing. Terms are \w+ only, so they cannot inject tsquery syntax.
+    return (
+        f"SELECT '{kind}' AS kind, id, ts_rank(search_vector, query) AS rank "
+        f"FROM {searchable.table}, to_tsquery('{SEARCH_CONFIG}', %s) AS query "
+        f"WHERE owner_id = %s AND search_vector @@ query"
+    )
+
+
+def _sqlite_hits(searchable, kind):
+    fts = f'{searchable.table}_fts'
+    weights = ', '.join([str(TITLE_WEIGHT)] + [str(BODY_WEIGHT)] * (len(searchable.fields) - 1))
+    return (
+        f"SELECT '{kind}' AS kind, {searchable.table}.id AS id, -bm25({fts}, {weights}) AS rank "
+        f"FROM {fts} JOIN {searchable.table} ON {searchable.table}.id = {fts}.rowid "
+        f"WHERE {fts} MATCH %s AND {searchable.table}.owner_id = %s"
+    )
+
+
+def rank(owner, terms, kinds, limit, offset=0):
+    """``[(kind, id, rank), ...]`` for the owner's rows matching every term, best first."""
+    if connection.vendor == 'postgresql':
+        match = ' & '.join(terms) + ':*'
+        hits = _postgres_hits
+    else:
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        hits = _sqlite_hits
+    parts = [hits(SEARCHABLE[kind], kind) for kind in kinds]
+    params = [value for _ in kinds for value in (match, owner.pk)]
+    sql = (
+        f"SELECT kind, id, rank FROM ({' UNION ALL '.join(parts)}) hits "
+        f"ORDER BY rank DESC, kind, id LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        return cursor.fetchall()
+
+
+def _hit(kind, row, score):
+    searchable = SEARCHABLE[kind]
+    title, *body = (row[field] for field in searchable.fields)
+    text = ' '.join(value for value in body if value)
+    return {
+        'type': kind,
+        'id': row['id'],
+        'title': title,
+        'text': text if len(text) <= TEXT_LENGTH else text[:TEXT_LENGTH - 1] + '…',
+        'farm_id': row.get('farm_id'),
+        'date': row.get(searchable.date_field),
+        'rank': score,
+    }
+
+
+def search(owner, query, kinds=None, limit=20, offset=0):
+    """
+    Ranked hits for ``query`` among the owner's rows of ``kinds`` (default
+    all), as ``{'type', 'id', 'title', 'text', 'farm_id', 'date', 'rank'}``.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    ranked = rank(owner, terms, list(kinds or SEARCHABLE), limit, offset)
+
+    ids = {}
+    for kind, pk, _ in ranked:
+        ids.setdefault(kind, []).append(pk)
+    rows = {}
+    for kind, pks in ids.items():
+        searchable = SEARCHABLE[kind]
+        fields = ['id', *searchable.fields]
+        if searchable.date_field:
+            fields.append(searchable.date_field)
+        if any(field.name == 'farm' for field in searchable.model._meta.fields):
+            fields.append('farm_id')
+        for row in searchable.model.objects.filter(pk__in=pks).values(*fields):
+            rows[kind, row['id']] = row
+    return [_hit(kind, rows[kind, pk], score) for kind, pk, score in ranked if (kind, pk) in rows]
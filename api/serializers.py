@@ -1,9 +1,10 @@
 # your_app/serializers.py
+from django.urls import reverse
 from rest_framework import serializers
 from .models import (
     Farm, WaterHistory, FertilizerHistory, HarvestHistory, Task, Issue,
     CropPlanEvent, PlanItem, FuelRecord, SoilRecord, EmissionSource,
-    SequestrationActivity, EnergyRecord, Livestock, UserLocalStorage
+    SequestrationActivity, EnergyRecord, Livestock, UserLocalStorage, Job
 )
 
 class WaterHistorySerializer(serializers.ModelSerializer):
@@ -34,11 +35,16 @@ class FarmSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Farm
-        fields = ['id', 'name', 'size', 'crop', 'soil_type', 'slope_ratio',
+        fields = ['id', 'name', 'size', 'crop', 'soil_type', 'slope_ratio', 'latitude', 'longitude',
                   'water_history', 'fertilizer_history', 'harvest_history',
                   'fuel_records', 'soil_records', 'emission_sources',
                   'sequestration_activities', 'energy_records', 'livestock']
 
+class FarmSummarySerializer(FarmSerializer):
+    # Farm columns only, for list pages; histories are paged separately.
+    class Meta(FarmSerializer.Meta):
+        fields = ['id', 'name', 'size', 'crop', 'soil_type', 'slope_ratio', 'latitude', 'longitude']
+
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
@@ -60,7 +66,7 @@ class PlanItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'plan_type', 'description']
 
 class FuelRecordSerializer(serializers.ModelSerializer):
-    farm_id = serializers.IntegerField(write_only=True)
+    farm_id = serializers.IntegerField()
 
     class Meta:
         model = FuelRecord
@@ -68,7 +74,7 @@ class FuelRecordSerializer(serializers.ModelSerializer):
                   'gallons', 'hours_operated', 'cost', 'notes']
 
 class SoilRecordSerializer(serializers.ModelSerializer):
-    farm_id = serializers.IntegerField(write_only=True)
+    farm_id = serializers.IntegerField()
 
     class Meta:
         model = SoilRecord
@@ -76,7 +82,7 @@ class SoilRecordSerializer(serializers.ModelSerializer):
                   'nitrogen', 'phosphorus', 'potassium', 'moisture', 'notes']
 
 class EmissionSourceSerializer(serializers.ModelSerializer):
-    farm_id = serializers.IntegerField(write_only=True)
+    farm_id = serializers.IntegerField()
 
     class Meta:
         model = EmissionSource
@@ -84,7 +90,7 @@ class EmissionSourceSerializer(serializers.ModelSerializer):
                   'co2_equivalent', 'notes']
 
 class SequestrationActivitySerializer(serializers.ModelSerializer):
-    farm_id = serializers.IntegerField(write_only=True)
+    farm_id = serializers.IntegerField()
 
     class Meta:
         model = SequestrationActivity
@@ -92,7 +98,7 @@ class SequestrationActivitySerializer(serializers.ModelSerializer):
                   'co2_sequestered', 'area', 'notes']
 
 class EnergyRecordSerializer(serializers.ModelSerializer):
-    farm_id = serializers.IntegerField(write_only=True)
+    farm_id = serializers.IntegerField()
 
     class Meta:
         model = EnergyRecord
@@ -100,7 +106,7 @@ class EnergyRecordSerializer(serializers.ModelSerializer):
                   'renewable', 'cost', 'purpose', 'notes']
 
 class LivestockSerializer(serializers.ModelSerializer):
-    farm_id = serializers.IntegerField(write_only=True)
+    farm_id = serializers.IntegerField()
 
     class Meta:
         model = Livestock
@@ -130,5 +136,42 @@ class ExportDataSerializer(serializers.Serializer):
 class UserLocalStorageSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserLocalStorage
-        fields = ['user', 'data', 'last_updated']
-        read_only_fields = ['user', 'last_updated']
\ No newline at end of file
+        fields = ['user', 'revision', 'last_updated']
+        read_only_fields = ['user', 'revision', 'last_updated']
+
+class JobSerializer(serializers.ModelSerializer):
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'progress', 'result', 'error', 'attempts',
+                  'created_at', 'started_at', 'finished_at', 'result_url']
+        read_only_fields = fields
+
+    def get_result_url(self, job):
+        if not job.result_file or job.status != Job.SUCCEEDED:
+            return None
+        url = reverse('job_result', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class ValuesSerializer:
+    """
+    Read-only fast path for a ModelSerializer whose fields are all plain
+    model columns.
+
+    Rows are fetched with ``QuerySet.values()`` in the serializer's field
+    order and emitted as they are, so no serializer or field objects are
+    built per row. Rendered as JSON the output is identical to
+    ``serializer_class``'s.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.fields = list(serializer_class.Meta.fields)
+
+    def values(self, queryset):
+        return queryset.values(*self.fields)
+
+    def to_representation(self, rows):
+        return rows if isinstance(rows, list) else list(rows)
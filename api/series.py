@@ -0,0 +1,120 @@
+# api/series.py
+"""
+Chart data for the time-series tables, sized by the chart rather than by
+the history.
+
+``buckets`` aggregates in SQL: each row's date is truncated to its day,
+week, month, quarter or year (``Trunc``), and count, sum, avg, min and max
+are computed per bucket, optionally per category too (``group``). A
+ten-year daily history is twelve rows a year at monthly resolution.
+
+``points`` returns one raw column as ``(date, value)`` points. Above
+``limit`` rows it is reduced with Largest-Triangle-Three-Buckets (LTTB),
+which keeps the peaks and troughs a line chart needs. The first and last
+points always survive.
+"""
+import numpy as np
+from django.db.models import Avg, Count, DateField, F, Max, Min, Sum
+from django.db.models.functions import Trunc
+
+from .models import (
+    FuelRecord, EnergyRecord, SoilRecord, WaterHistory, EmissionSource, SequestrationActivity
+)
+from .weather_join import day_numbers
+
+BUCKETS = ('day', 'week', 'month', 'quarter', 'year')
+AGGREGATES = {'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max}
+DEFAULT_POINTS = 500
+MIN_POINTS = 3
+MAX_POINTS = 5000
+
+
+class Series:
+    """A time-series table: the numeric ``fields`` it charts and the ``groups`` it can be split by."""
+
+    def __init__(self, model, fields, groups=()):
+        self.model = model
+        self.fields = fields
+        self.groups = groups
+
+
+SERIES = {
+    'fuel': Series(FuelRecord, ('gallons', 'hours_operated', 'cost'), ('equipment_name', 'fuel_type')),
+    'energy': Series(EnergyRecord, ('amount', 'cost'), ('energy_type', 'renewable', 'purpose')),
+    'soil': Series(
+        SoilRecord, ('ph', 'organic_matter', 'nitrogen', 'phosphorus', 'potassium', 'moisture'), ('location',)
+    ),
+    'water': Series(WaterHistory, ('amount', 'efficiency')),
+    'emissions': Series(EmissionSource, ('co2_equivalent',), ('source_type',)),
+    'sequestration': Series(SequestrationActivity, ('co2_sequestered', 'area'), ('activity_type',)),
+}
+
+
+def buckets(queryset, fields, bucket='month', group=None):
+    """
+    One row per bucket (and ``group`` value), oldest first::
+
+        {'period': date, 'count': 3, 'gallons': {'sum': .., 'avg': .., 'min': .., 'max': ..}}
+
+    ``period`` is the first day of the bucket (Monday for weeks).
+    """
+    if bucket == 'day':
+        period = F('date')
+    else:
+        period = Trunc('date', bucket, output_field=DateField())
+    keys = ['period', group] if group else ['period']
+    rows = queryset.annotate(period=period).values(*keys).annotate(
+        count=Count('pk'),
+        **{f'{field}__{name}': aggregate(field) for field in fields for name, aggregate in AGGREGATES.items()},
+    ).order_by(*keys)
+    return [
+        {
+            **{key: row[key] for key in keys},
+            'count': row['count'],
+            **{field: {name: row[f'{field}__{name}'] for name in AGGREGATES} for field in fields},
+        }
+        for row in rows
+    ]
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the ``threshold`` points Largest-Triangle-Three-Buckets
+    keeps from ``x``/``y`` (``x`` sorted). Returns every index when there
+    are no more points than that.
+    """
+    size = len(x)
+    if threshold >= size:
+        return np.arange(size)
+    if threshold < 3:
+        raise ValueError('LTTB keeps at least 3 points.')
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # The first and last points are kept; the rest are split into
+    # threshold - 2 buckets, and each bucket keeps the point forming the
+    # largest triangle with the previous pick and the next bucket's mean.
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        following = slice(end, edges[bucket + 2]) if bucket + 2 < len(edges) else slice(size - 1, size)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def points(queryset, field, limit=DEFAULT_POINTS):
+    """``(total rows, [{'date', 'value'}, ...])`` for ``field``, LTTB-reduced to ``limit`` points."""
+    rows = list(queryset.exclude(**{f'{field}__isnull': True}).order_by('date', 'pk').values_list('date', field))
+    if not rows:
+        return 0, []
+    dates, values = zip(*rows)
+    keep = lttb(day_numbers(np.asarray(dates, dtype=object)), np.asarray(values, dtype=np.float64), limit)
+    return len(rows), [{'date': dates[i], 'value': values[i]} for i in keep]
@@ -0,0 +1,56 @@
+# api/signals.py
+"""
+Signal handlers.
+
+Rollups: keep FarmMetricsRollup in step with writes to the tracker tables.
+``pre_save`` remembers what an existing row contributed before the update,
+``post_save`` applies the difference to the new values and ``post_delete``
+removes the row's contribution. See api/rollups.py.
+
+Auth: drop cached token authentications when a token is deleted or its
+user is saved (for example deactivated). See api/authentication.py.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, post_delete
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user_tokens
+from .rollups import ROLLUP_SOURCES, apply_change, instance_contribution, stored_contribution
+
+
+def remember_rollup_contribution(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._rollup_previous = stored_contribution(sender, instance.pk) if instance.pk is not None else None
+
+
+def update_rollup_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.pop('_rollup_previous', None)
+    apply_change(previous, instance_contribution(instance))
+
+
+def update_rollup_on_delete(sender, instance, **kwargs):
+    apply_change(instance_contribution(instance), None)
+
+
+# Connected per model rather than globally: a delete listener on a model
+# stops Django from fast-deleting it, so unrelated tables must not get one.
+for model in ROLLUP_SOURCES:
+    pre_save.connect(remember_rollup_contribution, sender=model, dispatch_uid=f'rollup_pre_save_{model.__name__}')
+    post_save.connect(update_rollup_on_save, sender=model, dispatch_uid=f'rollup_post_save_{model.__name__}')
+    post_delete.connect(update_rollup_on_delete, sender=model, dispatch_uid=f'rollup_post_delete_{model.__name__}')
+
+
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+def invalidate_saved_user_tokens(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_user_tokens(instance.pk)
+
+
+post_delete.connect(invalidate_deleted_token, sender=Token, dispatch_uid='auth_token_post_delete')
+post_save.connect(invalidate_saved_user_tokens, sender=User, dispatch_uid='auth_user_post_save')
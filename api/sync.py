@@ -0,0 +1,186 @@
+# api/sync.py
+"""
+Revisioned localStorage sync.
+
+Each user's snapshot carries a revision counter. Clients send only the keys
+they changed or removed together with the revision they last saw; if that is
+not the current revision the patch is rejected with the deltas the client is
+missing, so it can merge them and retry.
+
+Keys are stored one row per (user, key) in LocalStorageEntry with a content
+hash, so a save only writes the rows whose value actually changed instead of
+rewriting the whole snapshot. Large values are compressed at rest (see
+api/compression.py).
+"""
+import hashlib
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import quote_etag
+
+from .compression import encode_value, decode_value
+from .models import UserLocalStorage, LocalStorageEntry
+
+ENTRY_BATCH_SIZE = 500
+MAX_KEY_LENGTH = LocalStorageEntry._meta.get_field('key').max_length
+
+
+class SyncConflict(Exception):
+    """The client's base revision is not the server's current revision."""
+
+    def __init__(self, revision, changes):
+        self.revision = revision
+        self.changes = changes
+        super().__init__(f"Client is behind revision {revision}")
+
+
+def long_keys(keys):
+    """The keys longer than LocalStorageEntry.key can hold."""
+    return [key for key in keys if len(key) > MAX_KEY_LENGTH]
+
+
+def content_hash(value):
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def get_header(user):
+    """The user's sync header without touching any entry rows, or None."""
+    return UserLocalStorage.objects.filter(user=user).only('user_id', 'revision', 'last_updated').first()
+
+
+def _decoded(entries):
+    for key, value, blob, codec, *rest in entries.values_list('key', 'value', 'compressed_value', 'compression', 'deleted'):
+        yield key, decode_value(value, blob, codec), *rest
+
+
+def load_entries(user):
+    entries = LocalStorageEntry.objects.filter(user=user, deleted=False)
+    return {key: value for key, value, _ in _decoded(entries)}
+
+
+def snapshot_etag(storage, variant=''):
+    """
+    Strong ETag for a user's snapshot, derived from the header row only.
+
+    The revision changes on every write; the timestamp guards against a
+    revision being reused after the header row is deleted and recreated.
+    ``variant`` distinguishes different representations of the same data.
+    """
+    stamp = int(storage.last_updated.timestamp() * 1_000_000)
+    return quote_etag(f"{storage.user_id}-{storage.revision}-{stamp}{variant}")
+
+
+def changes_since(storage, revision):
+    """
+    Return the deltas a client at ``revision`` is missing.
+
+    When the client claims a revision newer than the server's (for example
+    after the server data was reset) the full snapshot is returned instead.
+    """
+    if revision > storage.revision:
+        return {'full': True, 'set': load_entries(storage.user_id), 'remove': []}
+    changes = {'full': False, 'set': {}, 'remove': []}
+    entries = LocalStorageEntry.objects.filter(user_id=storage.user_id, revision__gt=revision)
+    for key, value, deleted in _decoded(entries):
+        if deleted:
+            changes['remove'].append(key)
+        else:
+            changes['set'][key] = value
+    return changes
+
+
+def _apply(storage, changed, removed, existing):
+    """
+    Write one set of changes as a single new revision.
+
+    ``existing`` maps keys to their current LocalStorageEntry (loaded without
+    the value column). Unchanged keys, judged by content hash, are skipped.
+    """
+    revision = storage.revision + 1
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for key, value in changed.items():
+        digest = content_hash(value)
+        entry = existing.get(key)
+        if entry is None:
+            stored, blob, codec = encode_value(value)
+            to_create.append(LocalStorageEntry(
+                user_id=storage.user_id, key=key, value=stored, compressed_value=blob,
+                compression=codec, content_hash=digest, revision=revision,
+            ))
+        elif entry.deleted or entry.content_hash != digest:
+            entry.value, entry.compressed_value, entry.compression = encode_value(value)
+            entry.content_hash = digest
+            entry.deleted = False
+            entry.revision = revision
+            entry.updated_at = now
+            to_update.append(entry)
+    for key in removed:
+        entry = existing.get(key)
+        if entry is not None and not entry.deleted and key not in changed:
+            entry.value = None
+            entry.compressed_value = None
+            entry.compression = ''
+            entry.content_hash = ''
+            entry.deleted = True
+            entry.revision = revision
+            entry.updated_at = now
+            to_update.append(entry)
+    if not to_create and not to_update:
+        return False
+
+    LocalStorageEntry.objects.bulk_create(to_create, batch_size=ENTRY_BATCH_SIZE)
+    LocalStorageEntry.objects.bulk_update(
+        to_update,
+        ['value', 'compressed_value', 'compression', 'content_hash', 'deleted', 'revision', 'updated_at'],
+        batch_size=ENTRY_BATCH_SIZE,
+    )
+    storage.revision = revision
+    storage.save(update_fields=['revision', 'last_updated'])
+    return True
+
+
+def _locked_storage(user):
+    storage, created = UserLocalStorage.objects.select_for_update().get_or_create(user=user)
+    return storage, created
+
+
+def _existing_entries(user, keys=None):
+    entries = LocalStorageEntry.objects.filter(user=user).only('id', 'key', 'content_hash', 'deleted')
+    if keys is not None:
+        entries = entries.filter(key__in=keys)
+    return {entry.key: entry for entry in entries}
+
+
+def save_snapshot(user, data):
+    """
+    Replace the user's snapshot with ``data``.
+
+    Only keys whose value actually changed are written and get a new revision,
+    so clients that patch afterwards receive precise deltas. Returns
+    ``(revision, created)``.
+    """
+    with transaction.atomic():
+        storage, created = _locked_storage(user)
+        existing = _existing_entries(user)
+        removed = [key for key, entry in existing.items() if not entry.deleted and key not in data]
+        _apply(storage, data, removed, existing)
+    return storage.revision, created
+
+
+def apply_patch(user, base_revision, changed, removed):
+    """
+    Apply a client patch made against ``base_revision``.
+
+    Raises SyncConflict carrying the missing deltas when the client is behind.
+    Returns the new revision.
+    """
+    with transaction.atomic():
+        storage, created = _locked_storage(user)
+        if base_revision != storage.revision:
+            raise SyncConflict(storage.revision, changes_since(storage, base_revision))
+        _apply(storage, changed, removed, _existing_entries(user, [*changed, *removed]))
+    return storage.revision
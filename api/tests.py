@@ -1,3 +1,1276 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from backend.database import database_config
+
+from .authentication import CachedTokenAuthentication
+from .compression import compress, decode_value, encode_value, preferred_codec, zstandard
+from .importer import (
+    IMPORT_MODELS, DataImporter, ImportValidationError, StreamingImporter, iter_top_level_items, merge_fields
+)
+from .jobs import claim_next, finish, run_job
+from .models import (
+    Farm, WaterHistory, FertilizerHistory, HarvestHistory, FuelRecord, PlanItem, Task, Issue,
+    EnergyRecord, SoilRecord, EmissionSource, SequestrationActivity, FarmMetricsRollup, Job,
+    WeatherObservation, LocalStorageEntry
+)
+from .parsers import ORJSONParser
+from .partitioning import partition_statements
+from .renderers import ORJSONRenderer
+from .rollups import rebuild_rollups
+from .scoring import FARM_METRICS
+from .serializers import ValuesSerializer
+from .series import lttb
+from .sync import load_entries, save_snapshot
+from .views import EnergyRecordListView, FarmListView, FuelRecordListView, PlanItemListView, TaskListView
+from . import typeahead
+from .weather import StubWeatherFetcher, grid_cell
+
+
+def seed_farms(count, start=1, owner=None):
+    for farm_id in range(start, start + count):
+        farm = Farm.objects.create(id=farm_id, owner=owner, name=f"Farm {farm_id}", size='10', crop='corn')
+        WaterHistory.objects.create(farm=farm, owner=owner, amount=10, date=date(2024, 1, 1), efficiency=80)
+        HarvestHistory.objects.create(farm=farm, owner=owner, yield_amount=5, date=date(2024, 6, 1))
+        FuelRecord.objects.create(
+            farm=farm, owner=owner, date=date(2024, 2, 1), equipment_name='Tractor', fuel_type='diesel',
+            gallons=12.5, hours_operated=3, cost=40,
+        )
+
+
+class ExportDataViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+
+    def export(self):
+        response = self.client.get('/api/export/')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def count_export_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.export()
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_farm_count(self):
+        seed_farms(2, owner=self.user)
+        small = self.count_export_queries()
+        seed_farms(20, start=3, owner=self.user)
+        self.assertEqual(self.count_export_queries(), small)
+
+    def test_export_round_trips_through_import(self):
+        seed_farms(3, owner=self.user)
+        PlanItem.objects.create(owner=self.user, plan_type='Planting', description='Plant corn')
+        document = json.loads(self.export())
+
+        self.assertEqual(len(document['farms']), 3)
+        self.assertEqual(document['farms'][0]['harvestHistory'], [{'yield': 5, 'date': '2024-06-01'}])
+        self.assertEqual(document['fuelRecords'][0]['farmId'], 1)
+        self.assertEqual(document['plantingPlans'][0]['description'], 'Plant corn')
+
+        stats = DataImporter(self.user).run(document)
+        self.assertEqual(stats['tables']['farms']['rows'], 3)
+        self.assertEqual(stats['tables']['fuel_records']['rows'], 3)
+        self.assertEqual(WaterHistory.objects.count(), 3)
+
+
+class DataImporterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        self.document = {
+            'farms': [{'id': 1, 'name': 'A', 'size': '10', 'crop': 'corn'}],
+            'fuelRecords': [{
+                'farmId': 1, 'date': '2024-01-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+                'gallons': 3, 'hours_operated': 1, 'cost': 10,
+            }],
+        }
+
+    def upload(self, document):
+        upload = SimpleUploadedFile('farms.json', json.dumps(document).encode(), content_type='application/json')
+        return self.client.post('/api/import/', {'file': upload}, format='multipart')
+
+    def test_validation_errors_list_every_bad_row(self):
+        seed_farms(1, owner=self.user)
+        self.document['farms'].append({'id': 1, 'name': 'Duplicate', 'size': '10', 'crop': 'corn'})
+        self.document['farms'][0]['waterHistory'] = [{'amount': 'lots', 'date': '2024-01-01', 'efficiency': 80}]
+        self.document['fuelRecords'].append(dict(self.document['fuelRecords'][0], date='soon'))
+        self.document['tasks'] = 'none'
+
+        response = self.upload(self.document)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Import payload failed validation (4 errors)')
+        details = {(error['section'], error['index']): error['error'] for error in response.json()['details']}
+        self.assertEqual(set(details), {('farms', 1), ('farms[0].waterHistory', 0), ('fuelRecords', 1), ('tasks', None)})
+        self.assertEqual(details[('farms', 1)], 'Duplicate farm id 1.')
+        self.assertIn('amount', details[('farms[0].waterHistory', 0)])
+        self.assertIn('date', details[('fuelRecords', 1)])
+        # Nothing was replaced.
+        self.assertEqual(Farm.objects.get().name, 'Farm 1')
+
+    def test_failure_in_a_later_table_rolls_back_the_whole_import(self):
+        seed_farms(2, owner=self.user)
+        self.document['energyRecords'] = [{
+            'farmId': 1, 'date': '2024-01-01', 'energy_type': 'solar', 'amount': 40, 'unit': 'kWh',
+            'renewable': True, 'cost': 5, 'purpose': 'Pumps',
+        }]
+        with mock.patch.object(EnergyRecord.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                DataImporter(self.user).run(self.document)
+        self.assertEqual(list(Farm.objects.values_list('name', flat=True)), ['Farm 1', 'Farm 2'])
+        self.assertEqual(FuelRecord.objects.count(), 2)
+        self.assertEqual(FarmMetricsRollup.objects.count(), 2)
+
+    def test_farm_ids_are_resolved_against_the_archive(self):
+        self.document['farms'].append({'id': 2, 'name': 'B', 'size': '10', 'crop': 'corn'})
+        record = self.document['fuelRecords'][0]
+        self.document['fuelRecords'] = [dict(record, farmId=farm_id) for farm_id in (2, '1', 1.0)]
+        self.assertEqual(self.upload(self.document).status_code, 201)
+        self.assertEqual(sorted(FuelRecord.objects.values_list('farm_id', flat=True)), [1, 1, 2])
+
+        self.document['fuelRecords'] = [dict(record, farmId=farm_id) for farm_id in (3, 'one', True, None, 1.5)]
+        details = self.upload(self.document).json()['details']
+        self.assertEqual([error['error'] for error in details], [
+            'Unknown farmId 3.', "Invalid farmId 'one'.", 'Invalid farmId True.', 'Invalid farmId None.',
+            'Invalid farmId 1.5.',
+        ])
+
+
+class StreamingImporterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        # Records come before the farms they reference.
+        self.document = {
+            'version': 2,
+            'fuelRecords': [{
+                'farmId': 2, 'date': '2024-01-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+                'gallons': 3.5, 'hours_operated': 1, 'cost': 10,
+            }],
+            'tasks': [{'title': 'Fix fence', 'due_date': '2024-02-01', 'priority': 'high'}],
+            'farms': [
+                {'id': 1, 'name': 'A', 'size': '10', 'crop': 'corn', 'waterHistory': [
+                    {'amount': 10, 'date': '2024-01-01', 'efficiency': 80},
+                ]},
+                {'id': 2, 'name': 'B', 'size': '20', 'crop': 'wheat'},
+            ],
+            'plantingPlans': [{'description': 'Plant corn'}],
+        }
+
+    def stream(self, document):
+        file = SimpleUploadedFile('farms.json', json.dumps(document).encode())
+        return StreamingImporter(self.user, batch_size=1).run(file)
+
+    def stored(self):
+        return {
+            model._meta.db_table: sorted(model.objects.values_list(*merge_fields(model)), key=repr)
+            for model in IMPORT_MODELS
+        }
+
+    def test_matches_the_in_memory_importer(self):
+        expected = DataImporter(self.user).run(self.document)
+        stored = self.stored()
+        stats = self.stream(self.document)
+        self.assertEqual(self.stored(), stored)
+        self.assertEqual(
+            {table: entry['rows'] for table, entry in stats['tables'].items()},
+            {table: entry['rows'] for table, entry in expected['tables'].items()},
+        )
+        self.assertEqual(FuelRecord.objects.get().farm_id, 2)
+        self.assertEqual(FarmMetricsRollup.objects.get(farm_id=2).fuel_gallons, 3.5)
+
+    def test_renumbered_farms_keep_their_own_rows_across_batches(self):
+        seed_farms(2, owner=User.objects.create_user(username='other'))
+        # Farm 1 is renumbered onto 3, the archive id of the next farm, which
+        # is then renumbered too; the fuel record precedes both.
+        document = {
+            'fuelRecords': [dict(self.document['fuelRecords'][0], farmId=3)],
+            'farms': [
+                {'id': 1, 'name': 'A', 'size': '10', 'crop': 'corn', 'waterHistory': [
+                    {'amount': 1, 'date': '2024-01-01', 'efficiency': 80},
+                ]},
+                {'id': 3, 'name': 'B', 'size': '10', 'crop': 'corn', 'waterHistory': [
+                    {'amount': 2, 'date': '2024-01-01', 'efficiency': 80},
+                ]},
+            ],
+        }
+        self.stream(document)
+        farms = {farm.name: farm for farm in Farm.objects.for_owner(self.user)}
+        self.assertEqual((farms['A'].pk, farms['B'].pk), (3, 4))
+        self.assertEqual(list(farms['A'].water_history.values_list('amount', flat=True)), [1])
+        self.assertEqual(list(farms['B'].water_history.values_list('amount', flat=True)), [2])
+        self.assertEqual(FuelRecord.objects.get(owner=self.user).farm_id, 4)
+
+    def test_iterates_top_level_items_in_document_order(self):
+        file = SimpleUploadedFile('farms.json', json.dumps(self.document).encode())
+        self.assertEqual(
+            [(section, item.get('name')) for section, item in iter_top_level_items(file)],
+            [('fuelRecords', None), ('tasks', None), ('farms', 'A'), ('farms', 'B'), ('plantingPlans', None)],
+        )
+
+    def test_unknown_farm_or_malformed_json_writes_nothing(self):
+        seed_farms(1, owner=self.user)
+        self.document['fuelRecords'][0]['farmId'] = 3
+        with self.assertRaises(ImportValidationError) as raised:
+            self.stream(self.document)
+        self.assertEqual(raised.exception.errors, [{'section': 'fuelRecords', 'index': 0, 'error': 'Unknown farmId 3.'}])
+
+        upload = SimpleUploadedFile('farms.json', json.dumps(self.document).encode()[:-30])
+        response = self.client.post('/api/import/?mode=stream', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(Farm.objects.values_list('name', flat=True)), ['Farm 1'])
+        self.assertEqual(FuelRecord.objects.count(), 1)
+
+
+class FarmMetricsRollupTests(APITestCase):
+    def rollups(self):
+        return {
+            row.pop('farm_id'): row
+            for row in FarmMetricsRollup.objects.order_by('farm_id').values(
+                'farm_id', 'fuel_gallons', 'fuel_cost', 'energy_amount', 'renewable_energy_amount',
+                'soil_record_count', 'soil_ph_total',
+            )
+        }
+
+    def test_incremental_updates_match_rebuild(self):
+        seed_farms(2)
+        energy = EnergyRecord.objects.create(
+            farm_id=1, date=date(2024, 3, 1), energy_type='solar', amount=40, unit='kWh',
+            renewable=True, cost=5, purpose='Pumps',
+        )
+        soil = SoilRecord.objects.create(
+            farm_id=1, date=date(2024, 3, 1), location='North', ph=6.0, organic_matter=3,
+            nitrogen=1, phosphorus=1, potassium=1, moisture=1,
+        )
+        energy.renewable = False
+        energy.save()
+        soil.farm_id = 2
+        soil.save()
+        FuelRecord.objects.filter(farm_id=2).get().delete()
+
+        incremental = self.rollups()
+        self.assertEqual(incremental[1]['renewable_energy_amount'], 0)
+        self.assertEqual(incremental[2]['soil_record_count'], 1)
+        self.assertEqual(incremental[2]['fuel_gallons'], 0)
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_import_rebuilds_rollups(self):
+        DataImporter(User.objects.create_user(username='farmer')).run({
+            'farms': [{'id': 1, 'name': 'A', 'size': '10', 'crop': 'corn'}],
+            'fuelRecords': [{
+                'farmId': 1, 'date': '2024-01-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+                'gallons': 3, 'hours_operated': 1, 'cost': 10,
+            }],
+        })
+        self.assertEqual(FarmMetricsRollup.objects.get(farm_id=1).fuel_cost, 10)
+
+
+class ScoringTests(APITestCase):
+    # Expected scores were computed by running calculateWaterEfficiency,
+    # calculateOrganicScore, calculateHarvestEfficiency,
+    # calculateSoilQualityScore and calculateSustainabilityMetrics from
+    # src/artifacts/utils.ts on the same farms, with farm 1's weather as
+    # weatherData and Math.round applied to the per-farm scores.
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        cell = grid_cell(41.6, -93.6)
+        for day, code, temperature in [
+            (date(2024, 5, 9), 61, 20), (date(2024, 5, 10), 63, 32), (date(2024, 6, 1), 65, 25),
+            (date(2024, 7, 1), 1, 28), (date(2024, 8, 1), 2, 30),
+        ]:
+            WeatherObservation.objects.create(
+                cell_latitude=cell[0], cell_longitude=cell[1], date=day, temperature_max=temperature,
+                temperature_min=10, precipitation=5 if code > 49 else 0, weather_code=code, source='stub',
+                fetched_at=timezone.now(),
+            )
+        rainy = Farm.objects.create(id=1, owner=self.user, name='Rainy', size='10', crop='corn', latitude=41.6, longitude=-93.6)
+        dry = Farm.objects.create(id=2, owner=self.user, name='Dry', size='10', crop='corn', latitude=10, longitude=10)
+        bare = Farm.objects.create(id=3, owner=self.user, name='Bare', size='10', crop='corn')
+
+        for farm, day in [(rainy, date(2024, 5, 1)), (rainy, date(2024, 5, 10)), (dry, date(2024, 4, 1))]:
+            WaterHistory.objects.create(farm=farm, owner=self.user, amount=10, date=day, efficiency=80)
+        for farm, kind, amount in [
+            (rainy, 'Compost', 300), (rainy, 'Urea', 1500), (rainy, 'Manure', 200), (rainy, 'Organic blend', 100),
+            (bare, 'Urea', 5000),
+        ]:
+            FertilizerHistory.objects.create(farm=farm, owner=self.user, type=kind, amount=amount, date=date(2024, 3, 1))
+        for farm, amount, day in [
+            (rainy, 5, date(2024, 6, 1)), (rainy, 7, date(2024, 7, 1)), (rainy, 9, date(2024, 8, 1)),
+            (dry, 4, date(2024, 9, 1)), (bare, 0, date(2024, 10, 1)), (bare, 0, date(2024, 10, 2)),
+        ]:
+            HarvestHistory.objects.create(farm=farm, owner=self.user, yield_amount=amount, date=day)
+        # The browser reads farm.organicMatter and farm.soilPH; the server
+        # takes them from the latest soil record.
+        for farm, day, ph, organic_matter in [
+            (rainy, date(2023, 1, 1), 5.0, 1), (rainy, date(2024, 1, 1), 6.0, 3), (bare, date(2024, 1, 1), 9, 0),
+        ]:
+            SoilRecord.objects.create(
+                farm=farm, owner=self.user, date=day, location='North', ph=ph, organic_matter=organic_matter,
+                nitrogen=1, phosphorus=1, potassium=1, moisture=1,
+            )
+
+    def metrics(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_scores_match_the_browser_implementation(self):
+        metrics = self.metrics()
+        scores = {
+            farm['farmId']: [farm[metric] for metric in FARM_METRICS]
+            for farm in metrics['farms']
+        }
+        # waterEfficiency, organicScore, harvestEfficiency, soilQualityScore, rotationScore
+        self.assertEqual(scores, {1: [32, 71, 90, 83, 0], 2: [100, 70, 100, 70, 0], 3: [0, 40, 100, 58, 0]})
+        self.assertEqual({metric: metrics['overall'][metric] for metric in ['overallScore', *FARM_METRICS]}, {
+            'overallScore': 73, 'waterEfficiency': 66, 'organicScore': 60, 'harvestEfficiency': 97,
+            'soilQualityScore': 70, 'rotationScore': 0,
+        })
+
+    def test_metrics_endpoint_scores_trackers_from_rollups(self):
+        EmissionSource.objects.create(farm_id=1, owner=self.user, date=date(2024, 1, 1), source_type='Diesel', co2_equivalent=100)
+        SequestrationActivity.objects.create(
+            farm_id=1, owner=self.user, date=date(2024, 1, 1), activity_type='Cover crop', co2_sequestered=40, area=2,
+        )
+        for renewable, amount in [(True, 30), (False, 90)]:
+            EnergyRecord.objects.create(
+                farm_id=1, owner=self.user, date=date(2024, 1, 1), energy_type='grid', amount=amount, unit='kWh',
+                renewable=renewable, cost=5, purpose='Pumps',
+            )
+        FuelRecord.objects.create(
+            farm_id=1, owner=self.user, date=date(2024, 1, 1), equipment_name='Tractor', fuel_type='diesel',
+            gallons=12, hours_operated=3, cost=40,
+        )
+        seed_farms(1, start=4, owner=User.objects.create_user(username='other'))
+
+        metrics = self.metrics()
+        self.assertEqual([farm['farmId'] for farm in metrics['farms']], [1, 2, 3])
+        trackers = ['carbonFootprint', 'energyEfficiency', 'fuelEfficiency', 'renewablePercentage', 'carbonIntensityPerAcre']
+        farms = {farm['farmId']: [farm[metric] for metric in trackers] for farm in metrics['farms']}
+        self.assertEqual(farms, {1: [40, 63, 75, 25.0, 6.0], 2: [0, 0, 0, 0.0, 0.0], 3: [0, 0, 0, 0.0, 0.0]})
+        # Overall intensity spreads the net emissions over all 30 acres.
+        self.assertEqual([metrics['overall'][metric] for metric in trackers], [40, 63, 75, 25.0, 2.0])
+
+
+class LocalStorageSyncTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+
+    def save(self, data):
+        response = self.client.post('/api/sync/localstorage/save/', data, format='json')
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return response.json()['revision']
+
+    def patch(self, base_revision, changed=None, removed=None):
+        payload = {'base_revision': base_revision, 'set': changed or {}, 'remove': removed or []}
+        return self.client.post('/api/sync/localstorage/patch/', payload, format='json')
+
+    def load(self):
+        response = self.client.get('/api/sync/localstorage/load/', {'include_revision': 1})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_each_write_increments_the_revision(self):
+        self.assertEqual(self.load(), {'revision': 0, 'data': {}})
+        self.assertEqual(self.save({'farms': [1], 'theme': 'dark'}), 1)
+        response = self.patch(1, {'theme': 'light'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['revision'], 2)
+        self.assertEqual(self.load(), {'revision': 2, 'data': {'farms': [1], 'theme': 'light'}})
+
+    def test_stale_base_revision_gets_the_missing_delta(self):
+        self.save({'farms': [1], 'theme': 'dark', 'draft': 'x'})
+        self.patch(1, {'theme': 'light'}, ['draft'])
+
+        response = self.patch(1, {'farms': [1, 2]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['revision'], 2)
+        self.assertEqual(response.json()['changes'], {'full': False, 'set': {'theme': 'light'}, 'remove': ['draft']})
+        self.assertEqual(self.load()['data']['farms'], [1])
+
+        # A client ahead of the server (data reset) gets the whole snapshot.
+        changes = self.patch(7, {'farms': [1, 2]}).json()['changes']
+        self.assertEqual(changes, {'full': True, 'set': {'farms': [1], 'theme': 'light'}, 'remove': []})
+
+    def test_removed_keys_are_kept_as_tombstones(self):
+        self.save({'theme': 'dark', 'draft': 'x'})
+        self.assertEqual(self.patch(1, removed=['draft']).json()['revision'], 2)
+        self.assertEqual(self.load()['data'], {'theme': 'dark'})
+        tombstone = LocalStorageEntry.objects.get(user=self.user, key='draft')
+        self.assertEqual((tombstone.deleted, tombstone.value, tombstone.revision), (True, None, 2))
+
+        # Setting the key again revives the row in a new revision.
+        self.assertEqual(self.patch(2, {'draft': 'y'}).json()['revision'], 3)
+        self.assertEqual(self.patch(1).json()['changes']['set'], {'draft': 'y'})
+        self.assertEqual(LocalStorageEntry.objects.filter(user=self.user, key='draft').count(), 1)
+
+    def test_keys_are_stored_one_row_each(self):
+        self.save({'farms': [{'id': 1}], 'theme': 'dark'})
+        rows = dict(LocalStorageEntry.objects.filter(user=self.user).values_list('key', 'value'))
+        self.assertEqual(rows, {'farms': [{'id': 1}], 'theme': 'dark'})
+
+    def test_unchanged_values_are_not_rewritten(self):
+        self.save({'farms': [1], 'theme': 'dark'})
+        self.assertEqual(self.save({'theme': 'dark', 'farms': [1]}), 1)
+        self.assertEqual(self.patch(1, {'theme': 'dark'}).json()['revision'], 1)
+
+        self.assertEqual(self.save({'farms': [1], 'theme': 'light'}), 2)
+        revisions = dict(LocalStorageEntry.objects.filter(user=self.user).values_list('key', 'revision'))
+        self.assertEqual(revisions, {'farms': 1, 'theme': 2})
+
+    def test_rejects_keys_longer_than_the_column(self):
+        key = 'k' * 256
+        response = self.client.post('/api/sync/localstorage/save/', {key: 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.patch(0, {key: 1}).status_code, 400)
+        self.assertEqual(self.patch(0, removed=[key]).status_code, 400)
+        self.assertFalse(LocalStorageEntry.objects.exists())
+        self.assertEqual(self.save({'k' * 255: 1}), 1)
+
+    def test_load_revalidates_with_etag(self):
+        self.save({'theme': 'dark'})
+        response = self.client.get('/api/sync/localstorage/load/')
+        etag = response['ETag']
+        self.assertEqual(response.json(), {'theme': 'dark'})
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Authorization', response['Vary'])
+
+        cached = self.client.get('/api/sync/localstorage/load/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertIn('Authorization', cached['Vary'])
+        # GZipMiddleware hands out weak tags; they still match.
+        weak = self.client.get('/api/sync/localstorage/load/', HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(weak.status_code, 304)
+
+        # The revisioned representation has its own tag.
+        revisioned = self.client.get('/api/sync/localstorage/load/?include_revision=1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revisioned.status_code, 200)
+        self.assertNotEqual(revisioned['ETag'], etag)
+
+        self.patch(1, {'theme': 'light'})
+        changed = self.client.get('/api/sync/localstorage/load/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json(), {'theme': 'light'})
+        self.assertNotEqual(changed['ETag'], etag)
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        self.large = {'farms': [{'id': n, 'name': f'Farm {n}', 'crop': 'corn'} for n in range(100)]}
+
+    def test_large_values_round_trip_compressed(self):
+        self.assertEqual(encode_value({'theme': 'dark'}), ({'theme': 'dark'}, None, ''))
+        value, blob, codec = encode_value(self.large)
+        self.assertIsNone(value)
+        self.assertEqual(codec, preferred_codec())
+        self.assertEqual(decode_value(value, blob, codec), self.large)
+
+        save_snapshot(self.user, {'big': self.large, 'small': 1})
+        entry = LocalStorageEntry.objects.get(key='big')
+        self.assertEqual((entry.value, entry.compression), (None, preferred_codec()))
+        self.assertEqual(load_entries(self.user), {'big': self.large, 'small': 1})
+
+    def test_rows_in_older_formats_still_load(self):
+        save_snapshot(self.user, {'legacy': 0, 'zlib': 0})
+        # Written before compression existed, and with a codec no longer preferred.
+        LocalStorageEntry.objects.filter(key='legacy').update(value=self.large)
+        LocalStorageEntry.objects.filter(key='zlib').update(
+            value=None, compressed_value=compress(json.dumps(self.large).encode(), 'zlib'), compression='zlib',
+        )
+        self.assertEqual(load_entries(self.user), {'legacy': self.large, 'zlib': self.large})
+
+    def post_encoded(self, body, encoding):
+        return self.client.generic(
+            'POST', '/api/sync/localstorage/save/', body,
+            content_type='application/json', HTTP_CONTENT_ENCODING=encoding,
+        )
+
+    def test_accepts_gzip_request_bodies(self):
+        response = self.post_encoded(gzip.compress(json.dumps(self.large).encode()), 'gzip')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(load_entries(self.user), self.large)
+
+    @skipUnless(zstandard, 'zstandard is not installed')
+    def test_accepts_zstd_request_bodies(self):
+        response = self.post_encoded(compress(json.dumps(self.large).encode(), 'zstd'), 'zstd')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(load_entries(self.user), self.large)
+        self.assertEqual(self.post_encoded(b'not zstd', 'zstd').status_code, 400)
+
+    @override_settings(MAX_DECOMPRESSED_BODY_SIZE=1024)
+    def test_rejects_bad_request_bodies(self):
+        body = json.dumps(self.large).encode()
+        self.assertEqual(self.post_encoded(body, 'br').status_code, 415)
+        self.assertEqual(self.post_encoded(gzip.compress(body), 'gzip').status_code, 413)
+        self.assertEqual(self.post_encoded(b'not gzip', 'gzip').status_code, 400)
+        self.assertFalse(LocalStorageEntry.objects.exists())
+
+
+class MergeImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        self.document = {
+            'farms': [{'id': 1, 'name': 'A', 'size': '10', 'crop': 'corn', 'waterHistory': [
+                {'amount': 10, 'date': '2024-01-01', 'efficiency': 80},
+                {'amount': 12, 'date': '2024-01-02', 'efficiency': 80},
+            ]}],
+            'fuelRecords': [
+                {'id': 5, 'farmId': 1, 'date': '2024-01-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+                 'gallons': 3, 'hours_operated': 1, 'cost': 10},
+                {'id': 6, 'farmId': 1, 'date': '2024-01-02', 'equipment_name': 'Truck', 'fuel_type': 'diesel',
+                 'gallons': 4, 'hours_operated': 1, 'cost': 12},
+            ],
+        }
+        DataImporter(self.user).run(self.document)
+        self.water_ids = list(WaterHistory.objects.order_by('date').values_list('id', flat=True))
+
+    def merge(self, delete_missing=False):
+        upload = SimpleUploadedFile('farms.json', json.dumps(self.document).encode(), content_type='application/json')
+        url = '/api/import/?merge=true' + ('&delete_missing=true' if delete_missing else '')
+        response = self.client.post(url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def test_merge_writes_only_changes(self):
+        self.document['fuelRecords'][0]['gallons'] = 7
+        self.document['farms'][0]['waterHistory'].append({'amount': 9, 'date': '2024-01-03', 'efficiency': 70})
+        stats = self.merge()
+        self.assertEqual(
+            {name: stats[name] for name in ('inserted', 'updated', 'unchanged', 'deleted')},
+            {'inserted': 1, 'updated': 1, 'unchanged': 4, 'deleted': 0},
+        )
+        self.assertEqual(stats['tables']['water_history']['inserted'], 1)
+        # History rows carry no ids and are matched on (farm, date).
+        self.assertEqual(list(WaterHistory.objects.order_by('date').values_list('id', flat=True))[:2], self.water_ids)
+        self.assertEqual(FuelRecord.objects.get(id=5).gallons, 7)
+        self.assertEqual(FarmMetricsRollup.objects.get(farm_id=1).fuel_gallons, 11)
+
+    def test_delete_missing_removes_only_rows_the_archive_lacks(self):
+        del self.document['fuelRecords'][1]
+        del self.document['farms'][0]['waterHistory'][0]
+        self.assertEqual(self.merge()['deleted'], 0)
+        self.assertEqual(FuelRecord.objects.count(), 2)
+
+        stats = self.merge(delete_missing=True)
+        self.assertEqual((stats['deleted'], stats['unchanged']), (2, 3))
+        self.assertEqual(list(FuelRecord.objects.values_list('id', flat=True)), [5])
+        self.assertEqual(list(WaterHistory.objects.values_list('id', flat=True)), self.water_ids[1:])
+        self.assertEqual(FarmMetricsRollup.objects.get(farm_id=1).fuel_cost, 10)
+
+    def partition_by_owner(self, table):
+        # SQLite cannot partition. Rebuild the table with the key that
+        # partition_farm_history leaves behind, (id, owner_id), and nothing
+        # unique on id alone, which is what the upsert's target must match.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", [table])
+            create = cursor.fetchone()[0].replace('"id" integer NOT NULL PRIMARY KEY AUTOINCREMENT', '"id" integer NOT NULL')
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{table}_unpartitioned"')
+            cursor.execute(create[:create.rindex(')')] + ', PRIMARY KEY ("id", "owner_id"))')
+            cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{table}_unpartitioned"')
+            cursor.execute(f'DROP TABLE "{table}_unpartitioned"')
+
+    def test_merge_upserts_into_table_partitioned_by_owner(self):
+        self.partition_by_owner('fuel_records')
+        self.document['fuelRecords'][0]['gallons'] = 7
+        self.document['fuelRecords'].append({
+            'id': 8, 'farmId': 1, 'date': '2024-01-03', 'equipment_name': 'Sprayer', 'fuel_type': 'diesel',
+            'gallons': 2, 'hours_operated': 1, 'cost': 8,
+        })
+        fuel = self.merge()['tables']['fuel_records']
+        self.assertEqual((fuel['inserted'], fuel['updated'], fuel['unchanged']), (1, 1, 1))
+        self.assertEqual(dict(FuelRecord.objects.values_list('id', 'gallons')), {5: 7, 6: 4, 8: 2})
+
+    def test_merge_looks_up_stored_rows_per_batch(self):
+        # Two stored rows share the (farm, date) key; later batches must not
+        # match a row an earlier batch claimed.
+        self.document['farms'][0]['waterHistory'].append({'amount': 11, 'date': '2024-01-01', 'efficiency': 80})
+        DataImporter(self.user).run(self.document)
+        self.document['farms'][0]['waterHistory'][2]['amount'] = 13
+        importer = StreamingImporter(self.user, batch_size=1, merge=True)
+        stats = importer.run(SimpleUploadedFile('farms.json', json.dumps(self.document).encode()))
+        water = stats['tables']['water_history']
+        self.assertEqual((water['inserted'], water['updated'], water['unchanged']), (0, 1, 2))
+        self.assertEqual(sorted(WaterHistory.objects.values_list('amount', flat=True)), [10, 12, 13])
+        self.assertLessEqual(len(importer.stored[WaterHistory].values), 1)
+
+
+# Required non-date fields for seeding each time-series table.
+TIME_SERIES_ROWS = {
+    WaterHistory: {'amount': 10, 'efficiency': 80},
+    FertilizerHistory: {'type': 'Compost', 'amount': 20},
+    HarvestHistory: {'yield_amount': 5},
+    FuelRecord: {'equipment_name': 'Tractor', 'fuel_type': 'diesel', 'gallons': 4, 'hours_operated': 2, 'cost': 12},
+    SoilRecord: {
+        'location': 'North', 'ph': 6.5, 'organic_matter': 3, 'nitrogen': 1, 'phosphorus': 1,
+        'potassium': 1, 'moisture': 1,
+    },
+    EmissionSource: {'source_type': 'Diesel', 'co2_equivalent': 10},
+    SequestrationActivity: {'activity_type': 'Cover crop', 'co2_sequestered': 4, 'area': 1},
+    EnergyRecord: {'energy_type': 'electricity', 'amount': 50, 'unit': 'kWh', 'cost': 9, 'purpose': 'Pumps'},
+}
+
+
+class TimeSeriesIndexTests(TestCase):
+    farms = 40
+    days = 60
+    start = date(2024, 1, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        # Farms are spread over several owners, as on a shared database.
+        cls.owners = [User.objects.create_user(username=f'owner{n}') for n in range(4)]
+        Farm.objects.bulk_create([
+            Farm(id=farm_id, owner=cls.owners[farm_id % 4], name=f"Farm {farm_id}", size='10', crop='corn')
+            for farm_id in range(1, cls.farms + 1)
+        ])
+        for model, fields in TIME_SERIES_ROWS.items():
+            model.objects.bulk_create([
+                model(farm_id=farm_id, owner=cls.owners[farm_id % 4], date=cls.start + timedelta(days=day), **fields)
+                for farm_id in range(1, cls.farms + 1)
+                for day in range(cls.days)
+            ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def index_name(self, model):
+        (index,) = model._meta.indexes
+        return index.name
+
+    def test_farm_date_range_queries_use_composite_index(self):
+        for model in TIME_SERIES_ROWS:
+            with self.subTest(model=model.__name__):
+                plan = model.objects.for_owner(self.owners[3]).filter(
+                    farm_id=7, date__gte=self.start + timedelta(days=10), date__lt=self.start + timedelta(days=20),
+                ).order_by('date').explain()
+                self.assertIn(self.index_name(model), plan)
+
+    def test_rollup_columns_are_read_from_index(self):
+        plan = EmissionSource.objects.for_owner(self.owners[3]).values_list('farm_id', 'co2_equivalent').explain()
+        self.assertIn(self.index_name(EmissionSource), plan)
+
+
+class KeysetListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        seed_farms(2, owner=self.user)
+        FuelRecord.objects.bulk_create([
+            FuelRecord(
+                farm_id=1, owner=self.user, date=date(2024, 3, 1) + timedelta(days=n // 4), equipment_name='Tractor',
+                fuel_type='diesel', gallons=1, hours_operated=1, cost=1,
+            )
+            for n in range(25)
+        ])
+
+    def test_pages_cover_farm_records_in_date_order(self):
+        expected = list(FuelRecord.objects.filter(farm_id=1).order_by('date', 'id').values_list('id', flat=True))
+        url = '/api/fuel-records/?farm=1&page_size=4'
+        seen = []
+        while url:
+            page = self.client.get(url).json()
+            seen += [row['id'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(page['previous']).json()
+        self.assertEqual([row['id'] for row in previous['results']], expected[-6:-2])
+
+    def test_date_range_filter(self):
+        response = self.client.get('/api/fuel-records/?farm=1&date_from=2024-03-02&date_to=2024-03-02')
+        self.assertEqual([row['date'] for row in response.json()['results']], ['2024-03-02'] * 4)
+        self.assertEqual(self.client.get('/api/fuel-records/?date_from=March').status_code, 400)
+
+
+class JSONRenderingTests(APITestCase):
+    def test_renderer_writes_the_same_bytes_as_drf(self):
+        data = {
+            'name': 'Ferme du Lac ü', 'size': 12.5, 'tags': [1, None, True], 'day': date(2024, 1, 1),
+            'amount': Decimal('1.10'), 'ids': {1: 'a'},
+            'created': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'updated': datetime(2024, 5, 1, tzinfo=dt_timezone.utc),
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), JSONRenderer().render(None))
+
+    def test_parser_reads_the_same_values_as_drf(self):
+        body = '{"name": "Ferme ü", "size": 12.5, "ids": [1, 2], "empty": {}, "none": null}'.encode()
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        for malformed in (b'[1, 2', b'{"a": NaN}', b'{"a": 1,}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(BytesIO(malformed))
+
+    def test_values_serializer_renders_like_its_model_serializer(self):
+        user = User.objects.create_user(username='farmer')
+        seed_farms(2, owner=user)
+        Task.objects.create(owner=user, title='Fix fence', due_date=date(2024, 2, 1), priority='high')
+        PlanItem.objects.create(owner=user, plan_type='Planting', description='Plant corn')
+        EnergyRecord.objects.create(
+            farm_id=1, owner=user, date=date(2024, 3, 1), energy_type='solar', amount=40.25, unit='kWh',
+            renewable=True, cost=5, purpose='Pumps',
+        )
+        for view in [FarmListView, TaskListView, PlanItemListView, FuelRecordListView, EnergyRecordListView]:
+            serializer_class = view.serializer_class
+            queryset = serializer_class.Meta.model.objects.order_by('id')
+            fast = ValuesSerializer(serializer_class)
+            self.assertEqual(
+                ORJSONRenderer().render(fast.to_representation(fast.values(queryset))),
+                JSONRenderer().render(serializer_class(queryset, many=True).data),
+                view.__name__,
+            )
+
+
+class SeriesTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        self.farm = Farm.objects.create(id=1, owner=self.user, name='Farm', size='10', crop='corn')
+        other = Farm.objects.create(id=2, owner=self.user, name='Other', size='10', crop='corn')
+        for farm, day, equipment, gallons in [
+            (self.farm, date(2024, 1, 5), 'Tractor', 10), (self.farm, date(2024, 1, 20), 'Truck', 30),
+            (self.farm, date(2024, 2, 3), 'Tractor', 5), (other, date(2024, 1, 5), 'Tractor', 1000),
+        ]:
+            FuelRecord.objects.create(
+                farm=farm, owner=self.user, date=day, equipment_name=equipment, fuel_type='diesel',
+                gallons=gallons, hours_operated=1, cost=gallons * 4,
+            )
+
+    def test_monthly_buckets_are_aggregated_in_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/series/fuel/', {'farm': 1, 'fields': 'gallons,cost'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum('fuel_records' in query['sql'] for query in queries), 1)
+        self.assertEqual(response.json()['buckets'], [
+            {'period': '2024-01-01', 'count': 2, 'gallons': {'sum': 40.0, 'avg': 20.0, 'min': 10.0, 'max': 30.0},
+             'cost': {'sum': 160.0, 'avg': 80.0, 'min': 40.0, 'max': 120.0}},
+            {'period': '2024-02-01', 'count': 1, 'gallons': {'sum': 5.0, 'avg': 5.0, 'min': 5.0, 'max': 5.0},
+             'cost': {'sum': 20.0, 'avg': 20.0, 'min': 20.0, 'max': 20.0}},
+        ])
+
+        grouped = self.client.get('/api/series/fuel/', {'farm': 1, 'fields': 'gallons', 'group': 'equipment_name'})
+        self.assertEqual(
+            [(row['period'], row['equipment_name'], row['gallons']['sum']) for row in grouped.json()['buckets']],
+            [('2024-01-01', 'Tractor', 10.0), ('2024-01-01', 'Truck', 30.0), ('2024-02-01', 'Tractor', 5.0)],
+        )
+        yearly = self.client.get('/api/series/fuel/', {'bucket': 'year', 'fields': 'gallons'}).json()['buckets']
+        self.assertEqual(yearly, [{'period': '2024-01-01', 'count': 4, 'gallons': {'sum': 1045.0, 'avg': 261.25, 'min': 5.0, 'max': 1000.0}}])
+
+    def test_raw_points_are_downsampled_to_the_limit(self):
+        response = self.client.get('/api/series/fuel/', {'farm': 1, 'mode': 'raw', 'field': 'gallons', 'points': 3})
+        self.assertEqual(response.json()['points'], [
+            {'date': '2024-01-05', 'value': 10.0}, {'date': '2024-01-20', 'value': 30.0}, {'date': '2024-02-03', 'value': 5.0},
+        ])
+
+        x = np.arange(1000)
+        y = np.sin(x / 50)
+        y[500] = 10
+        kept = lttb(x, y, 50)
+        self.assertEqual(len(kept), 50)
+        self.assertEqual((kept[0], kept[-1]), (0, 999))
+        self.assertIn(500, kept)
+        self.assertTrue(np.all(np.diff(kept) > 0))
+
+    def test_rejects_unknown_names_and_parameters(self):
+        self.assertEqual(self.client.get('/api/series/tasks/').status_code, 404)
+        for params in ({'bucket': 'hour'}, {'fields': 'notes'}, {'group': 'notes'}, {'mode': 'raw', 'points': 1}):
+            self.assertEqual(self.client.get('/api/series/fuel/', params).status_code, 400, params)
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        other = User.objects.create_user(username='neighbour', password='secret')
+        self.client.force_authenticate(self.user)
+        farm = Farm.objects.create(id=1, owner=self.user, name='Farm', size='10', crop='corn')
+        Task.objects.create(owner=self.user, title='Repair irrigation pump', due_date=date(2024, 5, 1), priority='high')
+        Task.objects.create(owner=other, title='Repair irrigation pump', due_date=date(2024, 5, 1), priority='high')
+        Issue.objects.create(owner=self.user, title='Fence down by the creek', status='open')
+        self.plan = PlanItem.objects.create(owner=self.user, plan_type='water', description='Service the pumps before irrigating')
+        self.fuel = FuelRecord.objects.create(
+            farm=farm, owner=self.user, date=date(2024, 2, 1), equipment_name='Tractor', fuel_type='diesel',
+            gallons=12.5, hours_operated=3, cost=40, notes='Ran the irrigation pump generator',
+        )
+
+    def search(self, q, **params):
+        response = self.client.get('/api/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_ranks_stemmed_matches_across_types_for_the_owner(self):
+        results = self.search('pumping')['results']
+        rank = {hit['type']: hit['rank'] for hit in results}
+        # Matches in a title outrank matches in notes.
+        self.assertGreater(rank['task'], rank['fuel'])
+        self.assertEqual(results[-1]['type'], 'fuel')
+        self.assertEqual({(hit['type'], hit['title']) for hit in results}, {
+            ('task', 'Repair irrigation pump'), ('plan', 'Service the pumps before irrigating'), ('fuel', 'Tractor'),
+        })
+        fuel = next(hit for hit in results if hit['type'] == 'fuel')
+        self.assertEqual((fuel['text'], fuel['farm_id'], fuel['date']), ('Ran the irrigation pump generator', 1, '2024-02-01'))
+        self.assertEqual([hit['type'] for hit in self.search('irrigation pump', types='fuel,issue')['results']], ['fuel'])
+        self.assertEqual([hit['title'] for hit in self.search('cre')['results']], ['Fence down by the creek'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.plan.description = 'Order seed'
+        self.plan.save()
+        self.fuel.delete()
+        self.assertEqual([hit['type'] for hit in self.search('pump')['results']], ['task'])
+        self.assertEqual([hit['type'] for hit in self.search('seed')['results']], ['plan'])
+
+    def test_pages_and_rejects_bad_parameters(self):
+        first = self.search('pump', page_size=2)
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+        self.assertNotIn(second['results'][0], first['results'])
+        for params in ({'q': '  *'}, {'q': 'pump', 'types': 'farm'}, {'q': 'pump', 'page_size': 0}, {'q': 'pump', 'page': 'x'}):
+            self.assertEqual(self.client.get('/api/search/', params).status_code, 400, params)
+
+
+class TypeaheadTests(APITestCase):
+    def setUp(self):
+        typeahead.cache.clear()
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        other = User.objects.create_user(username='neighbour', password='secret')
+        self.client.force_authenticate(self.user)
+        farm = Farm.objects.create(id=1, owner=self.user, name='Farm', size='10', crop='corn')
+        theirs = Farm.objects.create(id=2, owner=other, name='Theirs', size='10', crop='corn')
+        for owned_by, equipment in [
+            (farm, 'Tractor'), (farm, 'Tractor'), (farm, 'Backhoe tractor'), (farm, 'Truck'), (theirs, 'Tractor trailer'),
+        ]:
+            FuelRecord.objects.create(
+                farm=owned_by, owner=owned_by.owner, date=date(2024, 1, 1), equipment_name=equipment, fuel_type='diesel',
+                gallons=1, hours_operated=1, cost=4,
+            )
+
+    def suggest(self, field, q, **params):
+        response = self.client.get(f'/api/typeahead/{field}/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(row['value'], row['count']) for row in response.json()['values']]
+
+    def test_prefix_matches_first_then_most_used(self):
+        self.assertEqual(self.suggest('equipment_name', 'TRAC'), [('Tractor', 2), ('Backhoe tractor', 1)])
+        self.assertEqual(self.suggest('equipment_name', ''), [('Tractor', 2), ('Backhoe tractor', 1), ('Truck', 1)])
+        self.assertEqual(self.suggest('equipment_name', 't', limit=1), [('Tractor', 2)])
+        self.assertEqual(self.suggest('farm_name', 'f'), [('Farm', 1)])
+
+    def test_hot_prefixes_are_served_from_the_cache(self):
+        self.suggest('equipment_name', 'tr')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.suggest('equipment_name', 'Tr'), [('Tractor', 2), ('Truck', 1), ('Backhoe tractor', 1)])
+        self.assertFalse(any('fuel_records' in query['sql'] for query in queries))
+
+        cache = typeahead.PrefixCache(size=2, ttl=60)
+        for key in 'abc':
+            cache.set(key, key)
+        self.assertEqual([cache.get(key) for key in 'abc'], [None, 'b', 'c'])
+        cache.ttl = -1
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('d'))
+
+    def test_rejects_unknown_fields_and_parameters(self):
+        self.assertEqual(self.client.get('/api/typeahead/notes/').status_code, 404)
+        for params in ({'limit': 0}, {'limit': 'x'}, {'q': 'x' * 101}):
+            self.assertEqual(self.client.get('/api/typeahead/crop/', params).status_code, 400, params)
+
+
+class BatchWriteTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        seed_farms(2, owner=self.user)
+
+    def fuel(self, farm_id=1, gallons=5):
+        return {
+            'farm_id': farm_id, 'date': '2024-04-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+            'gallons': gallons, 'hours_operated': 1, 'cost': 20,
+        }
+
+    def post(self, operations):
+        return self.client.post('/api/fuel-records/batch/', {'operations': operations}, format='json')
+
+    def test_mixed_batch_applies_and_keeps_rollups_current(self):
+        existing = list(FuelRecord.objects.order_by('farm_id').values_list('id', flat=True))
+        response = self.post([
+            {'op': 'create', 'data': self.fuel()},
+            {'op': 'update', 'id': existing[0], 'data': {'farm_id': 2, 'gallons': 7}},
+            {'op': 'delete', 'id': existing[1]},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created', 'updated', 'deleted'])
+        self.assertEqual(FuelRecord.objects.get(id=existing[0]).gallons, 7)
+        self.assertFalse(FuelRecord.objects.filter(id=existing[1]).exists())
+
+        incremental = {row.farm_id: row.fuel_gallons for row in FarmMetricsRollup.objects.all()}
+        rebuild_rollups()
+        self.assertEqual({row.farm_id: row.fuel_gallons for row in FarmMetricsRollup.objects.all()}, incremental)
+        self.assertEqual(incremental, {1: 5, 2: 7})
+
+    def test_invalid_item_rejects_whole_batch(self):
+        response = self.post([
+            {'op': 'create', 'data': self.fuel()},
+            {'op': 'create', 'data': self.fuel(farm_id=99)},
+            {'op': 'delete', 'id': 12345},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['ok', 'error', 'error'])
+        self.assertEqual(FuelRecord.objects.count(), 2)
+
+
+class TenancyTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.other = User.objects.create_user(username='neighbour', password='secret')
+        seed_farms(2, owner=self.other)
+        self.client.force_authenticate(self.user)
+
+    def test_reads_and_writes_see_only_own_rows(self):
+        seed_farms(1, start=3, owner=self.user)
+        self.assertEqual([row['id'] for row in self.client.get('/api/farms/').json()['results']], [3])
+        self.assertEqual(self.client.get('/api/fuel-records/', {'farm': 1}).json()['results'], [])
+        self.assertEqual([farm['farmId'] for farm in self.client.get('/api/metrics/').json()['farms']], [3])
+        export = json.loads(b''.join(self.client.get('/api/export/').streaming_content))
+        self.assertEqual([farm['id'] for farm in export['farms']], [3])
+
+        theirs = FuelRecord.objects.for_owner(self.other).values_list('id', flat=True).first()
+        response = self.client.post('/api/fuel-records/batch/', {'operations': [
+            {'op': 'delete', 'id': theirs},
+            {'op': 'create', 'data': {
+                'farm_id': 1, 'date': '2024-04-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+                'gallons': 5, 'hours_operated': 1, 'cost': 20,
+            }},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(FuelRecord.objects.filter(id=theirs).exists())
+
+    def test_import_replaces_own_rows_and_renumbers_taken_ids(self):
+        document = {
+            'farms': [
+                {'id': 1, 'name': 'Mine', 'size': '10', 'crop': 'corn', 'waterHistory': [
+                    {'amount': 3, 'date': '2024-01-01', 'efficiency': 90},
+                ]},
+                {'id': 3, 'name': 'Free id', 'size': '10', 'crop': 'corn'},
+            ],
+            'fuelRecords': [{
+                'farmId': 1, 'date': '2024-01-01', 'equipment_name': 'Tractor', 'fuel_type': 'diesel',
+                'gallons': 3, 'hours_operated': 1, 'cost': 10,
+            }],
+        }
+        for mode in ('', 'stream'):
+            with self.subTest(mode=mode or 'json'):
+                upload = SimpleUploadedFile('farms.json', json.dumps(document).encode(), content_type='application/json')
+                response = self.client.post(f'/api/import/?mode={mode}', {'file': upload}, format='multipart')
+                self.assertEqual(response.status_code, 201, response.content)
+
+                self.assertEqual(list(Farm.objects.for_owner(self.other).values_list('id', flat=True)), [1, 2])
+                self.assertEqual(FuelRecord.objects.for_owner(self.other).count(), 2)
+                # Farm 1 is taken; its new id also stays clear of the archive's farm 3.
+                self.assertEqual(dict(Farm.objects.for_owner(self.user).values_list('name', 'id')), {'Mine': 4, 'Free id': 3})
+                farm = Farm.objects.get(id=4)
+                self.assertEqual(list(FuelRecord.objects.for_owner(self.user).values_list('farm_id', flat=True)), [farm.id])
+                self.assertEqual(list(farm.water_history.values_list('owner_id', flat=True)), [self.user.id])
+                self.assertEqual(FarmMetricsRollup.objects.get(farm=farm).fuel_cost, 10)
+
+
+class PartitioningTests(SimpleTestCase):
+    def test_statements_copy_rows_before_recreating_keys_and_indexes(self):
+        statements = partition_statements(
+            'fuel_records', 4,
+            ['CREATE INDEX fuel_rec_owner_farm_idx ON public.fuel_records USING btree (owner_id, farm_id, date)'],
+            [('fuel_records_farm_id_fk', 'FOREIGN KEY (farm_id) REFERENCES farms(id) DEFERRABLE INITIALLY DEFERRED')],
+            ['CREATE TRIGGER fuel_records_search_vector BEFORE INSERT ON public.fuel_records FOR EACH ROW '
+             'EXECUTE FUNCTION fuel_records_search_vector()'],
+        )
+        self.assertIn('PARTITION BY HASH ("owner_id")', statements[2])
+        partitions = [statement for statement in statements if 'PARTITION OF' in statement]
+        self.assertEqual(len(partitions), 4)
+        self.assertIn('FOR VALUES WITH (MODULUS 4, REMAINDER 3)', partitions[-1])
+        order = [
+            'INSERT INTO "fuel_records"', 'DROP TABLE "fuel_records_unpartitioned"', 'PRIMARY KEY ("id", "owner_id")',
+            'CREATE SEQUENCE', 'CREATE INDEX fuel_rec_owner_farm_idx', 'ADD CONSTRAINT "fuel_records_farm_id_fk"',
+            'CREATE TRIGGER fuel_records_search_vector',
+        ]
+        positions = [next(n for n, statement in enumerate(statements) if text in statement) for text in order]
+        self.assertEqual(positions, sorted(positions))
+        with self.assertRaises(ValueError):
+            partition_statements('fuel_records', 1, [], [])
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        response = self.client.post('/api/auth/login/', {'username': 'farmer', 'password': 'secret'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_cache_hits_return_the_same_token_as_misses(self):
+        stored = Token.objects.get(user=self.user)
+        authentication = CachedTokenAuthentication()
+        results = [authentication.authenticate_credentials(stored.key) for _ in range(2)]
+        for user, token in results:
+            self.assertEqual(user, self.user)
+            self.assertIsInstance(token, Token)
+            self.assertEqual((token.key, token.user_id, token.created), (stored.key, self.user.pk, stored.created))
+
+    def test_deactivation_and_logout_revoke_cached_tokens(self):
+        self.client.get('/api/auth/profile/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+
+class HealthCheckTests(APITestCase):
+    def test_health_is_public_and_skips_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/health/', HTTP_AUTHORIZATION='Token not-a-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 0)
+
+    def test_ready_checks_database_and_cache(self):
+        response = self.client.get('/api/ready/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['checks'], {'database': 'ok', 'cache': 'ok'})
+
+
+class RequestProfilingTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+        seed_farms(3, owner=self.user)
+
+    def test_server_timing_log_and_slow_profile_dump(self):
+        with tempfile.TemporaryDirectory() as dump_dir, override_settings(
+            REQUEST_PROFILING=True, REQUEST_PROFILING_SAMPLE_RATE=1, REQUEST_PROFILING_DIR=dump_dir,
+        ), self.assertLogs('api.profiling', 'INFO') as logs:
+            response = self.client.get('/api/metrics/')
+            dumps = list(Path(dump_dir).glob('*-GET-api-metrics-*ms.prof'))
+
+        self.assertEqual(response.status_code, 200)
+        timing = dict(entry.split(';', 1) for entry in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'app', 'db', 'render'})
+        self.assertRegex(timing['db'], r'^dur=[\d.]+;desc="\d+ queries"$')
+        # The first requests a process sees all count as slow.
+        self.assertIn('WARNING:api.profiling:request method=GET path=/api/metrics/ status=200', logs.output[0])
+        self.assertIn(f'bytes={len(response.content)}', logs.output[0])
+        self.assertEqual(len(dumps), 1)
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_server_timing_reports_serializer_time(self):
+        with self.assertLogs('api.profiling', 'INFO') as logs:
+            farms = self.client.get('/api/farms/')
+            job = self.client.post('/api/jobs/export/')
+            detail = self.client.get(f"/api/jobs/{job.json()['id']}/")
+        for response in (farms, job, detail):
+            self.assertRegex(response['Server-Timing'], r'(^|, )serialize;dur=[\d.]+(, |$)')
+        self.assertRegex(logs.output[0], r' serialize_ms=[\d.]+ render_ms=')
+
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/metrics/'))
+
+    def test_login_does_not_log_the_password(self):
+        self.client.force_authenticate(None)
+        with self.assertLogs('api.views', 'DEBUG') as logs:
+            response = self.client.post('/api/auth/login/', {'username': 'farmer', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WARNING:api.views:Failed login for 'farmer'", logs.output)
+        self.assertNotIn('wrong', ''.join(logs.output))
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    def test_database_url_with_persistent_connections(self):
+        config = database_config({'DATABASE_URL': 'postgres://farm:p%40ss@db:6432/agrimind?sslmode=require'})
+        self.assertEqual(
+            (config['NAME'], config['USER'], config['PASSWORD'], config['HOST'], config['PORT']),
+            ('agrimind', 'farm', 'p@ss', 'db', '6432'),
+        )
+        self.assertEqual(config['OPTIONS']['sslmode'], 'require')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+    def test_pgbouncer_mode_disables_server_side_cursors(self):
+        config = database_config({'DB_HOST': 'pgbouncer', 'DB_PGBOUNCER': 'true', 'DB_CONN_MAX_AGE': '0'})
+        self.assertEqual(config['HOST'], 'pgbouncer')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+
+
+class JobTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+
+    def work(self):
+        """Run the next queued job the way a run_job_worker pool process does."""
+        job_id = claim_next()
+        reports = []
+        finish(job_id, *run_job(job_id, reports.append))
+        return job_id, reports
+
+    def submit_import(self, document):
+        upload = SimpleUploadedFile('farms.json', json.dumps(document).encode(), content_type='application/json')
+        response = self.client.post('/api/jobs/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'queued')
+        return response.json()['id']
+
+    def test_import_job_reports_rows_per_table(self):
+        document = {'farms': [
+            {'id': 1, 'name': 'North', 'size': '10', 'crop': 'corn',
+             'waterHistory': [{'amount': 5, 'date': '2024-01-01', 'efficiency': 80}]},
+        ]}
+        job_id = self.submit_import(document)
+        self.assertEqual(self.work()[0], job_id)
+
+        job = self.client.get(f'/api/jobs/{job_id}/').json()
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress']['farms'], 1)
+        self.assertEqual(job['progress']['water_history'], 1)
+        self.assertIsNone(job['result_url'])
+        self.assertFalse(Job.objects.get(pk=job_id).input_file)
+
+    def test_failed_import_job_keeps_existing_data(self):
+        seed_farms(2, owner=self.user)
+        job_id = self.submit_import({'farms': [{'id': 'x'}]})
+        self.work()
+
+        job = self.client.get(f'/api/jobs/{job_id}/').json()
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['error']['details'][0]['section'], 'farms')
+        self.assertEqual(Farm.objects.count(), 2)
+
+    def test_export_job_result_download(self):
+        seed_farms(3, owner=self.user)
+        job_id = self.client.post('/api/jobs/export/').json()['id']
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/result/').status_code, 409)
+        _, reports = self.work()
+        self.addCleanup(lambda: Job.objects.get(pk=job_id).result_file.delete(save=False))
+
+        self.assertEqual(reports[-1]['fuelRecords'], 3)
+        job = self.client.get(f'/api/jobs/{job_id}/').json()
+        self.assertTrue(job['result_url'].endswith(f'/api/jobs/{job_id}/result/'))
+        response = self.client.get(f'/api/jobs/{job_id}/result/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))['farms']), 3)
+
+        other = User.objects.create_user(username='other', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/jobs/{job_id}/result/').status_code, 404)
+
+
+@override_settings(WEATHER_FETCHER='api.weather.StubWeatherFetcher')
+class WeatherTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        StubWeatherFetcher.calls.clear()
+        self.user = User.objects.create_user(username='farmer', password='secret')
+        self.client.force_authenticate(self.user)
+
+    def weather(self, **params):
+        response = self.client.get('/api/weather/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_nearby_farms_share_one_fetch_per_cell(self):
+        self.assertEqual(grid_cell(40.71, -74.01), grid_cell(40.76, -73.93))
+        Farm.objects.create(id=1, owner=self.user, name='North', size='10', crop='corn', latitude=40.71, longitude=-74.01)
+        Farm.objects.create(id=2, owner=self.user, name='South', size='10', crop='corn', latitude=40.76, longitude=-73.93)
+
+        first = self.weather(farm=1, start='2024-03-01', end='2024-03-10')
+        second = self.weather(farm=2, start='2024-03-01', end='2024-03-10')
+        self.assertEqual(len(StubWeatherFetcher.calls), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first['cell'], {'latitude': 40.75, 'longitude': -74.0})
+        self.assertEqual([day['date'] for day in first['days']][:2], ['2024-03-01', '2024-03-02'])
+
+        # Widening the range fetches only the days not stored yet.
+        self.weather(lat=40.7, lon=-74.0, start='2024-02-25', end='2024-03-12')
+        self.assertEqual(StubWeatherFetcher.calls[1:], [
+            (grid_cell(40.7, -74.0)[0], grid_cell(40.7, -74.0)[1], date(2024, 2, 25), date(2024, 2, 29)),
+            (grid_cell(40.7, -74.0)[0], grid_cell(40.7, -74.0)[1], date(2024, 3, 11), date(2024, 3, 12)),
+        ])
+        self.assertEqual(WeatherObservation.objects.count(), 17)
+
+    def test_provisional_days_are_refreshed_after_a_day(self):
+        today = timezone.localdate()
+        self.weather(lat=10, lon=10)
+        self.assertEqual(len(StubWeatherFetcher.calls), 1)
+        self.weather(lat=10, lon=10)
+        self.assertEqual(len(StubWeatherFetcher.calls), 1)
+
+        WeatherObservation.objects.filter(date=today).update(fetched_at=timezone.now() - timedelta(days=2))
+        self.weather(lat=10, lon=10)
+        self.assertEqual(StubWeatherFetcher.calls[-1][2:], (today, today))
+
+    def test_rejects_bad_ranges(self):
+        response = self.client.get('/api/weather/', {'lat': 10, 'lon': 10, 'start': '2024-03-10', 'end': '2024-03-01'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/weather/', {'lat': 100, 'lon': 10}).status_code, 400)
+
+    def test_rejects_non_numeric_farm(self):
+        response = self.client.get('/api/weather/', {'farm': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'farm': 'Expected a farm id.'})
+
+    def test_metrics_join_stored_weather_on_farm_location(self):
+        cell = grid_cell(41.6, -93.6)
+        for day, code in [(date(2024, 5, 9), 1), (date(2024, 5, 10), 61), (date(2024, 6, 1), 63), (date(2024, 7, 1), 3)]:
+            WeatherObservation.objects.create(
+                cell_latitude=cell[0], cell_longitude=cell[1], date=day, temperature_max=20, temperature_min=10,
+                precipitation=5 if code > 49 else 0, weather_code=code, source='stub', fetched_at=timezone.now(),
+            )
+        located = Farm.objects.create(id=1, owner=self.user, name='Located', size='10', crop='corn', latitude=41.6, longitude=-93.6)
+        unlocated = Farm.objects.create(id=2, owner=self.user, name='Unlocated', size='10', crop='corn')
+        for farm in (located, unlocated):
+            WaterHistory.objects.create(farm=farm, owner=self.user, amount=10, date=date(2024, 5, 10), efficiency=80)
+            HarvestHistory.objects.create(farm=farm, owner=self.user, yield_amount=5, date=date(2024, 6, 1))
+            HarvestHistory.objects.create(farm=farm, owner=self.user, yield_amount=5, date=date(2024, 7, 1))
+
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        farms = {farm['farmId']: farm for farm in response.json()['farms']}
+        # Watered on a rainy day, and one of the two harvests was rained on.
+        self.assertEqual(farms[1]['waterEfficiency'], 50)
+        self.assertEqual(farms[1]['harvestEfficiency'], 95)
+        self.assertEqual(farms[2]['waterEfficiency'], 100)
+        self.assertEqual(farms[2]['harvestEfficiency'], 100)
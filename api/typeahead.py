@@ -0,0 +1,119 @@
+# api/typeahead.py
+"""
+Typeahead suggestions for the free-text fields that tracker forms fill in
+again and again: farm names and crops, equipment and fuel types, energy
+types and purposes.
+
+``suggest`` returns the owner's most used distinct values of one field
+that contain the typed text, with prefix matches first. It filters with
+``icontains``, which Django compiles to ``UPPER(col::text) LIKE
+UPPER('%text%')`` on PostgreSQL. Migration 0013_trigram indexes exactly that
+expression with ``gin_trgm_ops``, so these lookups and the admin searches
+on the same fields use an index instead of scanning the table. Text
+shorter than three characters has no trigrams to use, but there are few
+such prefixes and the cache below absorbs them.
+
+Uses are counted over at most ``SCAN_LIMIT`` matching rows, so a broad
+prefix such as ``t`` costs the same as a narrow one. The counts are then
+approximate, but only their order is shown.
+
+Results are kept in a per-process LRU (``TYPEAHEAD_CACHE_SIZE`` entries,
+default 2048) for ``TYPEAHEAD_CACHE_SECONDS`` (default 30). A value added
+just now can therefore take that long to be suggested.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from .models import Farm, FuelRecord, EnergyRecord
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_QUERY_LENGTH = 100
+SCAN_LIMIT = 5000
+DEFAULT_CACHE_SIZE = 2048
+DEFAULT_CACHE_SECONDS = 30
+
+TYPEAHEAD_FIELDS = {
+    'farm_name': (Farm, 'name'),
+    'crop': (Farm, 'crop'),
+    'equipment_name': (FuelRecord, 'equipment_name'),
+    'fuel_type': (FuelRecord, 'fuel_type'),
+    'energy_type': (EnergyRecord, 'energy_type'),
+    'purpose': (EnergyRecord, 'purpose'),
+}
+
+
+class PrefixCache:
+    """A thread-safe LRU whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+cache = PrefixCache(
+    getattr(settings, 'TYPEAHEAD_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+    getattr(settings, 'TYPEAHEAD_CACHE_SECONDS', DEFAULT_CACHE_SECONDS),
+)
+
+
+def query_values(owner, name, text, limit):
+    model, field = TYPEAHEAD_FIELDS[name]
+    queryset = model.objects.for_owner(owner).exclude(**{field: ''})
+    if text:
+        queryset = queryset.filter(**{f'{field}__icontains': text})
+    rows = (
+        model.objects.filter(pk__in=queryset.values('pk')[:SCAN_LIMIT])
+        .values(field)
+        .annotate(
+            uses=Count('id'),
+            prefix=Case(When(**{f'{field}__istartswith': text}, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        )
+        .order_by('-prefix', '-uses', field)[:limit]
+    )
+    return [{'value': row[field], 'count': row['uses']} for row in rows]
+
+
+def suggest(owner, name, text, limit=DEFAULT_LIMIT):
+    """
+    Up to ``limit`` of the owner's distinct ``name`` values containing
+    ``text`` (case-insensitive), as ``{'value', 'count'}``, prefix matches
+    first and then by use. Empty ``text`` gives the most used values.
+    """
+    text = text.strip()
+    key = (owner.pk, name, text.lower(), limit)
+    values = cache.get(key)
+    if values is None:
+        values = query_values(owner, name, text, limit)
+        cache.set(key, values)
+    return values
+
@@ -2,12 +2,23 @@
 from django.urls import path
 from .views import (
     ImportDataView, ExportDataView, # Assuming these are your existing views
-    SaveLocalStorageView, LoadLocalStorageView,
+    ImportJobView, ExportJobView, JobDetailView, JobResultView,
+    MetricsView, WeatherView, SeriesView, SearchView, TypeaheadView, FarmListView, TaskListView, IssueListView, PlanItemListView,
+    FuelRecordListView, SoilRecordListView, EmissionSourceListView,
+    SequestrationActivityListView, EnergyRecordListView, LivestockListView,
+    FuelRecordBatchView, SoilRecordBatchView, EmissionSourceBatchView,
+    SequestrationActivityBatchView, EnergyRecordBatchView, LivestockBatchView,
+    SaveLocalStorageView, PatchLocalStorageView, LoadLocalStorageView,
+    HealthView, ReadinessView,
     UserLoginView, UserRegisterView, UserLogoutView, UserProfileView,
     # Add other view imports here e.g., FarmListCreateView, FarmDetailView etc.
 )
 
 urlpatterns = [
+    # Liveness/readiness probes for the app server and load balancer
+    path('health/', HealthView.as_view(), name='health'),
+    path('ready/', ReadinessView.as_view(), name='ready'),
+
     # Authentication endpoints
     path('auth/login/', UserLoginView.as_view(), name='api_login'),
     path('auth/register/', UserRegisterView.as_view(), name='api_register'),
@@ -17,8 +28,46 @@ urlpatterns = [
     # Data management endpoints
     path('import/', ImportDataView.as_view(), name='import_data'),
     path('export/', ExportDataView.as_view(), name='export_data'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('weather/', WeatherView.as_view(), name='weather'),
+
+    # Background import/export jobs (processed by `manage.py run_job_worker`)
+    path('jobs/import/', ImportJobView.as_view(), name='job_import'),
+    path('jobs/export/', ExportJobView.as_view(), name='job_export'),
+    path('jobs/<int:pk>/', JobDetailView.as_view(), name='job_detail'),
+    path('jobs/<int:pk>/result/', JobResultView.as_view(), name='job_result'),
+
+    # Keyset-paginated read endpoints
+    path('farms/', FarmListView.as_view(), name='farm_list'),
+    path('tasks/', TaskListView.as_view(), name='task_list'),
+    path('issues/', IssueListView.as_view(), name='issue_list'),
+    path('plans/', PlanItemListView.as_view(), name='plan_item_list'),
+    path('fuel-records/', FuelRecordListView.as_view(), name='fuel_record_list'),
+    path('soil-records/', SoilRecordListView.as_view(), name='soil_record_list'),
+    path('emission-sources/', EmissionSourceListView.as_view(), name='emission_source_list'),
+    path('sequestration-activities/', SequestrationActivityListView.as_view(), name='sequestration_activity_list'),
+    path('energy-records/', EnergyRecordListView.as_view(), name='energy_record_list'),
+    path('livestock/', LivestockListView.as_view(), name='livestock_list'),
+
+    # Bucketed aggregates and downsampled points for charts
+    path('series/<str:name>/', SeriesView.as_view(), name='series'),
+
+    # Ranked full-text search across tasks, plans and record notes
+    path('search/', SearchView.as_view(), name='search'),
+
+    # Suggestions for tracker form fields
+    path('typeahead/<str:field>/', TypeaheadView.as_view(), name='typeahead'),
+
+    # Batch create/update/delete endpoints
+    path('fuel-records/batch/', FuelRecordBatchView.as_view(), name='fuel_record_batch'),
+    path('soil-records/batch/', SoilRecordBatchView.as_view(), name='soil_record_batch'),
+    path('emission-sources/batch/', EmissionSourceBatchView.as_view(), name='emission_source_batch'),
+    path('sequestration-activities/batch/', SequestrationActivityBatchView.as_view(), name='sequestration_activity_batch'),
+    path('energy-records/batch/', EnergyRecordBatchView.as_view(), name='energy_record_batch'),
+    path('livestock/batch/', LivestockBatchView.as_view(), name='livestock_batch'),
     
     # Local storage sync endpoints
     path('sync/localstorage/save/', SaveLocalStorageView.as_view(), name='save_local_storage'),
+    path('sync/localstorage/patch/', PatchLocalStorageView.as_view(), name='patch_local_storage'),
     path('sync/localstorage/load/', LoadLocalStorageView.as_view(), name='load_local_storage'),
 ]
\ No newline at end of file
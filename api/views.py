@@ -2,25 +2,93 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.authtoken.models import Token
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import json
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 from .models import (
     Farm, WaterHistory, FertilizerHistory, HarvestHistory, Task, Issue,
     CropPlanEvent, PlanItem, FuelRecord, SoilRecord, EmissionSource,
-    SequestrationActivity, EnergyRecord, Livestock, UserLocalStorage # Added UserLocalStorage
+    SequestrationActivity, EnergyRecord, Livestock, UserLocalStorage, # Added UserLocalStorage
+    Job
 )
 from .serializers import (
-    ExportDataSerializer, UserLocalStorageSerializer # Added UserLocalStorageSerializer
+    ExportDataSerializer, UserLocalStorageSerializer, # Added UserLocalStorageSerializer
+    FarmSummarySerializer, TaskSerializer, IssueSerializer, PlanItemSerializer,
+    FuelRecordSerializer, SoilRecordSerializer, EmissionSourceSerializer,
+    SequestrationActivitySerializer, EnergyRecordSerializer, LivestockSerializer,
+    ValuesSerializer, JobSerializer,
     # Make sure all other serializers like FarmSerializer, TaskSerializer are imported if used directly in this file
 )
 # Import other necessary serializers if they are not already imported
 # from .serializers import FarmSerializer, TaskSerializer, IssueSerializer, CropPlanEventSerializer, PlanItemSerializer, FuelRecordSerializer, SoilRecordSerializer, EmissionSourceSerializer, SequestrationActivitySerializer, EnergyRecordSerializer, LivestockSerializer
+from .authentication import issue_token
+from .exporter import iter_export
+from .jobs import submit_import, submit_export
+from .pagination import KeysetPagination
+from .profiling import timed
+from .batch import BatchWriter, BatchValidationError, MAX_BATCH_OPERATIONS
+from .scoring import compute_metrics
+from . import search, series, typeahead, weather
+from .sync import (
+    get_header, load_entries, snapshot_etag, save_snapshot, apply_patch, long_keys, SyncConflict,
+    MAX_KEY_LENGTH
+)
+from .importer import (
+    DataImporter, StreamingImporter, ImportValidationError, STREAMING_IMPORT_THRESHOLD
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HealthView(APIView):
+    """Liveness: the process is up and serving requests. Touches nothing else."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        return Response({'status': 'ok'}, status=status.HTTP_200_OK)
+
+
+class ReadinessView(APIView):
+    """Readiness: the database and the cache both answer."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        checks = {}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            checks['database'] = 'ok'
+        except DatabaseError as e:
+            checks['database'] = str(e)
+        try:
+            cache.set('readiness-check', 1, 5)
+            checks['cache'] = 'ok' if cache.get('readiness-check') == 1 else 'unavailable'
+        except Exception as e:
+            checks['cache'] = str(e)
+
+        ready = all(result == 'ok' for result in checks.values())
+        return Response(
+            {'status': 'ok' if ready else 'unavailable', 'checks': checks},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -28,11 +96,10 @@ class UserLoginView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request, *args, **kwargs):
-        print(f"Login request data: {request.data}")
-        print(f"Content type: {request.content_type}")
-        
         username = request.data.get('username')
         password = request.data.get('password')
+        # Never log request.data: it holds the password.
+        logger.debug('Login request for %r (%s)', username, request.content_type)
         
         if not username or not password:
             return Response({
@@ -41,7 +108,7 @@ class UserLoginView(APIView):
         
         user = authenticate(username=username, password=password)
         if user:
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             return Response({
                 'token': token.key,
                 'user_id': user.id,
@@ -50,6 +117,7 @@ class UserLoginView(APIView):
                 'name': f"{user.first_name} {user.last_name}".strip() or user.username
             }, status=status.HTTP_200_OK)
         else:
+            logger.warning('Failed login for %r', username)
             return Response({
                 'error': 'Invalid credentials'
             }, status=status.HTTP_401_UNAUTHORIZED)
@@ -60,14 +128,11 @@ class UserRegisterView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request, *args, **kwargs):
-        print(f"Registration request data: {request.data}")
-        print(f"Content type: {request.content_type}")
-        print(f"Headers: {dict(request.headers)}")
-        
         username = request.data.get('username')
         password = request.data.get('password')
         email = request.data.get('email')
         name = request.data.get('name', '')
+        logger.debug('Registration request for %r (%s)', username, request.content_type)
         
         if not username or not password or not email:
             return Response({
@@ -101,6 +166,7 @@ class UserRegisterView(APIView):
         
         # Create token
         token = Token.objects.create(user=user)
+        logger.info('Registered user %s (id %s)', user.username, user.id)
         
         return Response({
             'token': token.key,
@@ -116,7 +182,8 @@ class UserLogoutView(APIView):
 
     def post(self, request, *args, **kwargs):
         try:
-            # Delete the user's token
+            # Delete the user's token; the Token post_delete handler also
+            # evicts it from the authentication cache.
             request.user.auth_token.delete()
             return Response({
                 'message': 'Successfully logged out'
@@ -174,72 +241,21 @@ class ImportDataView(APIView):
             file = request.FILES.get('file')
             if not file:
                 return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
-            data = json.load(file)
-            Farm.objects.all().delete()
-            Task.objects.all().delete()
-            Issue.objects.all().delete()
-            CropPlanEvent.objects.all().delete()
-            PlanItem.objects.all().delete()
-            FuelRecord.objects.all().delete()
-            SoilRecord.objects.all().delete()
-            EmissionSource.objects.all().delete()
-            SequestrationActivity.objects.all().delete()
-            EnergyRecord.objects.all().delete()
-            Livestock.objects.all().delete()
-            for farm_data in data.get('farms', []):
-                farm = Farm.objects.create(
-                    id=farm_data.get('id'),
-                    name=farm_data.get('name'),
-                    size=farm_data.get('size'),
-                    crop=farm_data.get('crop'),
-                    soil_type=farm_data.get('soilType', ''),
-                    slope_ratio=farm_data.get('slopeRatio')
-                )
-                for water_data in farm_data.get('waterHistory', []):
-                    WaterHistory.objects.create(farm=farm, **water_data)
-                for fertilizer_data in farm_data.get('fertilizerHistory', []):
-                    FertilizerHistory.objects.create(farm=farm, **fertilizer_data)
-                for harvest_data in farm_data.get('harvestHistory', []):
-                    HarvestHistory.objects.create(farm=farm, yield_amount=harvest_data['yield'], date=harvest_data['date'])
-            for task_data in data.get('tasks', []):
-                Task.objects.create(**task_data)
-            for issue_data in data.get('issues', []):
-                Issue.objects.create(**issue_data)
-            for event_data in data.get('cropPlanEvents', []):
-                CropPlanEvent.objects.create(**event_data)
-            for plan_data in data.get('plantingPlans', []):
-                PlanItem.objects.create(plan_type='Planting', **plan_data)
-            for plan_data in data.get('fertilizerPlans', []):
-                PlanItem.objects.create(plan_type='Fertilizer', **plan_data)
-            for plan_data in data.get('pestManagementPlans', []):
-                PlanItem.objects.create(plan_type='PestManagement', **plan_data)
-            for plan_data in data.get('irrigationPlans', []):
-                PlanItem.objects.create(plan_type='Irrigation', **plan_data)
-            for plan_data in data.get('weatherTaskPlans', []):
-                PlanItem.objects.create(plan_type='WeatherTask', **plan_data)
-            for plan_data in data.get('rotationPlans', []):
-                PlanItem.objects.create(plan_type='Rotation', **plan_data)
-            for plan_data in data.get('rainwaterPlans', []):
-                PlanItem.objects.create(plan_type='Rainwater', **plan_data)
-            for fuel_data in data.get('fuelRecords', []):
-                farm = Farm.objects.get(id=fuel_data['farmId'])
-                FuelRecord.objects.create(farm=farm, **{k: v for k, v in fuel_data.items() if k != 'farmId'})
-            for soil_data in data.get('soilRecords', []):
-                farm = Farm.objects.get(id=soil_data['farmId'])
-                SoilRecord.objects.create(farm=farm, **{k: v for k, v in soil_data.items() if k != 'farmId'})
-            for emission_data in data.get('emissionSources', []):
-                farm = Farm.objects.get(id=emission_data['farmId'])
-                EmissionSource.objects.create(farm=farm, **{k: v for k, v in emission_data.items() if k != 'farmId'})
-            for seq_data in data.get('sequestrationActivities', []):
-                farm = Farm.objects.get(id=seq_data['farmId'])
-                SequestrationActivity.objects.create(farm=farm, **{k: v for k, v in seq_data.items() if k != 'farmId'})
-            for energy_data in data.get('energyRecords', []):
-                farm = Farm.objects.get(id=energy_data['farmId'])
-                EnergyRecord.objects.create(farm=farm, **{k: v for k, v in energy_data.items() if k != 'farmId'})
-            for livestock_data in data.get('livestock', []):
-                farm = Farm.objects.get(id=livestock_data['farmId'])
-                Livestock.objects.create(farm=farm, **{k: v for k, v in livestock_data.items() if k != 'farmId'})
-            return Response({'message': 'Data imported successfully'}, status=status.HTTP_201_CREATED)
+            # ?merge=true upserts into the stored data instead of replacing
+            # it; add ?delete_missing=true to drop rows the archive lacks.
+            options = {
+                'merge': request.query_params.get('merge') in ('1', 'true'),
+                'delete_missing': request.query_params.get('delete_missing') in ('1', 'true'),
+            }
+            if request.query_params.get('mode') == 'stream' or file.size > STREAMING_IMPORT_THRESHOLD:
+                # Large archives are parsed incrementally instead of json.load()
+                stats = StreamingImporter(request.user, **options).run(file)
+            else:
+                data = json.load(file)
+                stats = DataImporter(request.user, **options).run(data)
+            return Response({'message': 'Data imported successfully', **stats}, status=status.HTTP_201_CREATED)
+        except ImportValidationError as e:
+            return Response({'error': str(e), 'details': e.errors}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -247,25 +263,136 @@ class ExportDataView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        # This view seems to use serializers not fully shown (e.g. FarmSerializer)
-        # Ensure they are correctly defined and imported in api/serializers.py
-        # For brevity, assuming those serializers (FarmSerializer, TaskSerializer, etc.) exist
-        # and are correctly imported or defined in api.serializers
-        # from .serializers import FarmSerializer, TaskSerializer, ... (etc.)
-
-        data = {
-            'version': '1.0',
-            'exportDate': datetime.now().isoformat(),
-            # 'farms': FarmSerializer(Farm.objects.all(), many=True).data,
-            # 'tasks': TaskSerializer(Task.objects.all(), many=True).data,
-            # ... and so on for other data types
-            # The above lines are commented out if serializers are not fully available in the context.
-            # Replace with actual working code if serializers are defined.
-        }
-        # For now, returning a simplified response if serializers are not fully defined in context
-        # return Response(data)
-        # Fallback if serializers are not fully defined for ExportDataView
-        return Response({"message": "ExportDataView needs specific serializers defined and imported."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        # Streamed straight from values() querysets; see api/exporter.py
+        response = StreamingHttpResponse(iter_export(request.user), content_type='application/json')
+        filename = f"farm-export-{datetime.now():%Y-%m-%d}.json"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+def serialized(serializer):
+    """``serializer.data``, timed as ``serialize`` in the request's Server-Timing."""
+    with timed('serialize'):
+        return serializer.data
+
+
+class ImportJobView(APIView):
+    """Queue an import; the upload is stored and processed by run_job_worker."""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        file = request.FILES.get('file')
+        if not file:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        job = submit_import(
+            request.user, file, mode=request.query_params.get('mode'),
+            merge=request.query_params.get('merge') in ('1', 'true'),
+            delete_missing=request.query_params.get('delete_missing') in ('1', 'true'),
+        )
+        return Response(serialized(JobSerializer(job, context={'request': request})), status=status.HTTP_202_ACCEPTED)
+
+
+class ExportJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        job = submit_export(request.user)
+        return Response(serialized(JobSerializer(job, context={'request': request})), status=status.HTTP_202_ACCEPTED)
+
+
+class JobDetailView(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(serialized(self.get_serializer(self.get_object())))
+
+
+class JobResultView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk, *args, **kwargs):
+        job = Job.objects.filter(user=request.user, pk=pk).first()
+        if job is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != Job.SUCCEEDED or not job.result_file:
+            return Response({'error': f'Job is {job.status} and has no file to download'}, status=status.HTTP_409_CONFLICT)
+        filename = job.result_file.name.rsplit('/', 1)[-1]
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=filename, content_type='application/json')
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        # Scores the user's farms in one vectorized pass; see api/scoring.py
+        try:
+            return Response(compute_metrics(owner=request.user), status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': 'Could not compute metrics.', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class WeatherView(APIView):
+    """
+    Daily weather for a farm (``?farm=<id>``) or a point (``?lat=&lon=``)
+    between ``start`` and ``end`` (default: today and the next 9 days),
+    served from the shared per-grid-cell store in api/weather.py.
+    """
+    permission_classes = [IsAuthenticated]
+    default_days = 10
+
+    def date_param(self, name, default):
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: 'Expected a date in YYYY-MM-DD format.'})
+        return parsed
+
+    def location(self):
+        params = self.request.query_params
+        if params.get('farm'):
+            try:
+                farm_id = int(params['farm'])
+            except ValueError:
+                raise ValidationError({'farm': 'Expected a farm id.'})
+            farm = Farm.objects.for_owner(self.request.user).filter(pk=farm_id).values('latitude', 'longitude').first()
+            if farm is None:
+                raise ValidationError({'farm': 'Farm not found.'})
+            if farm['latitude'] is None or farm['longitude'] is None:
+                raise ValidationError({'farm': 'Farm has no location.'})
+            return farm['latitude'], farm['longitude']
+        try:
+            return float(params['lat']), float(params['lon'])
+        except (KeyError, ValueError):
+            raise ValidationError({'location': 'Pass farm, or lat and lon.'})
+
+    def get(self, request, *args, **kwargs):
+        today = timezone.localdate()
+        latitude, longitude = self.location()
+        start = self.date_param('start', today)
+        end = self.date_param('end', start + timedelta(days=self.default_days - 1))
+        if end < start:
+            raise ValidationError({'end': 'Must not be before start.'})
+        if (end - start).days >= weather.MAX_RANGE_DAYS:
+            raise ValidationError({'end': f'Ranges are limited to {weather.MAX_RANGE_DAYS} days.'})
+        if end > today + timedelta(days=weather.FORECAST_DAYS - 1):
+            raise ValidationError({'end': f'Forecasts reach {weather.FORECAST_DAYS} days ahead.'})
+        try:
+            daily = weather.daily_series(latitude, longitude, start, end)
+        except ValueError as e:
+            raise ValidationError({'location': str(e)})
+        except weather.WeatherUnavailable as e:
+            return Response({'error': 'Weather service unavailable.', 'details': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        return Response(daily, status=status.HTTP_200_OK)
 
 
 class SaveLocalStorageView(APIView):
@@ -277,31 +404,363 @@ class SaveLocalStorageView(APIView):
 
         if not isinstance(data_payload, dict):
             return Response({'error': 'Invalid data format. Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+        if long_keys(data_payload):
+            return Response({'error': f'Keys are limited to {MAX_KEY_LENGTH} characters.'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            local_storage_instance, created = UserLocalStorage.objects.update_or_create(
-                user=user,
-                defaults={'data': data_payload}
-            )
+            revision, created = save_snapshot(user, data_payload)
             # We don't need to return the full data back, just a success message.
             # Frontend already has the data.
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
-            return Response({'message': 'LocalStorage snapshot saved successfully.'}, status=status_code)
+            return Response({'message': 'LocalStorage snapshot saved successfully.', 'revision': revision}, status=status_code)
         except Exception as e:
             # Log the exception e for debugging
             return Response({'error': 'Could not save localStorage data.', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class PatchLocalStorageView(APIView):
+    """
+    Applies only the changed and removed keys since ``base_revision``.
+
+    Expects ``{"base_revision": 3, "set": {"key": "value"}, "remove": ["key"]}``.
+    Responds 409 with the deltas the client is missing when it is behind.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        payload = request.data
+        if not isinstance(payload, dict):
+            return Response({'error': 'Invalid data format. Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        base_revision = payload.get('base_revision')
+        changed = payload.get('set', {})
+        removed = payload.get('remove', [])
+        if isinstance(base_revision, bool) or not isinstance(base_revision, int) or base_revision < 0:
+            return Response({'error': 'base_revision must be a non-negative integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(changed, dict):
+            return Response({'error': '"set" must be an object.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(removed, list) or not all(isinstance(key, str) for key in removed):
+            return Response({'error': '"remove" must be a list of keys.'}, status=status.HTTP_400_BAD_REQUEST)
+        if long_keys([*changed, *removed]):
+            return Response({'error': f'Keys are limited to {MAX_KEY_LENGTH} characters.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            revision = apply_patch(request.user, base_revision, changed, removed)
+            return Response({'message': 'LocalStorage patch applied.', 'revision': revision}, status=status.HTTP_200_OK)
+        except SyncConflict as conflict:
+            return Response({
+                'error': 'Local data is behind the server.',
+                'revision': conflict.revision,
+                'changes': conflict.changes,
+            }, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response({'error': 'Could not save localStorage data.', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class LoadLocalStorageView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         user = request.user
+        # Sync-aware clients ask for the revision alongside the data
+        include_revision = request.query_params.get('include_revision') in ('1', 'true')
         try:
-            local_storage_instance = UserLocalStorage.objects.get(user=user)
-            return Response(local_storage_instance.data, status=status.HTTP_200_OK)
-        except UserLocalStorage.DoesNotExist:
-            # Frontend expects an object, even if empty, to populate localStorage
-            return Response({}, status=status.HTTP_200_OK) 
+            storage = get_header(user)
+            if storage is None:
+                # Frontend expects an object, even if empty, to populate localStorage
+                data = {'revision': 0, 'data': {}} if include_revision else {}
+                return Response(data, status=status.HTTP_200_OK)
+
+            # Answer revalidations from the header row alone, before any
+            # entry is read.
+            etag = snapshot_etag(storage, '-r' if include_revision else '')
+            # GZipMiddleware weakens the ETag of compressed responses, so
+            # compare weakly as If-None-Match requires anyway.
+            client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+            if etag in client_etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                data = load_entries(user)
+                if include_revision:
+                    data = {'revision': storage.revision, 'data': data}
+                response = Response(data, status=status.HTTP_200_OK)
+            response['ETag'] = etag
+            # Browsers revalidate with If-None-Match on every load
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Authorization'])
+            return response
         except Exception as e:
             # Log the exception e for debugging
-            return Response({'error': 'Could not load localStorage data.', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({'error': 'Could not load localStorage data.', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def filter_farm_dates(queryset, params, farm_scoped=True, date_field='date'):
+    """Apply the ``?farm=``, ``?date_from=`` and ``?date_to=`` filters shared by the read endpoints."""
+    if farm_scoped and params.get('farm'):
+        try:
+            queryset = queryset.filter(farm_id=int(params['farm']))
+        except ValueError:
+            raise ValidationError({'farm': 'Expected a farm id.'})
+    if date_field:
+        for param, lookup in (('date_from', 'gte'), ('date_to', 'lte')):
+            if params.get(param):
+                try:
+                    value = parse_date(params[param])
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise ValidationError({param: 'Expected a date in YYYY-MM-DD format.'})
+                queryset = queryset.filter(**{f'{date_field}__{lookup}': value})
+    return queryset
+
+
+class KeysetListView(generics.ListAPIView):
+    """
+    Read-only list of the user's rows, paged by keyset on ``ordering``
+    (see api/pagination.py).
+
+    ``?farm=<id>`` filters farm-scoped models and ``?date_from=`` /
+    ``?date_to=`` (inclusive, YYYY-MM-DD) filter on ``date_field``.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    ordering = ('id',)
+    date_field = None
+    farm_scoped = False
+
+    def get_queryset(self):
+        return filter_farm_dates(
+            self.serializer_class.Meta.model.objects.for_owner(self.request.user), self.request.query_params,
+            farm_scoped=self.farm_scoped, date_field=self.date_field,
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Pages are read with values() and rendered directly; see
+        # ValuesSerializer in api/serializers.py.
+        serializer = ValuesSerializer(self.serializer_class)
+        rows = self.paginate_queryset(serializer.values(self.get_queryset()))
+        with timed('serialize'):
+            results = serializer.to_representation(rows)
+        return self.get_paginated_response(results)
+
+
+class FarmListView(KeysetListView):
+    serializer_class = FarmSummarySerializer
+
+
+class TaskListView(KeysetListView):
+    serializer_class = TaskSerializer
+    ordering = ('due_date', 'id')
+    date_field = 'due_date'
+
+
+class IssueListView(KeysetListView):
+    serializer_class = IssueSerializer
+
+
+class PlanItemListView(KeysetListView):
+    serializer_class = PlanItemSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        plan_type = self.request.query_params.get('plan_type')
+        return queryset.filter(plan_type=plan_type) if plan_type else queryset
+
+
+class FarmRecordListView(KeysetListView):
+    # Leading with farm_id lets the (owner, farm, date) indexes serve both
+    # the per-farm (date, id) pages and listings of every farm.
+    ordering = ('farm_id', 'date', 'id')
+    date_field = 'date'
+    farm_scoped = True
+
+
+class FuelRecordListView(FarmRecordListView):
+    serializer_class = FuelRecordSerializer
+
+
+class SoilRecordListView(FarmRecordListView):
+    serializer_class = SoilRecordSerializer
+
+
+class EmissionSourceListView(FarmRecordListView):
+    serializer_class = EmissionSourceSerializer
+
+
+class SequestrationActivityListView(FarmRecordListView):
+    serializer_class = SequestrationActivitySerializer
+
+
+class EnergyRecordListView(FarmRecordListView):
+    serializer_class = EnergyRecordSerializer
+
+
+class LivestockListView(KeysetListView):
+    serializer_class = LivestockSerializer
+    farm_scoped = True
+
+
+class SeriesView(APIView):
+    """
+    Chart data for one time-series table (see api/series.py), filtered by
+    ``?farm=``, ``?date_from=`` and ``?date_to=``.
+
+    By default returns count/sum/avg/min/max of ``fields`` (comma-separated,
+    default all) per ``bucket`` (day, week, month, quarter, year; default
+    month), optionally split by ``group``. With ``?mode=raw`` returns one
+    ``field`` as at most ``points`` LTTB-downsampled points.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, name, *args, **kwargs):
+        definition = series.SERIES.get(name)
+        if definition is None:
+            return Response(
+                {'error': f"Unknown series '{name}'.", 'details': sorted(series.SERIES)},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        params = request.query_params
+        queryset = filter_farm_dates(definition.model.objects.for_owner(request.user), params)
+
+        if params.get('mode') == 'raw':
+            field = params.get('field', definition.fields[0])
+            if field not in definition.fields:
+                raise ValidationError({'field': f"Expected one of {', '.join(definition.fields)}."})
+            try:
+                limit = int(params.get('points', series.DEFAULT_POINTS))
+            except ValueError:
+                limit = 0
+            if not series.MIN_POINTS <= limit <= series.MAX_POINTS:
+                raise ValidationError({'points': f'Expected {series.MIN_POINTS} to {series.MAX_POINTS}.'})
+            total, points = series.points(queryset, field, limit)
+            return Response({'series': name, 'field': field, 'total': total, 'points': points}, status=status.HTTP_200_OK)
+
+        fields = params['fields'].split(',') if params.get('fields') else list(definition.fields)
+        unknown = [field for field in fields if field not in definition.fields]
+        if unknown:
+            raise ValidationError({'fields': f"Unknown: {', '.join(unknown)}. Expected {', '.join(definition.fields)}."})
+        bucket = params.get('bucket', 'month')
+        if bucket not in series.BUCKETS:
+            raise ValidationError({'bucket': f"Expected one of {', '.join(series.BUCKETS)}."})
+        group = params.get('group') or None
+        if group is not None and group not in definition.groups:
+            raise ValidationError({'group': f"Expected one of {', '.join(definition.groups) or 'nothing'}."})
+        return Response({
+            'series': name,
+            'bucket': bucket,
+            'group': group,
+            'fields': fields,
+            'buckets': series.buckets(queryset, fields, bucket, group),
+        }, status=status.HTTP_200_OK)
+
+
+class SearchView(APIView):
+    """
+    Ranked full-text hits for ``?q=`` across tasks, issues, plans, crop
+    events and record notes (see api/search.py), optionally limited to
+    ``?types=`` (comma-separated). Paginated by ``page`` and ``page_size``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        if not search.search_terms(params.get('q', '')):
+            raise ValidationError({'q': 'Expected search terms.'})
+        kinds = params['types'].split(',') if params.get('types') else list(search.SEARCHABLE)
+        unknown = [kind for kind in kinds if kind not in search.SEARCHABLE]
+        if unknown:
+            raise ValidationError({'types': f"Unknown: {', '.join(unknown)}. Expected {', '.join(search.SEARCHABLE)}."})
+        try:
+            page = int(params.get('page', 1))
+            page_size = int(params.get('page_size', search.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({'page': 'Expected whole numbers for page and page_size.'})
+        if page < 1 or not 1 <= page_size <= search.MAX_PAGE_SIZE:
+            raise ValidationError({'page_size': f'Expected page >= 1 and page_size 1 to {search.MAX_PAGE_SIZE}.'})
+
+        # One extra hit tells whether there is a next page.
+        hits = search.search(request.user, params['q'], kinds, page_size + 1, (page - 1) * page_size)
+        url = request.build_absolute_uri()
+        return Response({
+            'results': hits[:page_size],
+            'next': replace_query_param(url, 'page', page + 1) if len(hits) > page_size else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+        }, status=status.HTTP_200_OK)
+
+
+class TypeaheadView(APIView):
+    """
+    Suggestions for one free-text field (see api/typeahead.py): the user's
+    most used distinct values containing ``?q=``, at most ``limit``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, field, *args, **kwargs):
+        if field not in typeahead.TYPEAHEAD_FIELDS:
+            return Response(
+                {'error': f"Unknown field '{field}'.", 'details': sorted(typeahead.TYPEAHEAD_FIELDS)},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        text = request.query_params.get('q', '')
+        if len(text) > typeahead.MAX_QUERY_LENGTH:
+            raise ValidationError({'q': f'Expected at most {typeahead.MAX_QUERY_LENGTH} characters.'})
+        try:
+            limit = int(request.query_params.get('limit', typeahead.DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= typeahead.MAX_LIMIT:
+            raise ValidationError({'limit': f'Expected 1 to {typeahead.MAX_LIMIT}.'})
+        return Response(
+            {'field': field, 'values': typeahead.suggest(request.user, field, text, limit)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class BatchWriteView(APIView):
+    """
+    Apply a batch of create/update/delete operations in one transaction.
+
+    Accepts ``{"operations": [...]}`` or a bare array; see api/batch.py.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = None
+
+    def post(self, request, *args, **kwargs):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        if not isinstance(operations, list):
+            return Response({'error': 'Expected a list of operations.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return Response(
+                {'error': f"A batch can contain at most {MAX_BATCH_OPERATIONS} operations."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            results = BatchWriter(self.serializer_class, request.user).run(operations)
+        except BatchValidationError as e:
+            return Response({'error': 'Batch failed validation; nothing was written.', 'results': e.results},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': 'Could not apply batch.', 'details': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class FuelRecordBatchView(BatchWriteView):
+    serializer_class = FuelRecordSerializer
+
+
+class SoilRecordBatchView(BatchWriteView):
+    serializer_class = SoilRecordSerializer
+
+
+class EmissionSourceBatchView(BatchWriteView):
+    serializer_class = EmissionSourceSerializer
+
+
+class SequestrationActivityBatchView(BatchWriteView):
+    serializer_class = SequestrationActivitySerializer
+
+
+class EnergyRecordBatchView(BatchWriteView):
+    serializer_class = EnergyRecordSerializer
+
+
+class LivestockBatchView(BatchWriteView):
+    serializer_class = LivestockSerializer
@@ -0,0 +1,236 @@
+# api/weather.py
+"""
+Server-side daily weather store.
+
+Farms are snapped to a GRID_DEGREES grid, and observations are stored once
+per (grid cell, date) in WeatherObservation, so every farm and user inside
+a cell shares the same rows. A date range is served from the table. Only
+the missing or provisional days are fetched, with one request per cell
+through the configured fetcher (WEATHER_FETCHER, a dotted path). Within a
+few days of today values are still forecasts or preliminary reanalysis.
+Those rows are refreshed at most once per PROVISIONAL_TTL, so outbound
+calls are per cell per day rather than per user per page load.
+
+A short cache lock per cell stops concurrent requests for the same cell
+from fetching the same days twice. It is shared between workers when the
+cache is Redis.
+"""
+import json
+import logging
+import time
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from math import cos, pi, sin
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import WeatherObservation
+
+logger = logging.getLogger(__name__)
+
+# Matches the resolution of the Open-Meteo reanalysis data; changing it
+# orphans the rows already stored.
+GRID_DEGREES = Decimal('0.25')
+# Days before today whose values may still change.
+PROVISIONAL_DAYS = 5
+PROVISIONAL_TTL = timedelta(hours=24)
+FORECAST_DAYS = 16
+MAX_RANGE_DAYS = 5 * 366
+FETCH_LOCK_TIMEOUT = 30
+FETCH_WAIT_SECONDS = 10
+
+OBSERVATION_FIELDS = ['temperature_max', 'temperature_min', 'precipitation', 'weather_code']
+
+
+class WeatherUnavailable(Exception):
+    """The fetcher could not provide weather for a cell."""
+
+
+def grid_cell(latitude, longitude):
+    """Snap coordinates to the centre of their grid cell as Decimals."""
+    def snap(value):
+        steps = (Decimal(str(value)) / GRID_DEGREES).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+        return (steps * GRID_DEGREES).quantize(Decimal('0.01'))
+
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates out of range.')
+    return snap(latitude), snap(longitude)
+
+
+def date_runs(days):
+    """Group sorted dates into ``(first, last)`` runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return [tuple(run) for run in runs]
+
+
+class OpenMeteoFetcher:
+    """Daily weather from Open-Meteo: the archive for settled days, the forecast API after."""
+    name = 'open-meteo'
+    archive_url = 'https://archive-api.open-meteo.com/v1/archive'
+    forecast_url = 'https://api.open-meteo.com/v1/forecast'
+    daily = 'temperature_2m_max,temperature_2m_min,precipitation_sum,weathercode'
+    timeout = 10
+
+    def fetch(self, latitude, longitude, start, end):
+        settled = timezone.localdate() - timedelta(days=PROVISIONAL_DAYS)
+        rows = []
+        if start < settled:
+            rows += self.request(self.archive_url, latitude, longitude, start, min(end, settled - timedelta(days=1)))
+        if end >= settled:
+            rows += self.request(self.forecast_url, latitude, longitude, max(start, settled), end)
+        return rows
+
+    def request(self, url, latitude, longitude, start, end):
+        query = urllib.parse.urlencode({
+            'latitude': latitude,
+            'longitude': longitude,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'daily': self.daily,
+            'timezone': 'auto',
+        })
+        try:
+            with urllib.request.urlopen(f'{url}?{query}', timeout=self.timeout) as response:
+                daily = json.load(response)['daily']
+        except (OSError, ValueError, KeyError) as e:
+            raise WeatherUnavailable(str(e)) from e
+        return [
+            {
+                'date': date.fromisoformat(day),
+                'temperature_max': daily['temperature_2m_max'][index],
+                'temperature_min': daily['temperature_2m_min'][index],
+                'precipitation': daily['precipitation_sum'][index],
+                'weather_code': daily['weathercode'][index],
+            }
+            for index, day in enumerate(daily['time'])
+        ]
+
+
+class StubWeatherFetcher:
+    """
+    Deterministic synthetic weather, for tests and offline development.
+    ``calls`` records every ``(latitude, longitude, start, end)`` requested.
+    """
+    name = 'stub'
+    calls = []
+
+    def fetch(self, latitude, longitude, start, end):
+        StubWeatherFetcher.calls.append((latitude, longitude, start, end))
+        rows = []
+        day = start
+        while day <= end:
+            season = cos(2 * pi * (day.timetuple().tm_yday - 200) / 365.25)
+            base = 15 - float(abs(latitude)) / 3 + 12 * season
+            wet = sin(day.toordinal() * 1.3 + float(longitude)) > 0.6
+            rows.append({
+                'date': day,
+                'temperature_max': round(base + 6, 1),
+                'temperature_min': round(base - 6, 1),
+                'precipitation': round(8 * sin(day.toordinal() * 0.7) ** 2, 1) if wet else 0.0,
+                'weather_code': 61 if wet else 1,
+            })
+            day += timedelta(days=1)
+        return rows
+
+
+def get_fetcher():
+    return import_string(getattr(settings, 'WEATHER_FETCHER', 'api.weather.OpenMeteoFetcher'))()
+
+
+def cell_rows(cell, start, end):
+    return WeatherObservation.objects.filter(
+        cell_latitude=cell[0], cell_longitude=cell[1], date__range=(start, end),
+    )
+
+
+def days_to_fetch(cell, start, end, now=None):
+    """Dates in the range that are not stored, or stored but due for a refresh."""
+    now = now or timezone.now()
+    provisional_from = timezone.localdate(now) - timedelta(days=PROVISIONAL_DAYS)
+    fresh = set()
+    for day, fetched_at in cell_rows(cell, start, end).values_list('date', 'fetched_at'):
+        if day < provisional_from or fetched_at > now - PROVISIONAL_TTL:
+            fresh.add(day)
+    return [
+        start + timedelta(days=offset)
+        for offset in range((end - start).days + 1)
+        if start + timedelta(days=offset) not in fresh
+    ]
+
+
+def store(cell, rows, source):
+    now = timezone.now()
+    WeatherObservation.objects.bulk_create(
+        [
+            WeatherObservation(
+                cell_latitude=cell[0], cell_longitude=cell[1], source=source, fetched_at=now,
+                **{'date': row['date'], **{field: row[field] for field in OBSERVATION_FIELDS}},
+            )
+            for row in rows
+        ],
+        update_conflicts=True,
+        unique_fields=['cell_latitude', 'cell_longitude', 'date'],
+        update_fields=[*OBSERVATION_FIELDS, 'source', 'fetched_at'],
+    )
+
+
+def ensure_cell(cell, start, end, fetcher=None):
+    """
+    Make sure the table holds the cell's weather for ``start``..``end``,
+    fetching only what is missing. Returns the number of days fetched.
+    """
+    missing = days_to_fetch(cell, start, end)
+    if not missing:
+        return 0
+    lock = f'weather-fetch:{cell[0]}:{cell[1]}'
+    if not cache.add(lock, 1, FETCH_LOCK_TIMEOUT):
+        # Another request is fetching this cell; wait for it to land.
+        deadline = time.monotonic() + FETCH_WAIT_SECONDS
+        while time.monotonic() < deadline and cache.get(lock):
+            time.sleep(0.2)
+        return 0
+    try:
+        fetcher = fetcher or get_fetcher()
+        fetched = 0
+        for first, last in date_runs(missing):
+            rows = fetcher.fetch(cell[0], cell[1], first, last)
+            store(cell, rows, fetcher.name)
+            fetched += len(rows)
+        return fetched
+    finally:
+        cache.delete(lock)
+
+
+def ensure_cells(cells, start, end, fetcher=None):
+    """ensure_cell for several cells, e.g. every farm's; each cell is fetched once."""
+    fetcher = fetcher or get_fetcher()
+    fetched = 0
+    for cell in sorted(set(cells)):
+        try:
+            fetched += ensure_cell(cell, start, end, fetcher)
+        except WeatherUnavailable as e:
+            logger.warning('Weather unavailable for cell %s: %s', cell, e)
+    return fetched
+
+
+def daily_series(latitude, longitude, start, end):
+    """Daily observations for the cell containing the coordinates, oldest first."""
+    cell = grid_cell(latitude, longitude)
+    ensure_cell(cell, start, end)
+    days = cell_rows(cell, start, end).order_by('date').values('date', *OBSERVATION_FIELDS)
+    return {
+        'cell': {'latitude': float(cell[0]), 'longitude': float(cell[1])},
+        'start': start,
+        'end': end,
+        'days': list(days),
+    }
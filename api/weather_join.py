@@ -0,0 +1,150 @@
+# api/weather_join.py
+"""
+Date join between farm activity and the stored daily weather.
+
+The browser looks up each history row's weather with
+``weatherData.find(w => new Date(w.date) ...)``, which costs
+O(history x weather) per farm. Here every stored series is flattened into
+one sorted int64 key array, ``cell * DAY_SPAN + day``. A batch of
+``(cell, day)`` pairs, for any number of farms, is then joined with one
+``np.searchsorted`` call and an equality check.
+
+Cells are identified by their grid steps (see api/weather.py). A farm
+without a location gets cell -1, which never matches.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+from .models import WeatherObservation
+from .weather import GRID_DEGREES, grid_cell
+
+# Keys are cell * DAY_SPAN + proleptic ordinal; ordinals stay below 10**6
+# until the year 2738.
+DAY_SPAN = 10 ** 6
+LATITUDE_STEPS = int(90 / GRID_DEGREES)
+LONGITUDE_STEPS = int(180 / GRID_DEGREES)
+NO_CELL = -1
+# getWeatherInfo() in src/artifacts/utils.ts reports WMO codes 49-67 as rain.
+RAIN_CODES = (49, 67)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def cell_key(latitude_steps, longitude_steps):
+    """Cell number from grid steps; works on scalars and arrays."""
+    return (latitude_steps + LATITUDE_STEPS) * (2 * LONGITUDE_STEPS + 1) + (longitude_steps + LONGITUDE_STEPS)
+
+
+def farm_cells(latitudes, longitudes):
+    """Cell number per farm, NO_CELL where the farm has no (valid) location."""
+    cells = np.full(len(latitudes), NO_CELL, dtype=np.int64)
+    for position, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+        if latitude is None or longitude is None or np.isnan(latitude) or np.isnan(longitude):
+            continue
+        try:
+            cell_latitude, cell_longitude = grid_cell(latitude, longitude)
+        except ValueError:
+            continue
+        cells[position] = cell_key(int(cell_latitude / GRID_DEGREES), int(cell_longitude / GRID_DEGREES))
+    return cells
+
+
+def day_numbers(dates):
+    """Proleptic ordinals for an array of ``date`` objects or ``datetime64``."""
+    dates = np.asarray(dates)
+    if dates.dtype.kind == 'M':
+        return dates.astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+    return np.fromiter(map(date.toordinal, dates), dtype=np.int64, count=len(dates))
+
+
+class WeatherIndex:
+    """
+    Every loaded weather series as one sorted key array plus value columns.
+
+    Build it with ``from_columns`` (any order) or ``load`` (one query).
+    """
+
+    def __init__(self, keys, weather_code, temperature_max):
+        self.keys = keys
+        self.weather_code = weather_code
+        self.temperature_max = temperature_max
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_columns(cls, cells, days, weather_code, temperature_max):
+        keys = np.asarray(cells, dtype=np.int64) * DAY_SPAN + np.asarray(days, dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        return cls(
+            keys[order],
+            np.asarray(weather_code, dtype=np.float64)[order],  # float so missing codes can be NaN
+            np.asarray(temperature_max, dtype=np.float64)[order],
+        )
+
+    @classmethod
+    def load(cls, cells, start, end):
+        """Weather for ``cells`` between ``start`` and ``end`` with one query."""
+        cells = np.unique(np.asarray(cells, dtype=np.int64))
+        cells = cells[cells != NO_CELL]
+        if not len(cells) or start is None:
+            return cls.from_columns([], [], [], [])
+        width = 2 * LONGITUDE_STEPS + 1
+        latitude_steps = cells // width - LATITUDE_STEPS
+        longitude_steps = cells % width - LONGITUDE_STEPS
+        # A bounding box in SQL, the exact cell set in NumPy.
+        rows = list(WeatherObservation.objects.filter(
+            date__range=(start, end),
+            cell_latitude__range=(int(latitude_steps.min()) * GRID_DEGREES, int(latitude_steps.max()) * GRID_DEGREES),
+            cell_longitude__range=(int(longitude_steps.min()) * GRID_DEGREES, int(longitude_steps.max()) * GRID_DEGREES),
+        ).values_list('cell_latitude', 'cell_longitude', 'date', 'weather_code', 'temperature_max'))
+        if not rows:
+            return cls.from_columns([], [], [], [])
+        latitude, longitude, dates, codes, temperature = zip(*rows)
+        step = float(GRID_DEGREES)
+        row_cells = cell_key(
+            np.rint(np.asarray(latitude, dtype=np.float64) / step).astype(np.int64),
+            np.rint(np.asarray(longitude, dtype=np.float64) / step).astype(np.int64),
+        )
+        wanted = np.isin(row_cells, cells)
+        return cls.from_columns(
+            row_cells[wanted],
+            day_numbers(np.asarray(dates, dtype=object)[wanted]),
+            np.asarray(codes, dtype=np.float64)[wanted],
+            np.asarray(temperature, dtype=np.float64)[wanted],
+        )
+
+    def lookup(self, cells, days):
+        """Position of each ``(cell, day)`` in the index, -1 where there is no row."""
+        keys = np.asarray(cells, dtype=np.int64) * DAY_SPAN + np.asarray(days, dtype=np.int64)
+        if not len(self.keys):
+            return np.full(len(keys), -1)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = (self.keys[positions] == keys) & (np.asarray(cells) != NO_CELL)
+        return np.where(found, positions, -1)
+
+    def column(self, name, cells, days):
+        """Values of ``name`` per ``(cell, day)``, NaN where there is no row."""
+        positions = self.lookup(cells, days)
+        values = getattr(self, name)
+        if not len(values):
+            return np.full(len(positions), np.nan)
+        return np.where(positions >= 0, values[np.maximum(positions, 0)], np.nan)
+
+    def rainy(self, cells, days):
+        code = self.column('weather_code', cells, days)
+        return (code >= RAIN_CODES[0]) & (code <= RAIN_CODES[1])
+
+    def temperature(self, cells, days):
+        return self.column('temperature_max', cells, days)
+
+
+def date_span(*day_arrays):
+    """``(first, last)`` dates covering the given day numbers, or ``(None, None)``."""
+    days = [array for array in day_arrays if len(array)]
+    if not days:
+        return None, None
+    return (
+        date.fromordinal(int(min(array.min() for array in days))) - timedelta(days=1),
+        date.fromordinal(int(max(array.max() for array in days))),
+    )
@@ -0,0 +1,67 @@
+# backend/gunicorn_conf.py
+"""
+Gunicorn configuration for serving the Django app in production.
+
+    gunicorn -c backend/gunicorn_conf.py backend.wsgi:application
+
+Every setting can be overridden with a GUNICORN_* environment variable
+(GUNICORN_WORKERS, GUNICORN_THREADS, GUNICORN_WORKER_CLASS, ...). Set
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker and serve
+``backend.asgi:application`` to run the ASGI app instead; that needs the
+``uvicorn`` package.
+"""
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    return value.lower() in ('1', 'true', 'yes', 'on') if value else default
+
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')  # nginx proxies /api/ and /admin/ here
+
+# The usual 2 * cores + 1 processes, each with a few threads so requests
+# waiting on PostgreSQL do not hold a whole process.
+workers = env_int('GUNICORN_WORKERS', 2 * cpus + 1)
+threads = env_int('GUNICORN_THREADS', 4)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+# Import Django and the app once in the master so workers fork with it
+# loaded (faster start, shared memory pages).
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Recycle workers periodically to bound memory growth; the jitter keeps
+# them from all restarting at once.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# Large imports and exports stream for a while, so allow a minute per
+# request; on shutdown or reload, in-flight requests get 30 s to finish.
+timeout = env_int('GUNICORN_TIMEOUT', 60)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Heartbeat files on tmpfs: a worker blocked on disk I/O is not mistaken
+# for a hung one.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None  # set it empty to disable
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # With preload_app, anything the master did at import time (app checks,
+    # signal setup) may have opened a database connection. Close it before
+    # forking so workers never share a socket with the master or each other.
+    from django.db import connections
+
+    connections.close_all()
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
+from .database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,8 +48,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestProfilingMiddleware',  # Opt-in; see REQUEST_PROFILING below
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',  # Compresses responses per Accept-Encoding
+    'api.middleware.DecompressRequestMiddleware',  # Accepts gzip/deflate/zstd request bodies
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -78,15 +85,10 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Configured from DATABASE_URL or DB_* variables, with persistent connections
+# by default; see backend/database.py for pooling and PgBouncer settings.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'postgres',
-        'USER': 'postgres',
-        'PASSWORD': 'admin',
-        'HOST': 'localhost',
-        'PORT': '5432',
-    }
+    'default': database_config(),
 }
 
 CORS_ALLOW_ALL_ORIGINS = False
@@ -102,6 +104,7 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
+    'content-encoding',
     'content-type',
     'dnt',
     'origin',
@@ -147,6 +150,11 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Uploaded import archives and generated exports of background jobs. Kept
+# out of the public /media/ directory: results are downloaded through
+# /api/jobs/<id>/result/, which checks the job's owner.
+JOB_FILES_ROOT = os.environ.get('JOB_FILES_ROOT', BASE_DIR / 'job_files')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -154,11 +162,87 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Caches: local memory by default. Set REDIS_URL (for example
+# redis://redis:6379/0, the service in docker-compose.yml) to share the
+# cache between workers; this needs the `redis` package.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Token authentication (api/authentication.py)
+AUTH_TOKEN_TTL = timedelta(days=30)  # None disables token expiry
+AUTH_TOKEN_CACHE_TIMEOUT = 60  # seconds a successful lookup is cached
+
+# Daily weather source for api/weather.py; api.weather.StubWeatherFetcher
+# generates synthetic data without network access.
+WEATHER_FETCHER = os.environ.get('WEATHER_FETCHER', 'api.weather.OpenMeteoFetcher')
+
+# Request profiling (api/middleware.py RequestProfilingMiddleware): adds
+# Server-Timing headers and one log line per request. A sample of requests
+# runs under cProfile; dumps of the slowest are kept in REQUEST_PROFILING_DIR.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '').lower() in ('1', 'true', 'yes')
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', '0.05'))
+REQUEST_PROFILING_SLOW_PERCENT = float(os.environ.get('REQUEST_PROFILING_SLOW_PERCENT', '1'))
+REQUEST_PROFILING_DIR = os.environ.get('REQUEST_PROFILING_DIR', BASE_DIR / 'profiles')
+
+# Typeahead (api/typeahead.py): per-process LRU of suggestions for hot prefixes.
+TYPEAHEAD_CACHE_SIZE = int(os.environ.get('TYPEAHEAD_CACHE_SIZE', '2048'))
+TYPEAHEAD_CACHE_SECONDS = float(os.environ.get('TYPEAHEAD_CACHE_SECONDS', '30'))
+
+# Logging: DEBUG and INFO records from the api loggers are sampled at
+# LOG_SAMPLE_RATE; warnings and errors are always written.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampled': {
+            '()': 'api.profiling.SampleRateFilter',
+            'rate': float(os.environ.get('LOG_SAMPLE_RATE', '1.0')),
+        },
+    },
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'api': {
+            'class': 'logging.StreamHandler',
+            'filters': ['sampled'],
+            'formatter': 'plain',
+        },
+    },
+    'loggers': {
+        'api': {
+            'handlers': ['api'],
+            'level': os.environ.get('LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
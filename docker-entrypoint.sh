@@ -14,9 +14,23 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput --clear
 
-# Start Django in the background
-echo "Starting Django server..."
-python manage.py runserver 0.0.0.0:8000 &
+# Start Django in the background. APP_SERVER=runserver falls back to the
+# single-process development server; gunicorn settings live in
+# backend/gunicorn_conf.py and can be tuned with GUNICORN_* variables.
+APP_SERVER="${APP_SERVER:-gunicorn}"
+echo "Starting Django server ($APP_SERVER)..."
+if [ "$APP_SERVER" = "runserver" ]; then
+    python manage.py runserver 127.0.0.1:8000 &
+else
+    gunicorn -c backend/gunicorn_conf.py backend.wsgi:application &
+fi
+
+# Background import/export jobs (api/jobs.py). JOB_WORKER_PROCESSES limits
+# how many run at once; set JOB_WORKER=0 to run the worker elsewhere.
+if [ "${JOB_WORKER:-1}" != "0" ]; then
+    echo "Starting job worker..."
+    python manage.py run_job_worker ${JOB_WORKER_PROCESSES:+--processes "$JOB_WORKER_PROCESSES"} &
+fi
 
 # Start nginx in the foreground
 echo "Starting Nginx..."
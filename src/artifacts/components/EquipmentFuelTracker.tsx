@@ -8,6 +8,7 @@ import { BarChart, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveConta
 import { Fuel, Plus, Trash2, Pencil } from 'lucide-react';
 import { FuelRecord } from '../models/sustainability';
 import { Farm } from '../types';
+import { ApiService } from '@/services/DataStorage';
 
 interface EquipmentFuelTrackerProps {
   farmId?: number;
@@ -37,6 +38,18 @@ const EquipmentFuelTracker: React.FC<EquipmentFuelTrackerProps> = ({
     notes: ''
   });
 
+  // Equipment names already used on the server, for the name field's datalist
+  const [equipmentSuggestions, setEquipmentSuggestions] = useState<string[]>([]);
+  useEffect(() => {
+    if (!(isAddingRecord || isEditingRecord) || !ApiService.isLoggedIn()) return;
+    const timer = setTimeout(() => {
+      ApiService.typeahead('equipment_name', newRecord.equipmentName)
+        .then(setEquipmentSuggestions)
+        .catch(() => setEquipmentSuggestions([]));
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [newRecord.equipmentName, isAddingRecord, isEditingRecord]);
+
   // Reset newRecord when farmId changes
   useEffect(() => {
     if (farmId) {
@@ -291,10 +304,14 @@ const EquipmentFuelTracker: React.FC<EquipmentFuelTrackerProps> = ({
                 <Label htmlFor="equipmentName">Equipment Name</Label>
                 <Input
                   id="equipmentName"
+                  list="equipmentSuggestions"
                   value={newRecord.equipmentName}
                   onChange={e => setNewRecord({...newRecord, equipmentName: e.target.value})}
                   required
                 />
+                <datalist id="equipmentSuggestions">
+                  {equipmentSuggestions.map(name => <option key={name} value={name} />)}
+                </datalist>
               </div>
               
               <div>
@@ -400,10 +417,14 @@ const EquipmentFuelTracker: React.FC<EquipmentFuelTrackerProps> = ({
                 <Label htmlFor="edit-equipmentName">Equipment Name</Label>
                 <Input
                   id="edit-equipmentName"
+                  list="edit-equipmentSuggestions"
                   value={newRecord.equipmentName}
                   onChange={e => setNewRecord({...newRecord, equipmentName: e.target.value})}
                   required
                 />
+                <datalist id="edit-equipmentSuggestions">
+                  {equipmentSuggestions.map(name => <option key={name} value={name} />)}
+                </datalist>
               </div>
               
               <div>
@@ -68,6 +68,9 @@ interface UserData {
   role: string;
 }
 
+// The IP location is looked up again once the stored one is this old
+const LOCATION_MAX_AGE_MS = 24 * 60 * 60 * 1000;
+
 // Define navigation items for the sidebar
 interface NavItem {
   id: string;
@@ -1056,6 +1059,21 @@ const DefaultComponent = (): React.ReactNode => {
   }, [isLoggedIn]);
 
   const fetchUserLocation = async () => {
+    try {
+      // The IP location is reused until it is LOCATION_MAX_AGE_MS old, not
+      // looked up on every load
+      const cached = JSON.parse(localStorage.getItem('weatherLocation') || 'null');
+      if (
+        cached && Number.isFinite(cached.latitude) && Number.isFinite(cached.longitude) &&
+        Date.now() - cached.storedAt < LOCATION_MAX_AGE_MS
+      ) {
+        fetchWeatherData(cached.latitude, cached.longitude);
+        return;
+      }
+    } catch (error) {
+      // A malformed stored location is replaced by a fresh lookup
+      localStorage.removeItem('weatherLocation');
+    }
     try {
       // Using geojs.io instead of ipapi.co to avoid CORS issues
       const response = await fetch('https://get.geojs.io/v1/ip/geo.json');
@@ -1063,6 +1081,13 @@ const DefaultComponent = (): React.ReactNode => {
       const { latitude, longitude } = data;
       
       // Fallback to default coordinates if the API fails
+      if (latitude && longitude) {
+        localStorage.setItem('weatherLocation', JSON.stringify({
+          latitude: parseFloat(latitude),
+          longitude: parseFloat(longitude),
+          storedAt: Date.now()
+        }));
+      }
       fetchWeatherData(
         latitude ? parseFloat(latitude) : 40.7128, 
         longitude ? parseFloat(longitude) : -74.0060
@@ -1076,18 +1101,38 @@ const DefaultComponent = (): React.ReactNode => {
 
   const fetchWeatherData = async (latitude: number, longitude: number) => {
     try {
-      const response = await fetch(
-        `https://api.open-meteo.com/v1/forecast?latitude=${latitude}&longitude=${longitude}&daily=temperature_2m_max,weathercode&temperature_unit=fahrenheit&timezone=auto&forecast_days=10`
-      );
-      const data = await response.json();
+      let days: { date: string; temp: number; code: number; precipitation?: number }[];
+      if (ApiService.isLoggedIn()) {
+        // Served from the backend's shared per-grid-cell weather store
+        const series = await ApiService.getWeather(latitude, longitude);
+        days = series.days
+          .filter(day => day.temperature_max != null)
+          .map(day => ({
+            date: day.date,
+            temp: Math.round((day.temperature_max! * 9 / 5 + 32) * 10) / 10,
+            code: day.weather_code ?? 0,
+            precipitation: day.precipitation ?? undefined
+          }));
+      } else {
+        const response = await fetch(
+          `https://api.open-meteo.com/v1/forecast?latitude=${latitude}&longitude=${longitude}&daily=temperature_2m_max,weathercode&temperature_unit=fahrenheit&timezone=auto&forecast_days=10`
+        );
+        const data = await response.json();
+        days = data.daily.time.map((date: string, index: number) => ({
+          date,
+          temp: data.daily.temperature_2m_max[index],
+          code: data.daily.weathercode[index]
+        }));
+      }
 
-      const formattedData = data.daily.time.map((date: string, index: number) => {
-        const weatherInfo = getWeatherInfo(data.daily.weathercode[index]);
+      const formattedData = days.map(day => {
+        const weatherInfo = getWeatherInfo(day.code);
         return {
-          date: new Date(date).toLocaleDateString(),
-          temp: data.daily.temperature_2m_max[index],
+          date: new Date(day.date).toLocaleDateString(),
+          temp: day.temp,
           weather: weatherInfo.desc,
-          icon: weatherInfo.icon
+          icon: weatherInfo.icon,
+          precipitation: day.precipitation
         };
       });
 
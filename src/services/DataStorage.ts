@@ -17,6 +17,82 @@ function forceLogout(): void {
   localStorage.clear();
 }
 
+// Error thrown for non-2xx responses, keeping the status and parsed body
+export class ApiError extends Error {
+  status: number;
+  data: any;
+
+  constructor(message: string, status: number, data: any) {
+    super(message);
+    this.status = status;
+    this.data = data;
+  }
+}
+
+// Keys that are never synced to the backend
+const SYNC_EXCLUDED_KEYS = ['authToken', 'currentUser', 'syncState', 'weatherLocation'];
+
+// Revision and per-key hashes of the last snapshot the backend acknowledged
+interface SyncState {
+  revision: number;
+  hashes: Record<string, string>;
+}
+
+function getSyncState(): SyncState | null {
+  try {
+    const raw = localStorage.getItem('syncState');
+    return raw ? JSON.parse(raw) : null;
+  } catch {
+    return null;
+  }
+}
+
+function setSyncState(state: SyncState): void {
+  localStorage.setItem('syncState', JSON.stringify(state));
+}
+
+// FNV-1a; only used to detect changed values, not for security
+function hashValue(value: string | null): string {
+  let hash = 0x811c9dc5;
+  const text = value == null ? '' : String(value);
+  for (let i = 0; i < text.length; i++) {
+    hash ^= text.charCodeAt(i);
+    hash = Math.imul(hash, 0x01000193);
+  }
+  return `${(hash >>> 0).toString(16)}:${text.length}`;
+}
+
+function hashSnapshot(snapshot: Record<string, string | null>): Record<string, string> {
+  const hashes: Record<string, string> = {};
+  for (const key in snapshot) {
+    hashes[key] = hashValue(snapshot[key]);
+  }
+  return hashes;
+}
+
+function collectLocalStorageSnapshot(): Record<string, string | null> {
+  const snapshot: Record<string, string | null> = {};
+  for (let i = 0; i < localStorage.length; i++) {
+    const key = localStorage.key(i);
+    if (key && !SYNC_EXCLUDED_KEYS.includes(key)) { // Don't sync auth-related data
+      snapshot[key] = localStorage.getItem(key);
+    }
+  }
+  return snapshot;
+}
+
+// Request bodies at least this large are gzipped when the browser supports it
+const COMPRESSION_MIN_BYTES = 8 * 1024;
+
+async function encodeBody(body: any): Promise<{ body: BodyInit; encoding?: string }> {
+  const json = JSON.stringify(body);
+  if (json.length < COMPRESSION_MIN_BYTES || typeof CompressionStream === 'undefined') {
+    return { body: json };
+  }
+  const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+  return { body: await new Response(stream).blob(), encoding: 'gzip' };
+}
+
 async function request<T>(endpoint: string, method: string = 'GET', body?: any): Promise<T> {
   const token = getAuthToken();
   const headers: HeadersInit = {
@@ -32,7 +108,11 @@ async function request<T>(endpoint: string, method: string = 'GET', body?: any):
   };
 
   if (body) {
-    config.body = JSON.stringify(body);
+    const encoded = await encodeBody(body);
+    config.body = encoded.body;
+    if (encoded.encoding) {
+      headers['Content-Encoding'] = encoded.encoding;
+    }
   }
 
   const response = await fetch(`${API_BASE_URL}/${endpoint}`, config);
@@ -50,8 +130,10 @@ async function request<T>(endpoint: string, method: string = 'GET', body?: any):
     
     // Handle errors (e.g., by throwing an error or returning a specific error object)
     const errorData = await response.json().catch(() => ({ message: response.statusText }));
-    console.error(`API Error (${response.status}) on ${method} ${endpoint}:`, errorData);
-    throw new Error(errorData.message || `Request failed with status ${response.status}`);
+    if (response.status !== 409) { // Sync conflicts are expected and handled by the caller
+      console.error(`API Error (${response.status}) on ${method} ${endpoint}:`, errorData);
+    }
+    throw new ApiError(errorData.message || `Request failed with status ${response.status}`, response.status, errorData);
   }
   if (response.status === 204) { // No Content
     return null as T;
@@ -60,6 +142,127 @@ async function request<T>(endpoint: string, method: string = 'GET', body?: any):
 }
 
 
+export interface Page<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+export interface WeatherDay {
+  date: string;
+  temperature_max: number | null; // °C
+  temperature_min: number | null; // °C
+  precipitation: number | null; // mm
+  weather_code: number | null; // WMO code
+}
+
+export interface WeatherSeries {
+  cell: { latitude: number; longitude: number };
+  start: string;
+  end: string;
+  days: WeatherDay[];
+}
+
+// Chart data from /api/series/<name>/, aggregated or downsampled server-side
+export type SeriesName = 'fuel' | 'energy' | 'soil' | 'water' | 'emissions' | 'sequestration';
+export type SeriesBucketSize = 'day' | 'week' | 'month' | 'quarter' | 'year';
+
+export interface SeriesStats {
+  sum: number | null;
+  avg: number | null;
+  min: number | null;
+  max: number | null;
+}
+
+export interface SeriesBucket {
+  period: string; // first day of the bucket (Monday for weeks)
+  count: number;
+  [fieldOrGroup: string]: SeriesStats | string | number | boolean;
+}
+
+export interface SeriesBuckets {
+  series: SeriesName;
+  bucket: SeriesBucketSize;
+  group: string | null;
+  fields: string[];
+  buckets: SeriesBucket[];
+}
+
+export interface SeriesPoints {
+  series: SeriesName;
+  field: string;
+  total: number; // rows before downsampling
+  points: { date: string; value: number }[];
+}
+
+export interface SeriesFilter {
+  farm?: number;
+  date_from?: string;
+  date_to?: string;
+}
+
+// Ranked full-text hit from /api/search/
+export type SearchType =
+  | 'task' | 'issue' | 'plan' | 'crop_event' | 'fuel' | 'soil' | 'emission' | 'sequestration' | 'energy';
+
+export interface SearchHit {
+  type: SearchType;
+  id: number;
+  title: string;
+  text: string; // remaining text fields, truncated
+  farm_id: number | null;
+  date: string | null;
+  rank: number;
+}
+
+// Suggestions from /api/typeahead/<field>/, most used first
+export type TypeaheadField = 'farm_name' | 'crop' | 'equipment_name' | 'fuel_type' | 'energy_type' | 'purpose';
+
+export interface TypeaheadValue {
+  value: string;
+  count: number;
+}
+
+// Background import/export job; poll getJob until status is final
+export interface Job {
+  id: number;
+  kind: 'import' | 'export';
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: Record<string, number>; // rows processed per table
+  result: Record<string, any> | null;
+  error: { error: string; details?: any } | null;
+  attempts: number;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  result_url: string | null;
+}
+
+export interface ImportOptions {
+  merge?: boolean;
+  deleteMissing?: boolean;
+}
+
+export type BatchOperation =
+  | { op: 'create'; data: Record<string, unknown> }
+  | { op: 'update'; id: number; data: Record<string, unknown> }
+  | { op: 'delete'; id: number };
+
+export interface BatchResult {
+  index: number;
+  status: 'created' | 'updated' | 'deleted' | 'ok' | 'error';
+  id?: number;
+  errors?: Record<string, string[]>;
+}
+
+function seriesParams(options: Record<string, string | number | undefined>): string {
+  const params: Record<string, string> = {};
+  for (const [key, value] of Object.entries(options)) {
+    if (value !== undefined && value !== '') params[key] = String(value);
+  }
+  return new URLSearchParams(params).toString();
+}
+
 export class ApiService {
   // User Authentication
   static async login(credentials: { username: string; password: string }): Promise<any> {
@@ -106,6 +309,7 @@ export class ApiService {
     } finally {
       localStorage.removeItem('authToken');
       localStorage.removeItem('currentUser');
+      localStorage.removeItem('syncState');
       // Don't sync to backend after logout as user is no longer authenticated
     }
   }
@@ -136,9 +340,116 @@ export class ApiService {
   }
 
 
-  // Example: Fetching Farms
-  static async getFarms<T>(): Promise<T[]> {
-    return request<T[]>('farms/', 'GET');
+  // Keyset-paginated list endpoints. Pass a page's `next` or `previous`
+  // link back to `getPage` to move between pages.
+  static async getRecords<T>(endpoint: string, params: Record<string, string | number> = {}): Promise<Page<T>> {
+    const query = new URLSearchParams(
+      Object.entries(params).map(([key, value]) => [key, String(value)])
+    ).toString();
+    return request<Page<T>>(query ? `${endpoint}?${query}` : endpoint, 'GET');
+  }
+
+  static async getPage<T>(link: string): Promise<Page<T>> {
+    const url = new URL(link);
+    const endpoint = url.pathname.replace(/^.*?\/api\//, '');
+    return request<Page<T>>(`${endpoint}${url.search}`, 'GET');
+  }
+
+  // Upload queued offline edits for one tracker table in a single request.
+  // Nothing is written unless every operation validates.
+  static async batchWrite(endpoint: string, operations: BatchOperation[]): Promise<{ results: BatchResult[] }> {
+    return request<{ results: BatchResult[] }>(`${endpoint}batch/`, 'POST', { operations });
+  }
+
+  // Imports and exports run as background jobs so large archives never hit
+  // request timeouts. Submit, poll getJob, then download the export result.
+  // `merge` upserts into the stored data instead of replacing it, and
+  // `deleteMissing` also removes stored rows the archive no longer has.
+  static async submitImportJob(file: File, options: ImportOptions = {}): Promise<Job> {
+    const form = new FormData();
+    form.append('file', file);
+    const params = new URLSearchParams();
+    if (options.merge) params.set('merge', 'true');
+    if (options.deleteMissing) params.set('delete_missing', 'true');
+    const query = params.toString() ? `?${params}` : '';
+    const token = getAuthToken();
+    const response = await fetch(`${API_BASE_URL}/jobs/import/${query}`, {
+      method: 'POST',
+      headers: token ? { Authorization: `Token ${token}` } : {},
+      body: form,
+    });
+    const data = await response.json().catch(() => ({ message: response.statusText }));
+    if (!response.ok) {
+      throw new ApiError(data.error || `Request failed with status ${response.status}`, response.status, data);
+    }
+    return data;
+  }
+
+  static async submitExportJob(): Promise<Job> {
+    return request<Job>('jobs/export/', 'POST');
+  }
+
+  static async getJob(jobId: number): Promise<Job> {
+    return request<Job>(`jobs/${jobId}/`, 'GET');
+  }
+
+  static async downloadJobResult(jobId: number): Promise<Blob> {
+    const token = getAuthToken();
+    const response = await fetch(`${API_BASE_URL}/jobs/${jobId}/result/`, {
+      headers: token ? { Authorization: `Token ${token}` } : {},
+    });
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({ message: response.statusText }));
+      throw new ApiError(data.error || `Request failed with status ${response.status}`, response.status, data);
+    }
+    return response.blob();
+  }
+
+  // Daily weather for a point (defaults to today and the next 9 days)
+  static async getWeather(latitude: number, longitude: number, start?: string, end?: string): Promise<WeatherSeries> {
+    const params: Record<string, string> = { lat: String(latitude), lon: String(longitude) };
+    if (start) params.start = start;
+    if (end) params.end = end;
+    return request<WeatherSeries>(`weather/?${new URLSearchParams(params).toString()}`, 'GET');
+  }
+
+  // sum/avg/min/max per bucket, e.g. getSeriesBuckets('fuel', { bucket: 'month', group: 'equipment_name' })
+  static async getSeriesBuckets(
+    name: SeriesName,
+    options: SeriesFilter & { bucket?: SeriesBucketSize; fields?: string[]; group?: string } = {},
+  ): Promise<SeriesBuckets> {
+    const { fields, ...rest } = options;
+    const params = seriesParams({ ...rest, ...(fields ? { fields: fields.join(',') } : {}) });
+    return request<SeriesBuckets>(`series/${name}/?${params}`, 'GET');
+  }
+
+  // One field as at most `points` points (LTTB), for line charts of long histories
+  static async getSeriesPoints(
+    name: SeriesName,
+    field: string,
+    options: SeriesFilter & { points?: number } = {},
+  ): Promise<SeriesPoints> {
+    return request<SeriesPoints>(`series/${name}/?${seriesParams({ ...options, mode: 'raw', field })}`, 'GET');
+  }
+
+  // Follow `next` with getPage for more hits
+  static async search(
+    q: string,
+    options: { types?: SearchType[]; page_size?: number } = {},
+  ): Promise<Page<SearchHit>> {
+    const { types, ...rest } = options;
+    const params = seriesParams({ ...rest, q, ...(types ? { types: types.join(',') } : {}) });
+    return request<Page<SearchHit>>(`search/?${params}`, 'GET');
+  }
+
+  static async typeahead(field: TypeaheadField, q: string, limit?: number): Promise<string[]> {
+    const params = seriesParams({ q, limit });
+    const response = await request<{ field: TypeaheadField; values: TypeaheadValue[] }>(`typeahead/${field}/?${params}`, 'GET');
+    return response.values.map(row => row.value);
+  }
+
+  static async getFarms<T>(params: Record<string, string | number> = {}): Promise<Page<T>> {
+    return ApiService.getRecords<T>('farms/', params);
   }
 
   // Example: Adding a Farm
@@ -154,11 +465,15 @@ export class ApiService {
     await request<void>(`farms/${farmId}/`, 'DELETE');
   }
 
+  // Sustainability scores for every farm, computed server-side
+  static async getSustainabilityMetrics<T>(): Promise<T> {
+    return request<T>('metrics/', 'GET');
+  }
+
   // You would add similar methods for PlanItems, Livestock, etc.
   // Example for PlanItems
-  static async getPlanItems<T>(farmId?: number): Promise<T[]> {
-    const endpoint = farmId ? `farms/${farmId}/plans/` : 'plans/'; // Adjust if your API structure is different
-    return request<T[]>(endpoint, 'GET');
+  static async getPlanItems<T>(planType?: string): Promise<Page<T>> {
+    return ApiService.getRecords<T>('plans/', planType ? { plan_type: planType } : {});
   }
 
   static async addPlanItem<T>(planData: any): Promise<T> {
@@ -166,22 +481,24 @@ export class ApiService {
     return request<T>('plans/', 'POST', planData);
   }
   
-  // Method to save the entire localStorage to the backend
+  // Method to sync localStorage to the backend. Only keys that changed since
+  // the last acknowledged revision are sent; a full snapshot is uploaded when
+  // there is no sync state yet.
   static async saveLocalStorageToBackend(): Promise<void> {
     if (!ApiService.isLoggedIn()) {
       // Don't log this as it creates noise - just silently skip
       return;
     }
-    const localStorageSnapshot: Record<string, string | null> = {};
-    for (let i = 0; i < localStorage.length; i++) {
-      const key = localStorage.key(i);
-      if (key && key !== 'authToken' && key !== 'currentUser') { // Don't sync auth-related data
-        localStorageSnapshot[key] = localStorage.getItem(key);
-      }
-    }
+    const localStorageSnapshot = collectLocalStorageSnapshot();
     try {
-      await request<void>('sync/localstorage/save/', 'POST', localStorageSnapshot);
-      console.log('LocalStorage snapshot saved to backend.');
+      const state = getSyncState();
+      if (!state) {
+        const result = await request<{ revision: number }>('sync/localstorage/save/', 'POST', localStorageSnapshot);
+        setSyncState({ revision: result.revision, hashes: hashSnapshot(localStorageSnapshot) });
+        console.log('LocalStorage snapshot saved to backend.');
+        return;
+      }
+      await ApiService.patchLocalStorage(state, localStorageSnapshot);
     } catch (error) {
       // Only log if it's not an auth error
       if (error instanceof Error && !error.message.includes('401') && !error.message.includes('Invalid token')) {
@@ -190,13 +507,67 @@ export class ApiService {
     }
   }
 
+  private static async patchLocalStorage(
+    state: SyncState,
+    snapshot: Record<string, string | null>,
+    retried = false
+  ): Promise<void> {
+    const hashes = hashSnapshot(snapshot);
+    const changed: Record<string, string | null> = {};
+    for (const key in hashes) {
+      if (state.hashes[key] !== hashes[key]) {
+        changed[key] = snapshot[key];
+      }
+    }
+    const removed = Object.keys(state.hashes).filter(key => !(key in hashes));
+    if (Object.keys(changed).length === 0 && removed.length === 0) {
+      return;
+    }
+
+    try {
+      const result = await request<{ revision: number }>('sync/localstorage/patch/', 'POST', {
+        base_revision: state.revision,
+        set: changed,
+        remove: removed,
+      });
+      setSyncState({ revision: result.revision, hashes });
+      console.log('LocalStorage changes saved to backend.');
+    } catch (error) {
+      if (!(error instanceof ApiError) || error.status !== 409 || retried) {
+        throw error;
+      }
+      // Behind the server: take its changes for keys we haven't touched
+      // locally, then retry our own changes on top of its revision.
+      const { revision, changes } = error.data;
+      const merged: SyncState = { revision, hashes: { ...state.hashes } };
+      if (changes.full) {
+        merged.hashes = {};
+      }
+      for (const key in changes.set) {
+        merged.hashes[key] = hashValue(changes.set[key]);
+        if (!(key in changed)) {
+          localStorage.setItem(key, changes.set[key]);
+        }
+      }
+      for (const key of changes.remove) {
+        delete merged.hashes[key];
+        if (!(key in changed)) {
+          localStorage.removeItem(key);
+        }
+      }
+      await ApiService.patchLocalStorage(merged, collectLocalStorageSnapshot(), true);
+    }
+  }
+
   // Method to load localStorage data from the backend
   static async loadLocalStorageFromBackend(): Promise<boolean> {
     if (!ApiService.isLoggedIn()) {
       return false;
     }
     try {
-      const backendData = await request<Record<string, string>>('sync/localstorage/load/', 'GET');
+      const { revision, data: backendData } = await request<{ revision: number; data: Record<string, string> }>(
+        'sync/localstorage/load/?include_revision=1', 'GET'
+      );
       
       // Check if we received actual data or just an empty object
       const hasData = backendData && Object.keys(backendData).length > 0;
@@ -216,12 +587,15 @@ export class ApiService {
         }
         
         // Load data from backend
+        const loaded: Record<string, string | null> = {};
         for (const key in backendData) {
           if (Object.prototype.hasOwnProperty.call(backendData, key) && 
-              key !== 'authToken' && key !== 'currentUser') {
+              !SYNC_EXCLUDED_KEYS.includes(key)) {
             localStorage.setItem(key, backendData[key]);
+            loaded[key] = backendData[key];
           }
         }
+        setSyncState({ revision, hashes: hashSnapshot(loaded) });
         console.log('LocalStorage loaded from backend.');
         return true;
       } else {